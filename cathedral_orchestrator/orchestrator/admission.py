@@ -0,0 +1,391 @@
+"""Per-host (and optional per-model) admission control for LM requests.
+
+Each LM host gets a fixed number of generation slots. Requests beyond that wait
+in a bounded queue; a full queue or an expired wait is rejected with a
+``Retry-After`` hint instead of piling more parallel streams onto the box.
+
+Waiters are kept per priority class. A freed slot goes to the oldest waiter of
+the most urgent class, except that any waiter older than the aging threshold
+is served first, so bulk work keeps moving under sustained interactive load.
+Bulk requests may not take the host's last ``reserved`` slots, which keeps a
+slot free for interactive requests while a library is being re-indexed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+DEFAULT_HOST_CONCURRENCY = 4
+DEFAULT_QUEUE_SIZE = 16
+DEFAULT_QUEUE_TIMEOUT_SECONDS = 30.0
+DEFAULT_AGING_SECONDS = 10.0
+DEFAULT_RESERVED_SLOTS = 1
+EWMA_ALPHA = 0.2
+MAX_RETRY_AFTER_SECONDS = 60
+
+# Priority classes, most urgent first.
+PRIORITIES = ("interactive", "standard", "bulk")
+INTERACTIVE, STANDARD, BULK = range(len(PRIORITIES))
+
+
+def parse_priority(value: object) -> Optional[int]:
+    """Map a class name (case-insensitive) to its rank, or ``None``."""
+
+    if not isinstance(value, str):
+        return None
+    try:
+        return PRIORITIES.index(value.strip().lower())
+    except ValueError:
+        return None
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, status_code: int, retry_after: int) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("future", "priority", "since")
+
+    def __init__(self, future: "asyncio.Future[None]", priority: int) -> None:
+        self.future = future
+        self.priority = priority
+        self.since = time.monotonic()
+
+
+class Limiter:
+    """Counting semaphore with bounded per-priority wait queues and statistics.
+
+    ``limit <= 0`` disables the cap; slots are still counted for reporting.
+    Released slots are handed straight to the next waiter (see module docs).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        queue_size: int,
+        *,
+        reserved: int = DEFAULT_RESERVED_SLOTS,
+        aging: float = DEFAULT_AGING_SECONDS,
+    ) -> None:
+        self.name = name
+        self.limit = limit
+        self.queue_size = max(0, queue_size)
+        self.reserved = max(0, reserved)
+        self.aging = max(0.0, aging)
+        self.in_use = 0
+        self._waiters: List[Deque[_Waiter]] = [deque() for _ in PRIORITIES]
+        self.admitted_by_class = [0] * len(PRIORITIES)
+        self.aged_grants = 0
+        self.admitted = 0
+        self.queued_total = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+        self.wait_ewma = 0.0
+        self.wait_max = 0.0
+        self.hold_ewma: Optional[float] = None
+
+    @property
+    def queued(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters)
+
+    def _has_capacity(self) -> bool:
+        return self.limit <= 0 or self.in_use < self.limit
+
+    def _fits(self, priority: int) -> bool:
+        if self.limit <= 0:
+            return True
+        cap = self.limit
+        if priority == BULK and self.limit > self.reserved:
+            cap -= self.reserved
+        return self.in_use < cap
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        """Dequeue the waiter the next free slot belongs to, if it fits."""
+
+        heads: List[_Waiter] = []
+        for waiters in self._waiters:
+            while waiters and waiters[0].future.done():
+                waiters.popleft()
+            if waiters:
+                heads.append(waiters[0])
+        if not heads:
+            return None
+        now = time.monotonic()
+        aged = sorted(
+            (waiter for waiter in heads if now - waiter.since >= self.aging),
+            key=lambda waiter: waiter.since,
+        )
+        for waiter in aged + heads:
+            if self._fits(waiter.priority):
+                self._waiters[waiter.priority].popleft()
+                if waiter in aged and any(other.priority < waiter.priority for other in heads):
+                    self.aged_grants += 1
+                return waiter
+        return None
+
+    def _dispatch(self) -> None:
+        while True:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            self.in_use += 1
+            waiter.future.set_result(None)
+
+    def retry_after(self) -> int:
+        hold = self.hold_ewma or 1.0
+        slots = max(1, self.limit)
+        estimate = math.ceil(hold * (self.queued + 1) / slots)
+        return max(1, min(MAX_RETRY_AFTER_SECONDS, estimate))
+
+    def _record_wait(self, waited: float) -> None:
+        self.wait_ewma = EWMA_ALPHA * waited + (1 - EWMA_ALPHA) * self.wait_ewma
+        if waited > self.wait_max:
+            self.wait_max = waited
+
+    def can_acquire(self, priority: int = STANDARD) -> bool:
+        """Whether ``try_acquire`` would succeed right now."""
+
+        if not self._fits(priority):
+            return False
+        return not any(self._waiters[rank] for rank in range(priority + 1))
+
+    def try_acquire(self, priority: int = STANDARD) -> bool:
+        """Take a free slot unless a waiter of the same or a higher class is ahead."""
+
+        if not self.can_acquire(priority):
+            return False
+        self.in_use += 1
+        self.admitted += 1
+        self.admitted_by_class[priority] += 1
+        self._record_wait(0.0)
+        return True
+
+    async def acquire(self, timeout: float, priority: int = STANDARD) -> float:
+        """Take a slot, queueing up to ``timeout`` seconds; returns the wait."""
+
+        if self.try_acquire(priority):
+            return 0.0
+        if self.queued >= self.queue_size:
+            self.rejected_full += 1
+            raise AdmissionRejected("admission_queue_full", 429, self.retry_after())
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), priority)
+        self._waiters[priority].append(waiter)
+        self.queued_total += 1
+        try:
+            await asyncio.wait({waiter.future}, timeout=max(0.0, timeout))
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        if not waiter.future.done():
+            self._abandon(waiter)
+            self.rejected_timeout += 1
+            raise AdmissionRejected("admission_queue_timeout", 503, self.retry_after())
+        waited = time.monotonic() - waiter.since
+        self.admitted += 1
+        self.admitted_by_class[priority] += 1
+        self._record_wait(waited)
+        return waited
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        if waiter.future.done() and not waiter.future.cancelled():
+            # The slot was handed over while we were leaving; pass it on.
+            self.release()
+            return
+        waiter.future.cancel()
+        try:
+            self._waiters[waiter.priority].remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, held: Optional[float] = None) -> None:
+        if held is not None:
+            if self.hold_ewma is None:
+                self.hold_ewma = held
+            else:
+                self.hold_ewma = EWMA_ALPHA * held + (1 - EWMA_ALPHA) * self.hold_ewma
+        # Waiters only get the slot while it fits a (possibly lowered) limit.
+        self.in_use = max(0, self.in_use - 1)
+        self._dispatch()
+
+    def set_limit(
+        self,
+        limit: int,
+        queue_size: int,
+        *,
+        reserved: int = DEFAULT_RESERVED_SLOTS,
+        aging: float = DEFAULT_AGING_SECONDS,
+    ) -> None:
+        self.limit = limit
+        self.queue_size = max(0, queue_size)
+        self.reserved = max(0, reserved)
+        self.aging = max(0.0, aging)
+        self._dispatch()
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "limit": self.limit,
+            "in_use": self.in_use,
+            "queued": self.queued,
+            "queued_by_class": {
+                name: len(waiters) for name, waiters in zip(PRIORITIES, self._waiters)
+            },
+            "admitted": self.admitted,
+            "admitted_by_class": dict(zip(PRIORITIES, self.admitted_by_class)),
+            "aged_grants": self.aged_grants,
+            "queued_total": self.queued_total,
+            "rejected_full": self.rejected_full,
+            "rejected_timeout": self.rejected_timeout,
+            "wait_ms_avg": round(self.wait_ewma * 1000, 1),
+            "wait_ms_max": round(self.wait_max * 1000, 1),
+            "hold_ms_avg": round(self.hold_ewma * 1000, 1) if self.hold_ewma is not None else None,
+        }
+
+
+class Lease:
+    """Slots held by one request; ``release()`` is idempotent."""
+
+    def __init__(self, limiters: List[Limiter], waited: float) -> None:
+        self._limiters = limiters
+        self.waited = waited
+        self._acquired_at = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        held = time.monotonic() - self._acquired_at
+        for limiter in reversed(self._limiters):
+            limiter.release(held)
+
+
+class AdmissionController:
+    def __init__(self) -> None:
+        self.host_limit = DEFAULT_HOST_CONCURRENCY
+        self.model_limits: Dict[str, int] = {}
+        self.queue_size = DEFAULT_QUEUE_SIZE
+        self.queue_timeout = DEFAULT_QUEUE_TIMEOUT_SECONDS
+        self.reserved = DEFAULT_RESERVED_SLOTS
+        self.aging = DEFAULT_AGING_SECONDS
+        self._hosts: Dict[str, Limiter] = {}
+        self._models: Dict[Tuple[str, str], Limiter] = {}
+
+    def configure(
+        self,
+        host_limit: int,
+        model_limits: Optional[Dict[str, int]],
+        queue_size: int,
+        queue_timeout: float,
+        reserved: int = DEFAULT_RESERVED_SLOTS,
+        aging: float = DEFAULT_AGING_SECONDS,
+    ) -> None:
+        self.host_limit = int(host_limit)
+        self.model_limits = {str(k): int(v) for k, v in (model_limits or {}).items()}
+        self.queue_size = max(0, int(queue_size))
+        self.queue_timeout = max(0.0, float(queue_timeout))
+        self.reserved = max(0, int(reserved))
+        self.aging = max(0.0, float(aging))
+        for limiter in self._hosts.values():
+            limiter.set_limit(self.host_limit, self.queue_size, reserved=self.reserved, aging=self.aging)
+        for (_host, model), limiter in self._models.items():
+            # Slot reservation is a host-level guarantee; model caps only age.
+            limiter.set_limit(self.model_limits.get(model, 0), self.queue_size, reserved=0, aging=self.aging)
+
+    def _host_limiter(self, host: str) -> Limiter:
+        key = host.rstrip("/")
+        limiter = self._hosts.get(key)
+        if limiter is None:
+            limiter = Limiter(
+                key, self.host_limit, self.queue_size, reserved=self.reserved, aging=self.aging
+            )
+            self._hosts[key] = limiter
+        return limiter
+
+    def _model_limiter(self, host: str, model: Optional[str]) -> Optional[Limiter]:
+        if not model or model not in self.model_limits:
+            return None
+        key = (host.rstrip("/"), model)
+        limiter = self._models.get(key)
+        if limiter is None:
+            limiter = Limiter(
+                f"{key[0]}|{model}",
+                self.model_limits[model],
+                self.queue_size,
+                reserved=0,
+                aging=self.aging,
+            )
+            self._models[key] = limiter
+        return limiter
+
+    def try_admit(self, host: str, model: Optional[str], priority: int = STANDARD) -> Optional[Lease]:
+        """Take free slots without waiting, or return ``None``.
+
+        Both limiters are checked before either slot is taken, so a refusal
+        leaves no slot or admission count behind.
+        """
+
+        model_limiter = self._model_limiter(host, model)
+        host_limiter = self._host_limiter(host)
+        held = [host_limiter] if model_limiter is None else [model_limiter, host_limiter]
+        if not all(limiter.can_acquire(priority) for limiter in held):
+            return None
+        for limiter in held:
+            limiter.try_acquire(priority)
+        return Lease(held, 0.0)
+
+    async def admit(self, host: str, model: Optional[str], priority: int = STANDARD) -> Lease:
+        """Acquire the model slot (if capped) and then the host slot.
+
+        The queue timeout covers both waits. Model slots are taken first so a
+        request blocked on a busy model never sits on a host slot.
+        """
+
+        deadline = time.monotonic() + self.queue_timeout
+        held: List[Limiter] = []
+        waited = 0.0
+        try:
+            model_limiter = self._model_limiter(host, model)
+            if model_limiter is not None:
+                waited += await model_limiter.acquire(deadline - time.monotonic(), priority)
+                held.append(model_limiter)
+            host_limiter = self._host_limiter(host)
+            waited += await host_limiter.acquire(deadline - time.monotonic(), priority)
+            held.append(host_limiter)
+        except BaseException:
+            for limiter in reversed(held):
+                limiter.release()
+            raise
+        return Lease(held, waited)
+
+    def saturated(self, host: str) -> bool:
+        """True when a new request for ``host`` would have to queue."""
+
+        limiter = self._hosts.get(host.rstrip("/"))
+        if limiter is None:
+            return False
+        return limiter.queued > 0 or not limiter._has_capacity()
+
+    def queued(self, host: str) -> int:
+        limiter = self._hosts.get(host.rstrip("/"))
+        return limiter.queued if limiter is not None else 0
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "host_limit": self.host_limit,
+            "queue_size": self.queue_size,
+            "queue_timeout_s": self.queue_timeout,
+            "reserved_slots": self.reserved,
+            "aging_s": self.aging,
+            "queued": sum(limiter.queued for limiter in self._hosts.values()),
+            "hosts": {key: limiter.snapshot() for key, limiter in self._hosts.items()},
+            "models": {limiter.name: limiter.snapshot() for limiter in self._models.values()},
+        }
@@ -0,0 +1,436 @@
+"""Streamed, replayable request bodies with an incremental top-level key peek.
+
+The relay only needs a few top-level fields (``model``, ``stream``) to route a
+request. ``JsonKeyScanner`` finds them while the body is still arriving, and
+``StreamedBody`` keeps the original chunks so they can be forwarded upstream
+byte-for-byte, without ``json.loads`` or a joined copy of multi-MB prompts.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from starlette.requests import ClientDisconnect, Request
+
+DEFAULT_MAX_BODY_BYTES = 32 * 1024 * 1024
+
+# Captured keys and string values longer than this are not peeked.
+MAX_CAPTURE_BYTES = 1024
+
+_STRUCTURAL = re.compile(rb'["{}\[\],:]')
+_LITERAL_END = re.compile(rb"[,}\]\s]")
+_STRING_BODY = re.compile(rb'(?:[^"\\]+|\\.)*', re.S)
+_ESCAPED_QUOTE_SWITCH = 32
+_WHITESPACE = b" \t\r\n"
+
+
+class RequestBodyTooLarge(Exception):
+    def __init__(self, limit: int) -> None:
+        super().__init__(f"request body exceeds {limit} bytes")
+        self.limit = limit
+
+
+class JsonKeyScanner:
+    """Find scalar values of selected top-level keys in a JSON object stream.
+
+    Strings are skipped with C-level searches, so a multi-MB prompt costs a few
+    ``re.search`` calls rather than a full parse. Scanning stops once every
+    wanted key is found or the top-level object closes. Nested values for a
+    wanted key are reported as ``None``; ``offsets`` records where each found
+    value starts in the stream, so callers can slice nested values raw.
+    """
+
+    def __init__(self, keys: Iterable[str]) -> None:
+        self._wanted = {key.encode("utf-8") for key in keys}
+        self.values: Dict[str, Any] = {}
+        self.offsets: Dict[str, int] = {}
+        self.done = not self._wanted
+        self.invalid = False
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self._expect_key = False
+        self._key: Optional[bytes] = None
+        self._await_value = False
+        self._capture: Optional[bytearray] = None
+        self._capture_kind = ""
+        self._fed = 0
+
+    def _store(self, key: bytes, value: Any) -> None:
+        self.values.setdefault(key.decode("utf-8"), value)
+        self._wanted.discard(key)
+        if not self._wanted:
+            self.done = True
+
+    def _append(self, data: bytes) -> None:
+        capture = self._capture
+        if capture is None:
+            return
+        if len(capture) + len(data) > MAX_CAPTURE_BYTES:
+            self._capture = None
+            return
+        capture += data
+
+    def _finish_string(self) -> None:
+        raw = self._capture
+        kind = self._capture_kind
+        self._capture = None
+        self._capture_kind = ""
+        if kind == "key":
+            self._key = bytes(raw) if raw is not None else None
+        elif kind == "value" and self._key is not None:
+            key, self._key = self._key, None
+            value: Any = None
+            if raw is not None:
+                try:
+                    value = json.loads(b'"' + bytes(raw) + b'"')
+                except ValueError:
+                    value = None
+            self._store(key, value)
+
+    def _finish_literal(self) -> None:
+        raw = self._capture
+        key, self._key = self._key, None
+        self._capture = None
+        self._capture_kind = ""
+        value: Any = None
+        if raw is not None:
+            try:
+                value = json.loads(bytes(raw))
+            except ValueError:
+                value = None
+        if key is not None:
+            self._store(key, value)
+
+    def feed(self, data: bytes) -> None:
+        try:
+            self._feed(data)
+        finally:
+            self._fed += len(data)
+
+    def _feed(self, data: bytes) -> None:
+        i = 0
+        n = len(data)
+        escaped_quotes = 0
+        while i < n and not self.done:
+            if self._in_string:
+                if self._escape:
+                    self._append(data[i : i + 1])
+                    self._escape = False
+                    i += 1
+                    continue
+                j = data.find(b'"', i)
+                if j < 0:
+                    self._append(data[i:])
+                    # An odd run of trailing backslashes escapes the next chunk's first byte.
+                    k = n
+                    while k > i and data[k - 1] == 0x5C:
+                        k -= 1
+                    self._escape = (n - k) % 2 == 1
+                    return
+                k = j
+                while k > i and data[k - 1] == 0x5C:
+                    k -= 1
+                if (j - k) % 2 == 1:
+                    # Escaped quote: still inside the string.
+                    escaped_quotes += 1
+                    if escaped_quotes > _ESCAPED_QUOTE_SWITCH:
+                        # Quote-dense text: let the regex engine walk the rest.
+                        m = _STRING_BODY.match(data, i)
+                        e = m.end() if m is not None else i
+                        if e >= n - 1 and (e == n or data[e] == 0x5C):
+                            self._append(data[i:])
+                            self._escape = e == n - 1
+                            return
+                        self._append(data[i:e])
+                        i = j = e
+                    else:
+                        self._append(data[i : j + 1])
+                        i = j + 1
+                        continue
+                self._append(data[i:j])
+                self._in_string = False
+                self._finish_string()
+                i = j + 1
+                continue
+            if self._capture_kind == "literal":
+                m = _LITERAL_END.search(data, i)
+                if m is None:
+                    self._append(data[i:])
+                    return
+                self._append(data[i : m.start()])
+                self._finish_literal()
+                i = m.start()
+                continue
+            if self._await_value:
+                while i < n and data[i] in _WHITESPACE:
+                    i += 1
+                if i >= n:
+                    return
+                self._await_value = False
+                if self._key is not None:
+                    self.offsets.setdefault(self._key.decode("utf-8"), self._fed + i)
+                ch = data[i]
+                if ch == 0x22:  # quote
+                    self._in_string = True
+                    self._capture = bytearray()
+                    self._capture_kind = "value"
+                    i += 1
+                elif ch in b"{[":
+                    key, self._key = self._key, None
+                    if key is not None:
+                        self._store(key, None)
+                else:
+                    self._capture = bytearray()
+                    self._capture_kind = "literal"
+                continue
+            if not self._started:
+                while i < n and data[i] in _WHITESPACE:
+                    i += 1
+                if i >= n:
+                    return
+                if data[i] != 0x7B:  # not an object
+                    self.invalid = True
+                    self.done = True
+                    return
+                self._started = True
+            m = _STRUCTURAL.search(data, i)
+            if m is None:
+                return
+            ch = data[m.start()]
+            i = m.end()
+            depth = self._depth
+            if ch == 0x22:
+                self._in_string = True
+                if depth == 1 and self._expect_key:
+                    self._capture = bytearray()
+                    self._capture_kind = "key"
+                else:
+                    self._capture = None
+                    self._capture_kind = "skip"
+            elif ch in b"{[":
+                self._depth = depth + 1
+                if self._depth == 1:
+                    self._expect_key = True
+            elif ch in b"}]":
+                self._depth = depth - 1
+                if self._depth <= 0:
+                    self.done = True
+            elif depth == 1:
+                if ch == 0x2C:  # comma
+                    self._expect_key = True
+                    self._key = None
+                elif ch == 0x3A:  # colon
+                    self._expect_key = False
+                    if self._key is not None and self._key in self._wanted:
+                        self._await_value = True
+                    else:
+                        self._key = None
+
+
+class StreamedBody:
+    """Request body read on demand, kept chunked, and replayable.
+
+    ``peek()`` reads only until the scanner has its keys; ``replay()`` yields
+    the chunks read so far and keeps pulling from the client, so an upstream
+    send can start before the upload finishes and still be retried later.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        *,
+        keys: Iterable[str] = ("model", "stream"),
+        limit: int = DEFAULT_MAX_BODY_BYTES,
+    ) -> None:
+        self._limit = limit
+        self._source = request.stream()
+        self._chunks: List[bytes] = []
+        self._lock = asyncio.Lock()
+        self._complete = asyncio.Event()
+        self._pending: Optional["asyncio.Future[Optional[bytes]]"] = None
+        self._error: Optional[Exception] = None
+        self.size = 0
+        self.scanner = JsonKeyScanner(keys)
+        self.declared_length: Optional[int] = None
+        header = request.headers.get("content-length")
+        if header is not None:
+            try:
+                self.declared_length = int(header)
+            except ValueError:
+                self.declared_length = None
+        if self.declared_length is not None and self.declared_length > limit:
+            raise RequestBodyTooLarge(limit)
+
+    @property
+    def complete(self) -> bool:
+        return self._complete.is_set()
+
+    @property
+    def values(self) -> Dict[str, Any]:
+        return self.scanner.values
+
+    @property
+    def content_length(self) -> Optional[int]:
+        if self.complete:
+            return self.size
+        return self.declared_length
+
+    async def _next_chunk(self) -> Optional[bytes]:
+        try:
+            return await self._source.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    async def _pull(self) -> bool:
+        """Read one more chunk from the client; ``False`` once the body ended.
+
+        The read runs in a shielded task, so a cancelled consumer (a finished
+        hedge or disconnect watcher) never tears the client stream; the next
+        caller picks up the same pending read.
+        """
+
+        async with self._lock:
+            if self._error is not None:
+                raise self._error
+            if self.complete:
+                return False
+            task = self._pending
+            if task is None:
+                task = asyncio.ensure_future(self._next_chunk())
+                self._pending = task
+            try:
+                chunk = await asyncio.shield(task)
+            except asyncio.CancelledError:
+                if task.cancelled():
+                    self._pending = None
+                raise
+            except Exception as exc:
+                self._pending = None
+                self._error = exc
+                self._complete.set()
+                raise
+            self._pending = None
+            if chunk is None:
+                self._complete.set()
+                return False
+            if chunk:
+                self.size += len(chunk)
+                if self.size > self._limit:
+                    self._error = RequestBodyTooLarge(self._limit)
+                    self._complete.set()
+                    raise self._error
+                self._chunks.append(chunk)
+                if not self.scanner.done:
+                    self.scanner.feed(chunk)
+            return True
+
+    async def peek(self) -> Dict[str, Any]:
+        while not self.scanner.done and await self._pull():
+            pass
+        return self.scanner.values
+
+    async def slice_from(self, key: str, length: int) -> Optional[bytes]:
+        """Up to ``length`` raw bytes of the value of top-level ``key``.
+
+        ``key`` must be one of the scanned keys; reads only as far as needed.
+        """
+
+        await self.peek()
+        start = self.scanner.offsets.get(key)
+        if start is None:
+            return None
+        end = start + max(0, length)
+        while self.size < end and await self._pull():
+            pass
+        pieces: List[bytes] = []
+        position = 0
+        for chunk in self._chunks:
+            chunk_end = position + len(chunk)
+            if chunk_end > start:
+                pieces.append(chunk[max(0, start - position) : max(0, end - position)])
+            position = chunk_end
+            if position >= end:
+                break
+        return b"".join(pieces)
+
+    async def read(self) -> bytes:
+        while await self._pull():
+            pass
+        return b"".join(self._chunks)
+
+    async def read_chunks(self) -> List[bytes]:
+        """The whole body as its received chunks, without a joined copy."""
+
+        while await self._pull():
+            pass
+        return list(self._chunks)
+
+    async def scan(self, keys: Iterable[str]) -> JsonKeyScanner:
+        """Scan the whole body for further top-level keys."""
+
+        scanner = JsonKeyScanner(keys)
+        for chunk in await self.read_chunks():
+            if scanner.done:
+                break
+            scanner.feed(chunk)
+        return scanner
+
+    def replace_literal(self, start: int, value: bytes) -> None:
+        """Swap the scalar literal at absolute offset ``start`` for ``value``.
+
+        Only valid once the body is complete; the chunks collapse into one.
+        """
+
+        raw = b"".join(self._chunks)
+        m = _LITERAL_END.search(raw, start)
+        end = m.start() if m is not None else len(raw)
+        rewritten = raw[:start] + value + raw[end:]
+        self._chunks = [rewritten]
+        self.size = len(rewritten)
+
+    async def replay(self) -> AsyncIterator[bytes]:
+        index = 0
+        while True:
+            if index < len(self._chunks):
+                chunk = self._chunks[index]
+                index += 1
+                yield chunk
+                continue
+            if not await self._pull() and index >= len(self._chunks):
+                return
+
+    def headers(self, base: Dict[str, str]) -> Dict[str, str]:
+        """Forwarding headers with ``Content-Length`` when the size is known."""
+
+        headers = dict(base)
+        length = self.content_length
+        if length is not None:
+            headers["Content-Length"] = str(length)
+        return headers
+
+    def guard_receive(self, receive: Any) -> Any:
+        """Wrap an ASGI ``receive`` so it only runs once the body is fully read.
+
+        The disconnect watchers and the body reader share one channel. The
+        wrapper finishes reading the upload itself (chunks stay replayable), so
+        a watcher never swallows ``http.request`` messages, and a client that
+        leaves mid-upload is reported as ``http.disconnect``.
+        """
+
+        async def _receive() -> Any:
+            try:
+                while await self._pull():
+                    pass
+            except ClientDisconnect:
+                return {"type": "http.disconnect"}
+            except Exception:
+                # The request path reports body errors; there is nothing to watch.
+                await asyncio.Event().wait()
+            return await receive()
+
+        return _receive
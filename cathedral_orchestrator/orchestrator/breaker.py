@@ -0,0 +1,263 @@
+"""Per-host circuit breakers fed by live traffic.
+
+Active ``/v1/models`` probes only show that a host answers its catalog. A host
+that accepts connections but answers chat with 5xx, times out, or stalls
+mid-stream still looks healthy to them. Every chat attempt, embeddings call,
+and catalog probe therefore reports its outcome here:
+
+- ``closed``: traffic flows. The circuit opens after ``CONSECUTIVE_FAILURES``
+  failures in a row, or when at least ``MIN_SAMPLES`` outcomes within
+  ``WINDOW_SECONDS`` show an error rate of ``ERROR_RATE`` or more.
+- ``open``: routing skips the host for ``OPEN_SECONDS``, doubling per
+  consecutive trip up to ``OPEN_MAX_SECONDS``.
+- ``half_open``: one trial request at a time may use the host. Routing
+  claims the trial when it picks the host (``TrialClaims``), so concurrent
+  requests go elsewhere; a claim whose request never reaches the host is
+  released. A traffic success closes the circuit, and a failure reopens it.
+
+Probe successes count toward the error rate but never reset the failure
+streak or close an open circuit, because a host that lists its models can
+still fail every generation.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, Optional, Tuple
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+# Outcome kinds.
+OK, ERROR, TIMEOUT, STALL = "ok", "error", "timeout", "stall"
+
+CONSECUTIVE_FAILURES = 3
+WINDOW_SIZE = 20
+WINDOW_SECONDS = 60.0
+MIN_SAMPLES = 8
+ERROR_RATE = 0.5
+OPEN_SECONDS = 10.0
+OPEN_MAX_SECONDS = 120.0
+# A half-open trial that never reports back frees the slot after this long.
+TRIAL_TIMEOUT_SECONDS = 30.0
+# Gap between upstream chunks, after the first byte, that counts as a stall.
+STALL_SECONDS = 30.0
+
+
+class CircuitBreaker:
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.open_for = 0.0
+        self.trips = 0
+        self.consecutive = 0
+        self.trial_started: Optional[float] = None
+        self.last_failure: Optional[str] = None
+        self.counts: Dict[str, int] = {OK: 0, ERROR: 0, TIMEOUT: 0, STALL: 0}
+        self._window: Deque[Tuple[float, bool]] = deque(maxlen=WINDOW_SIZE)
+
+    def tick(self) -> None:
+        """Move an open circuit to ``half_open`` once its open period has passed."""
+
+        if self.state == OPEN and self._clock() - self.opened_at >= self.open_for:
+            self.state = HALF_OPEN
+            self.trial_started = None
+
+    def available(self) -> bool:
+        """Whether routing may pick this host right now (does not claim the trial)."""
+
+        self.tick()
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return False
+        return self.trial_started is None or self._clock() - self.trial_started >= TRIAL_TIMEOUT_SECONDS
+
+    def claim(self) -> bool:
+        """Take the host for one request: always when closed, the free trial when half-open."""
+
+        if not self.available():
+            return False
+        if self.state == HALF_OPEN:
+            self.trial_started = self._clock()
+        return True
+
+    def release(self, started: float) -> None:
+        """Free the trial claimed at ``started`` when its request never reached the host."""
+
+        if self.state == HALF_OPEN and self.trial_started == started:
+            self.trial_started = None
+
+    def attempt(self) -> None:
+        """Note a request about to be sent; in ``half_open`` it becomes the trial."""
+
+        self.tick()
+        if self.state == HALF_OPEN and self.available():
+            self.trial_started = self._clock()
+
+    def record(self, kind: str, *, probe: bool = False) -> None:
+        now = self._clock()
+        self.tick()
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        ok = kind == OK
+        if ok and probe:
+            if self.state == CLOSED:
+                self._window.append((now, ok))
+            return
+        self._window.append((now, ok))
+        if ok:
+            self.consecutive = 0
+            if self.state == HALF_OPEN:
+                self.state = CLOSED
+                self.trips = 0
+                self.trial_started = None
+                self._window.clear()
+            return
+        self.consecutive += 1
+        self.last_failure = kind
+        if self.state == HALF_OPEN or (self.state == CLOSED and self._should_trip(now)):
+            self._trip(now)
+
+    def _should_trip(self, now: float) -> bool:
+        if self.consecutive >= CONSECUTIVE_FAILURES:
+            return True
+        recent = [ok for at, ok in self._window if now - at <= WINDOW_SECONDS]
+        if len(recent) < MIN_SAMPLES:
+            return False
+        return recent.count(False) / len(recent) >= ERROR_RATE
+
+    def _trip(self, now: float) -> None:
+        self.trips += 1
+        self.state = OPEN
+        self.opened_at = now
+        self.open_for = min(OPEN_MAX_SECONDS, OPEN_SECONDS * 2 ** (self.trips - 1))
+        self.trial_started = None
+
+    def snapshot(self) -> Dict[str, object]:
+        self.tick()
+        now = self._clock()
+        recent = [ok for at, ok in self._window if now - at <= WINDOW_SECONDS]
+        return {
+            "state": self.state,
+            "error_rate": round(recent.count(False) / len(recent), 2) if recent else 0.0,
+            "samples": len(recent),
+            "consecutive_failures": self.consecutive,
+            "trips": self.trips,
+            "retry_in_s": round(max(0.0, self.opened_at + self.open_for - now), 1)
+            if self.state == OPEN
+            else None,
+            "last_failure": self.last_failure,
+            "outcomes": dict(self.counts),
+        }
+
+
+class BreakerRegistry:
+    """One ``CircuitBreaker`` per host; ``on_change`` fires on every state change."""
+
+    def __init__(
+        self,
+        on_change: Optional[Callable[[str, str], None]] = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._clock = clock
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.on_change = on_change
+
+    def get(self, base: str) -> CircuitBreaker:
+        key = base.rstrip("/")
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(self._clock)
+            self._breakers[key] = breaker
+        return breaker
+
+    def _watch(self, base: str, breaker: CircuitBreaker, before: str) -> None:
+        if breaker.state != before and self.on_change is not None:
+            self.on_change(base.rstrip("/"), breaker.state)
+
+    def state(self, base: str) -> str:
+        breaker = self.get(base)
+        before = breaker.state
+        breaker.tick()
+        self._watch(base, breaker, before)
+        return breaker.state
+
+    def available(self, base: str) -> bool:
+        breaker = self.get(base)
+        before = breaker.state
+        result = breaker.available()
+        self._watch(base, breaker, before)
+        return result
+
+    def claim(self, base: str) -> bool:
+        breaker = self.get(base)
+        before = breaker.state
+        result = breaker.claim()
+        self._watch(base, breaker, before)
+        return result
+
+    def release(self, base: str, started: float) -> None:
+        self.get(base).release(started)
+
+    def attempt(self, base: str) -> None:
+        breaker = self.get(base)
+        before = breaker.state
+        breaker.attempt()
+        self._watch(base, breaker, before)
+
+    def record(self, base: str, kind: str, *, probe: bool = False) -> None:
+        breaker = self.get(base)
+        before = breaker.state
+        breaker.record(kind, probe=probe)
+        self._watch(base, breaker, before)
+
+    def forget(self, keep: Iterable[str]) -> None:
+        """Drop breakers for hosts that are no longer configured."""
+
+        current = {base.rstrip("/") for base in keep}
+        for base in [base for base in self._breakers if base not in current]:
+            del self._breakers[base]
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        for base in list(self._breakers):
+            self.state(base)
+        return {base: breaker.snapshot() for base, breaker in self._breakers.items()}
+
+
+class TrialClaims:
+    """Half-open trials one request claimed while routing.
+
+    ``take`` claims a host as it is chosen. ``sent`` keeps the trial once the
+    request goes out to that host; ``release`` gives back every other claim
+    (admission refused, client gone, or the request was served another way).
+    """
+
+    def __init__(self, registry: BreakerRegistry) -> None:
+        self._registry = registry
+        self._held: Dict[str, float] = {}
+
+    def take(self, base: str) -> bool:
+        """Claim ``base``; ``False`` when it is open or another request holds its trial."""
+
+        key = base.rstrip("/")
+        if key in self._held:
+            return True
+        if not self._registry.claim(key):
+            return False
+        breaker = self._registry.get(key)
+        if breaker.state == HALF_OPEN and breaker.trial_started is not None:
+            self._held[key] = breaker.trial_started
+        return True
+
+    def sent(self, base: str) -> None:
+        self._held.pop(base.rstrip("/"), None)
+
+    def release(self, base: Optional[str] = None) -> None:
+        """Give back the unsent claim on ``base``, or all of them."""
+
+        keys = [base.rstrip("/")] if base is not None else list(self._held)
+        for key in keys:
+            started = self._held.pop(key, None)
+            if started is not None:
+                self._registry.release(key, started)
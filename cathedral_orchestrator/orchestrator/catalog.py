@@ -0,0 +1,129 @@
+"""Immutable model catalog snapshots built from one probe of every LM host.
+
+``HostPool`` is the only writer: each refresh sends one ``/v1/models`` request
+per host and folds the answers into a new ``CatalogSnapshot``. The host ->
+models catalog, the merged model objects served by ``/v1/models``, per-host
+health, and the probe counts and errors all come from the same responses,
+so every reader sees one consistent view. A snapshot and the dicts it holds are
+never mutated after publication; readers may keep a reference without copying.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+ProbeError = Optional[Dict[str, str]]
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: int = 0
+    # ``time.monotonic()`` of the probe that produced it; 0 before the first probe.
+    refreshed_at: float = 0.0
+    # host -> model ids. A host that fails a probe keeps its last known models.
+    catalog: Dict[str, List[str]] = field(default_factory=dict)
+    # model id -> ``/v1/models`` object merged across hosts.
+    objects: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # host -> ``ok`` (answered with models) or ``down``.
+    health: Dict[str, str] = field(default_factory=dict)
+    counts: Dict[str, int] = field(default_factory=dict)
+    errors: Dict[str, ProbeError] = field(default_factory=dict)
+
+    def age(self) -> Optional[float]:
+        return time.monotonic() - self.refreshed_at if self.refreshed_at else None
+
+    def restrict(self, hosts: Sequence[str]) -> "CatalogSnapshot":
+        """Copy without hosts that are no longer configured."""
+
+        keep = set(hosts)
+        catalog = {base: models for base, models in self.catalog.items() if base in keep}
+        models = {mid for ids in catalog.values() for mid in ids}
+        return CatalogSnapshot(
+            version=self.version + 1,
+            refreshed_at=self.refreshed_at,
+            catalog=catalog,
+            objects={mid: obj for mid, obj in self.objects.items() if mid in models},
+            health={base: state for base, state in self.health.items() if base in keep},
+            counts={base: count for base, count in self.counts.items() if base in keep},
+            errors={base: error for base, error in self.errors.items() if base in keep},
+        )
+
+
+def build_snapshot(
+    previous: CatalogSnapshot,
+    hosts: Sequence[str],
+    results: Sequence[Union[List[Dict[str, Any]], BaseException]],
+    *,
+    configured: Optional[Sequence[str]] = None,
+    normalize: Optional[Callable[[Dict[str, Dict[str, Any]]], None]] = None,
+) -> CatalogSnapshot:
+    """Fold one probe round (``results[i]`` answers ``hosts[i]``) into a new snapshot.
+
+    ``configured`` lists every host in order when only some were probed; the
+    others carry their previous entries. Hosts that failed keep their previous
+    models and those models' objects, so an outage does not drop cached
+    metadata. ``normalize`` may add fields to the fresh merged objects before
+    they are published.
+    """
+
+    probed = dict(zip(hosts, results))
+    catalog: Dict[str, List[str]] = {}
+    fresh: Dict[str, Dict[str, Any]] = {}
+    health: Dict[str, str] = {}
+    counts: Dict[str, int] = {}
+    errors: Dict[str, ProbeError] = {}
+    answered = set()
+    for base in configured if configured is not None else hosts:
+        if base not in probed:
+            if base in previous.catalog:
+                catalog[base] = previous.catalog[base]
+            if base in previous.health:
+                health[base] = previous.health[base]
+            if base in previous.counts:
+                counts[base] = previous.counts[base]
+            if base in previous.errors:
+                errors[base] = previous.errors[base]
+            continue
+        result = probed[base]
+        if isinstance(result, BaseException):
+            message = str(result).strip() or repr(result)
+            errors[base] = {"error": message, "error_class": type(result).__name__}
+            counts[base] = 0
+            health[base] = "down"
+            if base in previous.catalog:
+                catalog[base] = previous.catalog[base]
+            continue
+        ids: List[str] = []
+        for obj in result:
+            mid = obj.get("id") or obj.get("name")
+            if not mid:
+                continue
+            mid_str = str(mid)
+            if mid_str not in ids:
+                ids.append(mid_str)
+            fresh.setdefault(mid_str, {}).update(obj)
+        answered.add(base)
+        catalog[base] = ids
+        counts[base] = len(ids)
+        errors[base] = None
+        health[base] = "ok" if ids else "down"
+    if normalize is not None and fresh:
+        normalize(fresh)
+    objects: Dict[str, Dict[str, Any]] = dict(fresh)
+    for base, ids in catalog.items():
+        if base in answered:
+            continue
+        for mid in ids:
+            if mid not in objects and mid in previous.objects:
+                objects[mid] = previous.objects[mid]
+    return CatalogSnapshot(
+        version=previous.version + 1,
+        refreshed_at=time.monotonic(),
+        catalog=catalog,
+        objects=objects,
+        health=health,
+        counts=counts,
+        errors=errors,
+    )
@@ -0,0 +1,135 @@
+"""Pre-encoded JSON responses with strong ETags for hot, read-mostly endpoints.
+
+``/v1/models`` and the ``/api/v0/models`` union only change when ``HostPool``
+publishes a new catalog snapshot, but clients poll them constantly. An
+``EncodedCache`` serializes the payload once per snapshot (keyed on the
+identity of the immutable objects it was built from), keeps a gzip copy of
+larger bodies, and answers ``If-None-Match`` with ``304`` so most polls cost a
+header comparison.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+# Bodies below this size are sent uncompressed; gzip would save almost nothing.
+GZIP_MIN_BYTES = 1024
+
+
+@dataclass(frozen=True)
+class EncodedBody:
+    body: bytes
+    etag: str
+    gzip_body: Optional[bytes] = None
+    gzip_etag: Optional[str] = None
+
+
+def encode_json(payload: Any) -> EncodedBody:
+    """Encode ``payload`` exactly as ``JSONResponse`` would, plus its ETags."""
+
+    body = json.dumps(
+        payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+    digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+    if len(body) < GZIP_MIN_BYTES:
+        return EncodedBody(body, f'"{digest}"')
+    # mtime=0 keeps the compressed bytes, and so the ETag, stable across rebuilds.
+    return EncodedBody(body, f'"{digest}"', gzip.compress(body, mtime=0), f'"{digest}-gzip"')
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """``If-None-Match`` uses weak comparison, so ``W/`` prefixes are ignored."""
+
+    if not header:
+        return False
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def accepts_gzip(header: Optional[str]) -> bool:
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() != "gzip":
+            continue
+        quality = params.strip()
+        return not (quality.startswith("q=") and quality[2:].strip() in ("0", "0.0", "0.00", "0.000"))
+    return False
+
+
+class EncodedCache:
+    """One pre-encoded body, rebuilt whenever its source objects are replaced."""
+
+    def __init__(self) -> None:
+        self._key: Tuple[object, ...] = ()
+        self._encoded: Optional[EncodedBody] = None
+        self.builds = 0
+        self.served = 0
+        self.not_modified = 0
+        self.gzip_served = 0
+
+    def get(self, key: Sequence[object], build: Callable[[], Any]) -> EncodedBody:
+        cached = self._encoded
+        if (
+            cached is None
+            or len(key) != len(self._key)
+            or any(new is not old for new, old in zip(key, self._key))
+        ):
+            cached = encode_json(build())
+            self._encoded = cached
+            self._key = tuple(key)
+            self.builds += 1
+        return cached
+
+    def respond(
+        self,
+        request: Request,
+        key: Sequence[object],
+        build: Callable[[], Any],
+        *,
+        media_type: str = "application/json",
+    ) -> Response:
+        """Serve the cached body for ``key``, or ``304`` when the client already has it."""
+
+        encoded = self.get(key, build)
+        headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        body, etag, gzipped = encoded.body, encoded.etag, False
+        if (
+            encoded.gzip_body is not None
+            and encoded.gzip_etag is not None
+            and accepts_gzip(request.headers.get("accept-encoding"))
+        ):
+            body, etag, gzipped = encoded.gzip_body, encoded.gzip_etag, True
+        headers["ETag"] = etag
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        self.served += 1
+        if gzipped:
+            self.gzip_served += 1
+            headers["Content-Encoding"] = "gzip"
+        return Response(content=body, media_type=media_type, headers=headers)
+
+    def snapshot(self) -> Dict[str, Any]:
+        encoded = self._encoded
+        return {
+            "builds": self.builds,
+            "served": self.served,
+            "not_modified": self.not_modified,
+            "gzip_served": self.gzip_served,
+            "bytes": len(encoded.body) if encoded is not None else 0,
+            "gzip_bytes": len(encoded.gzip_body) if encoded is not None and encoded.gzip_body else 0,
+        }
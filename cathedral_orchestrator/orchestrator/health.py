@@ -0,0 +1,48 @@
+"""Readiness snapshot served by ``/health`` and ``/api/status``.
+
+The bootstrap loop does the expensive checks (host probes, the Chroma
+heartbeat, the SQLite session count) once per cycle and publishes a frozen
+``HealthSnapshot``. Request handlers only read the current reference, so a
+poll costs no I/O however often Home Assistant or the Supervisor watchdog
+asks; ``age`` tells callers how old the answer is.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+
+@dataclass(frozen=True)
+class HealthSnapshot:
+    ready: bool = False
+    lm_ready: bool = False
+    chroma_ready: bool = False
+    sessions_active: int = 0
+    # host -> models reported by its last probe (0 when it failed).
+    lm_hosts: Dict[str, int] = field(default_factory=dict)
+    # ``time.monotonic()`` of the publication; 0 until the first bootstrap pass.
+    updated_at: float = 0.0
+    updated_ts: Optional[str] = None
+
+    def age(self) -> Optional[float]:
+        return time.monotonic() - self.updated_at if self.updated_at else None
+
+    def freshness(self) -> Dict[str, Any]:
+        age = self.age()
+        return {
+            "age_s": round(age, 3) if age is not None else None,
+            "updated_at": self.updated_ts,
+        }
+
+
+def stamp(**fields: Any) -> HealthSnapshot:
+    """Build a snapshot stamped with the current time."""
+
+    return HealthSnapshot(
+        updated_at=time.monotonic(),
+        updated_ts=datetime.utcnow().isoformat() + "Z",
+        **fields,
+    )
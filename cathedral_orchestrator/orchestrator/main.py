@@ -1,26 +1,105 @@
 import asyncio
+import functools
 import json
 import os
 import threading
+import time
 from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, cast
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
 import uuid
+from dataclasses import replace
 import httpx
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from starlette.responses import JSONResponse, Response
-from starlette.responses import PlainTextResponse  # noqa: F401
+from starlette.responses import PlainTextResponse
 
-from pydantic import BaseModel, Field, ValidationError
+from pydantic import BaseModel, Field, ValidationError, field_validator
 
 from . import sessions
 from .logging_config import jlog, setup_logging
-from .mpc_server import MPCServer, get_server, router as mpc_router, set_server
+from .mpc_server import RESOURCE_FEED, MPCServer, get_server, router as mpc_router, set_server
+from .body import DEFAULT_MAX_BODY_BYTES, RequestBodyTooLarge, StreamedBody
+from .admission import (
+    BULK,
+    DEFAULT_AGING_SECONDS,
+    DEFAULT_HOST_CONCURRENCY,
+    DEFAULT_QUEUE_SIZE,
+    DEFAULT_QUEUE_TIMEOUT_SECONDS,
+    DEFAULT_RESERVED_SLOTS,
+    PRIORITIES,
+    STANDARD,
+    AdmissionController,
+    AdmissionRejected,
+    Lease,
+    parse_priority,
+)
+from .breaker import (
+    CLOSED as CIRCUIT_CLOSED,
+    ERROR as CIRCUIT_ERROR,
+    OK as CIRCUIT_OK,
+    OPEN as CIRCUIT_OPEN,
+    STALL as CIRCUIT_STALL,
+    STALL_SECONDS,
+    TIMEOUT as CIRCUIT_TIMEOUT,
+    BreakerRegistry,
+    TrialClaims,
+)
+from .catalog import CatalogSnapshot, build_snapshot
+from .encoded import EncodedCache
+from .health import HealthSnapshot, stamp as stamp_health
+from .metrics import RelayMetrics, RelayTiming
+from .relay import (
+    HEDGE_STATS,
+    RELAY_STATS,
+    Receive,
+    RelayStream,
+    UpstreamStream,
+    UpstreamUnavailable,
+    open_upstream_stream,
+)
+from .response_cache import (
+    DEFAULT_CACHE_MB,
+    DEFAULT_TTL_SECONDS,
+    CachedResponse,
+    ResponseCache,
+    cache_key,
+    credential_scope,
+)
+from .singleflight import Flight, SingleFlight, Subscription
+from .sse import SSE_DONE, SSEFramer
+from .swr_cache import StaleWhileRevalidate
+from .routing import (
+    DEFAULT_POLICY,
+    HostStatsRegistry,
+    POLICY_NAMES,
+    PolicyName,
+    PrefixAffinity,
+    RoutingPolicy,
+    build_policy,
+)
+from .preflight import (
+    MIN_COMPLETION_TOKENS,
+    PreflightStats,
+    context_length_error,
+    count_image_parts,
+    estimate_tokens,
+    exceeds_window,
+    token_ceiling,
+)
 from .toolbridge import ToolBridge
+from .usage import SCOPES as USAGE_SCOPES, UsageLedger, UsageTap
 from .vector.chroma_client import ChromaClient, ChromaConfig
+from .probes import ProbeScheduler
+from .warmup import (
+    DEFAULT_KEEP_WARM_INTERVAL_SECONDS,
+    MAX_KEEP_WARM_INTERVAL_SECONDS,
+    MIN_KEEP_WARM_INTERVAL_SECONDS,
+    WarmupScheduler,
+)
 
 logger = setup_logging(os.environ.get("LOG_LEVEL", "INFO"))
 
@@ -28,13 +107,19 @@ APP_CLIENTS: Dict[str, httpx.AsyncClient] = {}
 OPTIONS_PATH = Path(os.environ.get("CATHEDRAL_OPTIONS_PATH", "/data/options.json"))
 OPTIONS_LOCK = asyncio.Lock()
 
-# Cache of upstream model object payloads keyed by model id.
-# Consumers rely on mutation-in-place semantics.
+# Views of the current catalog snapshot, rebound (never mutated) by ``_adopt_catalog``
+# each time ``HOST_POOL`` publishes: model id -> upstream model object, host -> model
+# ids, and host -> ``ok``/``down``.
 MODEL_OBJECTS: Dict[str, Dict[str, Any]] = {}
+MODEL_CATALOG: Dict[str, List[str]] = {}
+HOST_HEALTH: Dict[str, str] = {}
 
 # Cathedral session binding headers
 SESSION_HEADER = "X-Cathedral-Session"
+HEDGE_HEADER = "X-Cathedral-Hedge"
+CACHE_HEADER = "X-Cathedral-Cache"
 WORKSPACE_HEADER = "X-Cathedral-Workspace"
+PRIORITY_HEADER = "X-Cathedral-Priority"
 
 
 async def _mint_session_token(workspace_id: str) -> str:
@@ -118,9 +203,12 @@ def _normalize_model_token_limits(cache: Dict[str, Dict[str, Any]]) -> None:
             if isinstance(raw, str) and raw.isdigit():
                 context_value = int(raw)
                 break
+        source = "reported"
         if context_value is None:
             context_value = infer_default(model_id)
+            source = "default"
         meta["context_window"] = int(context_value)
+        meta["context_window_source"] = source
 
 
 def _normalize_lm_hosts(raw: Any) -> Dict[str, str]:
@@ -173,7 +261,12 @@ def persist_options_to_disk(options: Dict[str, Any]) -> None:
         print(f"[orchestrator] Failed to persist options: {exc}")
         raise
 
-async def list_models_from_host(client: httpx.AsyncClient, base: str) -> Tuple[str, List[Dict[str, Any]]]:
+async def list_models_from_host(
+    client: httpx.AsyncClient,
+    base: str,
+    *,
+    timeout: Optional[httpx.Timeout] = None,
+) -> Tuple[str, List[Dict[str, Any]]]:
     """
     Query <base>/v1/models and return the raw 'data' list items unmodified.
     This preserves LM Studio metadata (e.g., context_length) for UI auto-detection.
@@ -184,7 +277,7 @@ async def list_models_from_host(client: httpx.AsyncClient, base: str) -> Tuple[s
         url,
         headers={"Accept": "application/json"},
         follow_redirects=True,
-        timeout=httpx.Timeout(connect=5.0, read=5.0, write=5.0, pool=5.0),
+        timeout=timeout or httpx.Timeout(connect=5.0, read=5.0, write=5.0, pool=5.0),
     )
     resp.raise_for_status()
     payload = resp.json()
@@ -205,45 +298,186 @@ async def list_models_from_host(client: httpx.AsyncClient, base: str) -> Tuple[s
     return base_clean, items
 
 
-def build_model_index(
-    host_models: List[Tuple[str, List[Dict[str, Any]]]],
-) -> Dict[str, str]:
-    index: Dict[str, str] = {}
-    for base, models in host_models:
-        for model in models:
-            model_id = model.get("id") or model.get("name")
-            if not model_id:
-                continue
-            if model_id not in index:
-                index[model_id] = base
-    return index
+# Per-host upstream pool sizing. Keep-alive connections are reused across chat,
+# embeddings, probes and catalog refreshes so only the first call pays the handshake.
+UPSTREAM_MAX_CONNECTIONS_PER_HOST = 64
+UPSTREAM_MAX_KEEPALIVE_PER_HOST = 16
+UPSTREAM_KEEPALIVE_EXPIRY_SECONDS = 60.0
+# Chat streams stay open until the model finishes, but a dead host must fail fast.
+CHAT_UPSTREAM_TIMEOUT = httpx.Timeout(None, connect=5.0)
+
+
+class UpstreamPool:
+    """Own one long-lived, keep-alive HTTPX client per LM host.
+
+    Each host gets its own connection pool so a stalled host can only exhaust its
+    own limits and never poisons the connections used for the other hosts.
+    Clients default to ``Timeout(None)`` for streaming; bounded calls such as
+    probes pass explicit per-request timeouts.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_connections: int = UPSTREAM_MAX_CONNECTIONS_PER_HOST,
+        max_keepalive_connections: int = UPSTREAM_MAX_KEEPALIVE_PER_HOST,
+        keepalive_expiry: float = UPSTREAM_KEEPALIVE_EXPIRY_SECONDS,
+    ) -> None:
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def client_for(self, base: str) -> httpx.AsyncClient:
+        key = str(base).strip().rstrip("/")
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(None),
+                limits=self._limits,
+                http2=False,
+            )
+            self._clients[key] = client
+            jlog(logger, event="upstream_pool_client_opened", host=key)
+        return client
+
+    async def sync_hosts(self, bases: List[str]) -> None:
+        """Close pooled clients for hosts that are no longer configured."""
+
+        keep = {str(base).strip().rstrip("/") for base in bases}
+        stale = [key for key in self._clients if key not in keep]
+        for key in stale:
+            client = self._clients.pop(key)
+            try:
+                await client.aclose()
+            except Exception as exc:  # pragma: no cover - cleanup guard
+                jlog(logger, level="WARN", event="upstream_pool_close_failed", host=key, error=str(exc))
+            jlog(logger, event="upstream_pool_client_closed", host=key)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "hosts": sorted(self._clients.keys()),
+            "max_connections_per_host": self._limits.max_connections,
+            "max_keepalive_per_host": self._limits.max_keepalive_connections,
+        }
+
+    async def aclose(self) -> None:
+        clients = list(self._clients.values())
+        self._clients.clear()
+        await asyncio.gather(
+            *(client.aclose() for client in clients), return_exceptions=True
+        )
+        jlog(logger, event="upstream_pool_closed", hosts=len(clients))
+
+
+UPSTREAM_POOL = UpstreamPool()
 
 
 class HostPool:
-    def __init__(self, hosts: Dict[str, str]):
+    """Single writer of the model catalog.
+
+    ``refresh`` probes every host once and publishes a new ``CatalogSnapshot``;
+    ``probe_due`` probes only the hosts whose ``ProbeScheduler`` slot has come
+    up. ``on_publish`` lets the module-level views follow each publication.
+    """
+
+    def __init__(
+        self,
+        hosts: Dict[str, str],
+        on_publish: Optional[Callable[[CatalogSnapshot], None]] = None,
+    ):
         self._hosts: Dict[str, str] = {}
-        self._catalog: Dict[str, List[str]] = {}
+        self._snapshot = CatalogSnapshot()
+        self._on_publish = on_publish
+        # Routing liveness: follows each probe, and relay failures take a host out early.
         self._alive: Dict[str, bool] = {}
-        self._last_counts: Dict[str, int] = {}
-        self._last_errors: Dict[str, Optional[Dict[str, str]]] = {}
-        self._lock = asyncio.Lock()
+        # Versioned model -> hosts routing index rebuilt whenever the catalog changes.
+        self._model_index: Dict[str, Tuple[str, ...]] = {}
+        self._index_version = 0
+        self._refresh_task: Optional["asyncio.Task[Dict[str, int]]"] = None
+        self.schedule = ProbeScheduler()
         self.update_hosts(hosts)
 
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        return self._snapshot
+
     def update_hosts(self, hosts: Dict[str, str]) -> None:
         normalized: Dict[str, str] = {}
         for key, value in (hosts or {}).items():
             base = str(value).strip().rstrip("/")
             normalized[str(key)] = base
         self._hosts = normalized
-        for base in list(self._alive.keys()):
-            if base not in self._hosts.values():
-                self._alive.pop(base, None)
-                self._last_counts.pop(base, None)
-                self._last_errors.pop(base, None)
-        for base in self._hosts.values():
-            self._alive.setdefault(base, False)
-            self._last_counts.setdefault(base, 0)
-            self._last_errors.setdefault(base, None)
+        configured = self.list_hosts()
+        self._alive = {base: self._alive.get(base, False) for base in configured}
+        self.schedule.sync(configured)
+        BREAKERS.forget(configured)
+        stale = set(self._snapshot.catalog) | set(self._snapshot.health)
+        if stale - set(configured):
+            self._publish(self._snapshot.restrict(configured))
+        else:
+            self._rebuild_index()
+
+    def _publish(self, snapshot: CatalogSnapshot) -> None:
+        self._snapshot = snapshot
+        self._rebuild_index()
+        if self._on_publish is not None:
+            self._on_publish(snapshot)
+
+    def _rebuild_index(self) -> None:
+        """Rebuild the model -> hosts index in configured host order.
+
+        Runs synchronously on the event loop after every catalog change so readers
+        always observe a complete index; the version only moves when routing changes.
+        """
+
+        index: Dict[str, List[str]] = {}
+        catalog = self._snapshot.catalog
+        for base in self.list_hosts():
+            for model_id in catalog.get(base, []):
+                hosts = index.setdefault(model_id, [])
+                if base not in hosts:
+                    hosts.append(base)
+        frozen = {model_id: tuple(hosts) for model_id, hosts in index.items()}
+        if frozen != self._model_index:
+            self._model_index = frozen
+            self._index_version += 1
+            jlog(
+                logger,
+                event="routing_index_rebuilt",
+                version=self._index_version,
+                models=len(frozen),
+            )
+
+    def hosts_for_model(self, model_id: str) -> Tuple[str, ...]:
+        return self._model_index.get(model_id, ())
+
+    def is_alive(self, base: str) -> bool:
+        return bool(self._alive.get(base.rstrip("/")))
+
+    def mark_failed(self, base: str, error: str) -> None:
+        """Take a host out of routing after a relay failure until it probes healthy."""
+
+        key = base.rstrip("/")
+        if key not in self._alive:
+            return
+        was_alive = self._alive[key]
+        self._alive[key] = False
+        if was_alive:
+            jlog(logger, level="WARN", event="hostpool_host_marked_down", host=key, error=error)
+            # Confirm (or clear) the failure with an early probe instead of
+            # waiting out the host's possibly stretched interval.
+            self.schedule.expedite(key)
+
+    def index_snapshot(self) -> Dict[str, Any]:
+        return {
+            "version": self._index_version,
+            "models": len(self._model_index),
+            "catalog_version": self._snapshot.version,
+            "catalog_age_s": round(age, 1) if (age := self._snapshot.age()) is not None else None,
+        }
 
     def list_hosts(self) -> List[str]:
         return [host.rstrip("/") for host in self._hosts.values()]
@@ -258,96 +492,88 @@ class HostPool:
         return [host for host, alive in self._alive.items() if alive]
 
     async def refresh(self) -> Dict[str, int]:
-        """Probe all hosts with a short connect timeout and track readiness, in parallel."""
-
-        if not self._hosts:
-            async with self._lock:
-                self._catalog = {}
-                self._last_counts = {}
-                self._last_errors = {}
-            self._alive = {}
-            jlog(logger, level="DEBUG", event="hostpool_refresh", hosts=0)
-            return {}
-
-        timeout = httpx.Timeout(connect=1.5, read=5.0, write=5.0, pool=None)
-        counts: Dict[str, int] = {}
-        errors: Dict[str, Optional[Dict[str, str]]] = {}
-        results: Dict[str, List[str]] = {}
-
-        async def probe(base: str) -> Tuple[str, List[str]]:
-            async with httpx.AsyncClient(timeout=timeout, http2=False) as client:
-                resp = await client.get(
-                    f"{base}/v1/models",
-                    headers={"Accept": "application/json"},
-                    follow_redirects=True,
-                )
-            resp.raise_for_status()
-            payload = resp.json()
-            data = payload.get("data") if isinstance(payload, dict) else None
-            items = data if isinstance(data, list) else []
-            models: List[str] = []
-            for item in items:
-                if isinstance(item, dict):
-                    mid = item.get("id") or item.get("name")
-                    if mid:
-                        models.append(str(mid))
-            return base, models
-
-        bases = self.list_hosts()
-        tasks = [probe(base) for base in bases]
-        responses = await asyncio.gather(*tasks, return_exceptions=True)
-        for base, resp in zip(bases, responses):
-            try:
-                if isinstance(resp, BaseException):
-                    raise resp
-                _, models = resp
-                counts[base] = len(models)
-                results[base] = models
-                self._alive[base] = len(models) > 0
-                errors[base] = None
-                jlog(
-                    logger,
-                    level="DEBUG",
-                    event="hostpool_probe_ok",
-                    host=base,
-                    models=len(models),
-                )
-            except Exception as exc:
-                counts[base] = 0
-                self._alive[base] = False
-                message = str(exc).strip()
-                if not message:
-                    message = repr(exc)
-                errors[base] = {
-                    "error": message,
-                    "error_class": type(exc).__name__,
-                }
-                jlog(
-                    logger,
-                    level="WARN",
-                    event="hostpool_refresh_failed",
-                    host=base,
-                    error=message,
-                    error_class=type(exc).__name__,
-                )
-        async with self._lock:
-            for base, models in results.items():
-                self._catalog[base] = models
-            for base in list(self._catalog.keys()):
-                if base not in counts:
-                    self._catalog.pop(base, None)
-            self._last_counts = dict(counts)
-            self._last_errors = dict(errors)
-        jlog(logger, event="hostpool_refreshed", counts=counts)
-        return counts
+        """Probe all hosts, coalescing concurrent callers onto one in-flight refresh."""
+
+        task = self._refresh_task
+        if task is None or task.done():
+            task = asyncio.get_running_loop().create_task(self._probe(self.list_hosts()))
+            self._refresh_task = task
+        return await asyncio.shield(task)
+
+    async def refresh_if_stale(self, min_interval: float) -> Dict[str, int]:
+        """Refresh unless a probe finished within ``min_interval`` seconds."""
+
+        task = self._refresh_task
+        if task is not None and not task.done():
+            return await asyncio.shield(task)
+        age = self._snapshot.age()
+        if age is not None and age < min_interval:
+            return dict(self._snapshot.counts)
+        return await self.refresh()
+
+    async def probe_due(self) -> List[str]:
+        """Probe the hosts the scheduler says are due; returns the hosts probed."""
+
+        task = self._refresh_task
+        if task is not None and not task.done():
+            await asyncio.shield(task)
+        bases = self.schedule.due()
+        if bases:
+            await self._probe(bases)
+        return bases
+
+    async def _probe(self, bases: List[str]) -> Dict[str, int]:
+        """Send one ``/v1/models`` probe to each of ``bases`` in parallel and publish the result."""
+
+        # Bounded timeouts on the pooled clients keep a misbehaving host from
+        # stalling the bootstrap loop.
+        timeout = httpx.Timeout(connect=1.5, read=5.0, write=5.0, pool=5.0)
+
+        async def probe(base: str) -> List[Dict[str, Any]]:
+            _, items = await list_models_from_host(UPSTREAM_POOL.client_for(base), base, timeout=timeout)
+            return items
+
+        results = await asyncio.gather(*(probe(base) for base in bases), return_exceptions=True)
+        previous = self._snapshot
+        snapshot = build_snapshot(
+            previous,
+            bases,
+            results,
+            configured=self.list_hosts(),
+            normalize=_normalize_model_token_limits,
+        )
+        for base, result in zip(bases, results):
+            ok = not isinstance(result, BaseException)
+            if isinstance(result, BaseException):
+                BREAKERS.record(base, _failure_kind(result), probe=True)
+            else:
+                BREAKERS.record(base, CIRCUIT_OK, probe=True)
+            self._alive[base] = snapshot.health.get(base) == "ok"
+            self.schedule.record(
+                base, ok, changed=snapshot.catalog.get(base) != previous.catalog.get(base)
+            )
+            error = snapshot.errors.get(base)
+            if error:
+                jlog(logger, level="WARN", event="hostpool_refresh_failed", host=base, **error)
+            else:
+                jlog(logger, level="DEBUG", event="hostpool_probe_ok", host=base, models=snapshot.counts[base])
+        self._publish(snapshot)
+        jlog(
+            logger,
+            event="hostpool_refreshed",
+            probed=bases,
+            counts=snapshot.counts,
+            models=len(snapshot.objects),
+            version=snapshot.version,
+        )
+        return dict(snapshot.counts)
 
     async def get_last_probe(self) -> Tuple[Dict[str, int], Dict[str, Optional[Dict[str, str]]]]:
-        async with self._lock:
-            return dict(self._last_counts), dict(self._last_errors)
+        snapshot = self._snapshot
+        return dict(snapshot.counts), dict(snapshot.errors)
 
     async def get_catalog(self) -> Dict[str, List[str]]:
-        async with self._lock:
-            return {base: list(models) for base, models in self._catalog.items()}
+        return {base: list(models) for base, models in self._snapshot.catalog.items()}
 
     def is_ready(self) -> bool:
         return self.any_alive()
@@ -381,14 +607,66 @@ class OptionsModel(BaseModel):
     lock_VECTOR_DB: bool = False
     auto_config_active: bool = False
     upserts_active: bool = False
+    routing_policy: PolicyName = DEFAULT_POLICY
+    host_weights: Dict[str, int] = Field(default_factory=dict)
+    sse_flush_ms: int = 10
+    max_body_mb: int = DEFAULT_MAX_BODY_BYTES // (1024 * 1024)
+    failover_attempts: int = 2
+    max_concurrent_per_host: int = DEFAULT_HOST_CONCURRENCY
+    model_max_concurrency: Dict[str, int] = Field(default_factory=dict)
+    priority_workspaces: Dict[str, str] = Field(default_factory=dict)
+    priority_reserved_slots: int = DEFAULT_RESERVED_SLOTS
+    priority_aging_s: int = int(DEFAULT_AGING_SECONDS)
+    admission_queue_size: int = DEFAULT_QUEUE_SIZE
+    admission_queue_timeout_s: int = int(DEFAULT_QUEUE_TIMEOUT_SECONDS)
+    hedge_percentile: int = 95
+    hedge_models: List[str] = Field(default_factory=list)
+    response_cache_models: List[str] = Field(default_factory=list)
+    response_cache_mb: int = DEFAULT_CACHE_MB
+    response_cache_ttl_s: int = DEFAULT_TTL_SECONDS
+    response_cache_disk_mb: int = 0
+    coalesce_identical: bool = True
+    prefix_affinity: bool = False
+    prefix_affinity_chars: int = 2048
+    context_preflight: bool = True
+    warmup_on_session: bool = True
+    keep_warm_models: List[str] = Field(default_factory=list)
+    keep_warm_interval_s: int = DEFAULT_KEEP_WARM_INTERVAL_SECONDS
+
+    @field_validator("routing_policy", mode="before")
+    @classmethod
+    def _normalize_routing_policy(cls, value: Any) -> Any:
+        if value is None or value == "":
+            return DEFAULT_POLICY
+        return value.strip().lower() if isinstance(value, str) else value
 
 
 DEFAULT_OPTIONS = OptionsModel().model_dump()
 
+
+def _validate_startup_options(options: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate options read from disk, resetting invalid fields to their defaults."""
+
+    merged = {**DEFAULT_OPTIONS, **options}
+    try:
+        return OptionsModel(**merged).model_dump()
+    except ValidationError as exc:
+        invalid = {str(error["loc"][0]) for error in exc.errors() if error.get("loc")}
+        jlog(
+            logger,
+            level="ERROR",
+            event="options_validation_failed",
+            fields=sorted(invalid),
+            error=str(exc),
+        )
+        for field in invalid:
+            merged[field] = DEFAULT_OPTIONS.get(field)
+        return OptionsModel(**merged).model_dump()
+
+
 CURRENT_OPTIONS = load_options_from_disk()
 if CURRENT_OPTIONS:
-    merged = {**DEFAULT_OPTIONS, **CURRENT_OPTIONS}
-    CURRENT_OPTIONS = OptionsModel(**merged).model_dump()
+    CURRENT_OPTIONS = _validate_startup_options(CURRENT_OPTIONS)
 else:
     CURRENT_OPTIONS = dict(DEFAULT_OPTIONS)
 
@@ -407,11 +685,160 @@ UPSERTS_REQUESTED: bool = bool(CURRENT_OPTIONS.get("upserts_enabled", True))
 AUTO_CONFIG_ACTIVE: bool = False
 UPSERTS_ACTIVE: bool = False
 
-HOST_POOL: Optional[HostPool] = HostPool(LM_HOSTS)
+# Per-host circuit breakers fed by chat, embeddings and probe outcomes.
+BREAKERS = BreakerRegistry()
+
+
+def _circuit_health(health: Dict[str, str]) -> Dict[str, str]:
+    """Overlay open and half-open circuits on the probe-derived host health."""
+
+    overlaid = dict(health)
+    for base, state in health.items():
+        circuit = BREAKERS.get(base).state
+        if state == "ok" and circuit != CIRCUIT_CLOSED:
+            overlaid[base] = f"circuit_{circuit}"
+    return overlaid
+
+
+def _adopt_catalog(snapshot: CatalogSnapshot) -> None:
+    global MODEL_OBJECTS, MODEL_CATALOG, HOST_HEALTH
+    MODEL_OBJECTS = snapshot.objects
+    MODEL_CATALOG = snapshot.catalog
+    HOST_HEALTH = _circuit_health(snapshot.health)
+    RESOURCE_FEED.publish(MODEL_CATALOG, HOST_HEALTH)
+
+
+def _on_circuit_change(base: str, state: str) -> None:
+    global HOST_HEALTH
+    breaker = BREAKERS.get(base)
+    jlog(
+        logger,
+        level="WARN" if state == CIRCUIT_OPEN else "INFO",
+        event="circuit_state_changed",
+        host=base,
+        state=state,
+        trips=breaker.trips,
+        last_failure=breaker.last_failure,
+    )
+    if HOST_POOL is not None:
+        HOST_HEALTH = _circuit_health(HOST_POOL.snapshot.health)
+        RESOURCE_FEED.publish(MODEL_CATALOG, HOST_HEALTH)
+
+
+def _failure_kind(exc: BaseException) -> str:
+    cause = exc.__cause__ if isinstance(exc, UpstreamUnavailable) else exc
+    return CIRCUIT_TIMEOUT if isinstance(cause, httpx.TimeoutException) else CIRCUIT_ERROR
+
+
+def _record_stream_outcome(upstream: UpstreamStream) -> None:
+    """Report a closed chat stream to its host's breaker."""
+
+    if upstream.error is not None:
+        kind = _failure_kind(upstream.error)
+    elif upstream.stalled(STALL_SECONDS):
+        kind = CIRCUIT_STALL
+    else:
+        kind = CIRCUIT_OK
+    BREAKERS.record(upstream.base, kind)
+
+
+BREAKERS.on_change = _on_circuit_change
+
+
+HOST_POOL: Optional[HostPool] = HostPool(LM_HOSTS, on_publish=_adopt_catalog)
+# Per-host in-flight and TTFT counters kept by the relay and read by the policy.
+HOST_STATS = HostStatsRegistry()
+ROUTING_POLICY_WEIGHTS: Dict[str, int] = dict(CURRENT_OPTIONS.get("host_weights") or {})
+ROUTING_POLICY: RoutingPolicy = build_policy(
+    CURRENT_OPTIONS.get("routing_policy"), ROUTING_POLICY_WEIGHTS
+)
+# Longest a relayed SSE event may wait to be coalesced with the next ones.
+SSE_FLUSH_INTERVAL_SECONDS: float = max(0, int(CURRENT_OPTIONS.get("sse_flush_ms", 10))) / 1000.0
+MAX_REQUEST_BODY_BYTES: int = max(1, int(CURRENT_OPTIONS.get("max_body_mb", 32))) * 1024 * 1024
+# Hosts tried per chat request before the first upstream byte (1 disables failover).
+FAILOVER_MAX_ATTEMPTS: int = max(1, int(CURRENT_OPTIONS.get("failover_attempts", 2)))
+# Requests sharing a prompt prefix prefer the same host (consistent hashing
+# with bounded loads) so its KV cache can be reused.
+PREFIX_AFFINITY_ENABLED: bool = bool(CURRENT_OPTIONS.get("prefix_affinity", False))
+PREFIX_AFFINITY_CHARS: int = max(64, int(CURRENT_OPTIONS.get("prefix_affinity_chars", 2048)))
+PREFIX_AFFINITY = PrefixAffinity()
+# Reject or clamp chat requests that cannot fit the model's reported window.
+CONTEXT_PREFLIGHT: bool = bool(CURRENT_OPTIONS.get("context_preflight", True))
+PREFLIGHT_STATS = PreflightStats()
+# Hedged chat requests start a second host once the primary's first byte is
+# later than this percentile of its recent TTFT samples.
+HEDGE_PERCENTILE: int = min(99, max(50, int(CURRENT_OPTIONS.get("hedge_percentile", 95))))
+HEDGE_MODELS: frozenset = frozenset(CURRENT_OPTIONS.get("hedge_models") or [])
+HEDGE_MIN_DELAY_SECONDS = 0.05
+# Used until a host has enough TTFT samples for a percentile.
+HEDGE_DEFAULT_DELAY_SECONDS = 1.0
+# Generation slots per LM host; requests beyond them queue with a bounded wait.
+ADMISSION = AdmissionController()
+
+
+def _configure_admission(options: Dict[str, Any]) -> None:
+    global PRIORITY_WORKSPACES
+    ADMISSION.configure(
+        host_limit=int(options.get("max_concurrent_per_host", DEFAULT_HOST_CONCURRENCY)),
+        model_limits=options.get("model_max_concurrency") or {},
+        queue_size=int(options.get("admission_queue_size", DEFAULT_QUEUE_SIZE)),
+        queue_timeout=float(options.get("admission_queue_timeout_s", DEFAULT_QUEUE_TIMEOUT_SECONDS)),
+        reserved=int(options.get("priority_reserved_slots", DEFAULT_RESERVED_SLOTS)),
+        aging=float(options.get("priority_aging_s", DEFAULT_AGING_SECONDS)),
+    )
+    PRIORITY_WORKSPACES = {
+        str(workspace): rank
+        for workspace, name in (options.get("priority_workspaces") or {}).items()
+        if (rank := parse_priority(name)) is not None
+    }
+
+
+# Workspace -> priority class rank, from ``priority_workspaces``.
+PRIORITY_WORKSPACES: Dict[str, int] = {}
+_configure_admission(CURRENT_OPTIONS)
+# Exact-match cache for temperature-0 chat completions of opted-in models.
+RESPONSE_CACHE = ResponseCache()
+# Per host/model relay latency histograms served at /metrics.
+RELAY_METRICS = RelayMetrics()
+
+
+def _configure_response_cache(options: Dict[str, Any]) -> None:
+    RESPONSE_CACHE.configure(
+        max_bytes=int(options.get("response_cache_mb", DEFAULT_CACHE_MB)) * 1024 * 1024,
+        ttl_seconds=float(options.get("response_cache_ttl_s", DEFAULT_TTL_SECONDS)),
+        models=options.get("response_cache_models") or [],
+        disk_max_bytes=int(options.get("response_cache_disk_mb", 0)) * 1024 * 1024,
+    )
+
+
+_configure_response_cache(CURRENT_OPTIONS)
+
+
+def _keep_warm_interval(options: Dict[str, Any]) -> int:
+    """``keep_warm_interval_s`` clamped to the schema range, so a stored 0 cannot spin the loop."""
+
+    try:
+        interval = int(options.get("keep_warm_interval_s", DEFAULT_KEEP_WARM_INTERVAL_SECONDS))
+    except (TypeError, ValueError):
+        interval = DEFAULT_KEEP_WARM_INTERVAL_SECONDS
+    return min(MAX_KEEP_WARM_INTERVAL_SECONDS, max(MIN_KEEP_WARM_INTERVAL_SECONDS, interval))
+
+
+# Identical temperature-0 chat requests in flight share one upstream stream.
+COALESCE_IDENTICAL: bool = bool(CURRENT_OPTIONS.get("coalesce_identical", True))
+SINGLE_FLIGHT = SingleFlight()
+# Token usage per session/workspace/host/model, flushed to SQLite periodically.
+USAGE_LEDGER = UsageLedger()
+USAGE_FLUSH_INTERVAL_SECONDS = 30
+# Prime a new session's model in the background; keep listed models loaded.
+WARMUP_ON_SESSION: bool = bool(CURRENT_OPTIONS.get("warmup_on_session", True))
+KEEP_WARM_MODELS: List[str] = list(CURRENT_OPTIONS.get("keep_warm_models") or [])
+KEEP_WARM_INTERVAL_SECONDS: int = _keep_warm_interval(CURRENT_OPTIONS)
 SESSION_MANAGER = SessionManager()
 BOOTSTRAP_EVENT = asyncio.Event()
-MODEL_CATALOG: Dict[str, List[str]] = {}
-HOST_HEALTH: Dict[str, str] = {}
+# Readiness published by each bootstrap pass; /health and /api/status only read it.
+HEALTH = HealthSnapshot()
+STARTED_AT = time.monotonic()
 
 # --- session prune loop (idempotent) -----------------------------------------
 _prune_thread: Optional[threading.Thread] = None
@@ -487,7 +914,11 @@ async def reload_clients_from_options(
     global LM_HOSTS, CHROMA_MODE, CHROMA_URL, COLLECTION_NAME
     global ALLOWED_DOMAINS, TEMP, TOP_P
     global AUTO_CONFIG_REQUESTED, UPSERTS_REQUESTED, AUTO_CONFIG_ACTIVE, UPSERTS_ACTIVE
-    global CHROMA_CONFIG, CHROMA_CLIENT, HOST_POOL
+    global CHROMA_CONFIG, CHROMA_CLIENT, HOST_POOL, ROUTING_POLICY, ROUTING_POLICY_WEIGHTS
+    global SSE_FLUSH_INTERVAL_SECONDS, MAX_REQUEST_BODY_BYTES, FAILOVER_MAX_ATTEMPTS
+    global HEDGE_PERCENTILE, HEDGE_MODELS, COALESCE_IDENTICAL
+    global PREFIX_AFFINITY_ENABLED, PREFIX_AFFINITY_CHARS, CONTEXT_PREFLIGHT
+    global WARMUP_ON_SESSION, KEEP_WARM_MODELS, KEEP_WARM_INTERVAL_SECONDS
 
     options = (
         options_override if options_override is not None else load_options_from_disk()
@@ -524,9 +955,38 @@ async def reload_clients_from_options(
         jlog(logger, level="WARN", event="toolbridge_services_cache_reset_failed", error=str(exc))
 
     if HOST_POOL is None:
-        HOST_POOL = HostPool(LM_HOSTS)
+        HOST_POOL = HostPool(LM_HOSTS, on_publish=_adopt_catalog)
     else:
         HOST_POOL.update_hosts(LM_HOSTS)
+    await UPSTREAM_POOL.sync_hosts(list(LM_HOSTS.values()))
+    # Options are validated against ``PolicyName``; anything else resolves to the
+    # default here so an unexpected value cannot force a rebuild on every reload.
+    policy_name = str(options.get("routing_policy") or DEFAULT_POLICY).strip().lower()
+    if policy_name not in POLICY_NAMES:
+        policy_name = DEFAULT_POLICY
+    weights = dict(options.get("host_weights") or {})
+    reweighted = weights != ROUTING_POLICY_WEIGHTS
+    ROUTING_POLICY_WEIGHTS = weights
+    # Rebuilding resets policy state (e.g. the round-robin position), so only
+    # do it when the policy changes or its weights do.
+    if policy_name != ROUTING_POLICY.name or (reweighted and policy_name == "weighted_round_robin"):
+        ROUTING_POLICY = build_policy(policy_name, ROUTING_POLICY_WEIGHTS)
+        jlog(logger, event="routing_policy_applied", policy=ROUTING_POLICY.name)
+    SSE_FLUSH_INTERVAL_SECONDS = max(0, int(options.get("sse_flush_ms", 10))) / 1000.0
+    MAX_REQUEST_BODY_BYTES = max(1, int(options.get("max_body_mb", 32))) * 1024 * 1024
+    FAILOVER_MAX_ATTEMPTS = max(1, int(options.get("failover_attempts", 2)))
+    PREFIX_AFFINITY_ENABLED = bool(options.get("prefix_affinity", False))
+    PREFIX_AFFINITY_CHARS = max(64, int(options.get("prefix_affinity_chars", 2048)))
+    CONTEXT_PREFLIGHT = bool(options.get("context_preflight", True))
+    HEDGE_PERCENTILE = min(99, max(50, int(options.get("hedge_percentile", 95))))
+    HEDGE_MODELS = frozenset(options.get("hedge_models") or [])
+    _configure_admission(options)
+    _configure_response_cache(options)
+    COALESCE_IDENTICAL = bool(options.get("coalesce_identical", True))
+    WARMUP_ON_SESSION = bool(options.get("warmup_on_session", True))
+    KEEP_WARM_MODELS = list(options.get("keep_warm_models") or [])
+    KEEP_WARM_INTERVAL_SECONDS = _keep_warm_interval(options)
+    WARMUP.forget(list(LM_HOSTS.values()))
 
     CHROMA_CONFIG = ChromaConfig(url=CHROMA_URL, collection_name=COLLECTION_NAME)
     chroma_http = APP_CLIENTS.get("chroma")
@@ -565,16 +1025,14 @@ async def reload_clients_from_options(
             )
     await update_bootstrap_state(force_refresh=False, catalog_override=None)
 
-    if AUTO_CONFIG_REQUESTED:
-        refreshed = await _refresh_model_catalog_and_normalize()
-        if not refreshed:
-            jlog(
-                logger,
-                level="INFO",
-                event="model_catalog_refresh_deferred",
-                hosts=len(LM_HOSTS),
-                counts=counts,
-            )
+    if AUTO_CONFIG_REQUESTED and not any(counts.values()):
+        jlog(
+            logger,
+            level="INFO",
+            event="model_catalog_refresh_deferred",
+            hosts=len(LM_HOSTS),
+            counts=counts,
+        )
 
     logger.info("=== Cathedral Orchestrator reload ===")
     jlog(
@@ -589,127 +1047,176 @@ async def reload_clients_from_options(
     return options
 
 
-async def _refresh_model_catalog_and_normalize() -> bool:
+# --- bootstrap loop -----------------------------------------------------------
+async def _wait_for_wake(stop_event: asyncio.Event, wake: Optional[asyncio.Event], timeout: float) -> None:
+    """Sleep up to ``timeout`` seconds, returning early on stop or ``wake``."""
+
+    events = [stop_event] + ([wake] if wake is not None else [])
+    waiters = [asyncio.ensure_future(event.wait()) for event in events]
     try:
-        return await _refresh_model_catalog()
-    except Exception as exc:  # pragma: no cover - defensive guard
-        jlog(
-            logger,
-            level="WARN",
-            event="model_catalog_refresh_failed",
-            error=str(exc),
-        )
-        return False
+        await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
 
 
-async def _refresh_model_catalog() -> bool:
-    """
-    Populate MODEL_CATALOG (host -> [id,...]) and MODEL_OBJECTS (id -> metadata).
-    Returns True when at least one host responds successfully, otherwise False.
+async def _bootstrap_loop(stop_event: asyncio.Event, interval_seconds: int = 30) -> None:
+    """Persistent background loop for host probing and readiness.
+
+    The first pass reloads the clients, which probes every host. After that each
+    host is probed when ``HOST_POOL.schedule`` says it is due, and readiness
+    (Chroma heartbeat, session count) is re-evaluated every ``interval_seconds``.
     """
 
-    global MODEL_CATALOG, HOST_HEALTH
-    hosts = [host.rstrip("/") for host in LM_HOSTS.values()]
-    if not hosts:
-        MODEL_CATALOG = {}
-        MODEL_OBJECTS.clear()
-        HOST_HEALTH = {}
-        jlog(logger, event="model_catalog_empty")
-        return False
+    jlog(logger, event="bootstrap_loop_started", interval=interval_seconds)
+    loaded = False
+    next_state = 0.0
+    while not stop_event.is_set():
+        failed = False
+        try:
+            if not loaded:
+                await reload_clients_from_options(dict(CURRENT_OPTIONS))
+                await _refresh_sessions_active()
+                loaded = True
+                next_state = time.monotonic() + interval_seconds
+            else:
+                probed = await HOST_POOL.probe_due() if HOST_POOL is not None else []
+                if time.monotonic() >= next_state:
+                    await update_bootstrap_state()
+                    await _refresh_sessions_active()
+                    next_state = time.monotonic() + interval_seconds
+                elif probed:
+                    # Only host state moved; reuse the last Chroma heartbeat.
+                    await update_bootstrap_state(chroma_ready_override=HEALTH.chroma_ready)
+        except Exception as exc:
+            jlog(logger, level="WARN", event="bootstrap_loop_error", error=str(exc))
+            next_state = time.monotonic() + interval_seconds
+            failed = True
+        deadline = next_state
+        wake: Optional[asyncio.Event] = None
+        # After an error, sit out the readiness interval rather than retrying due hosts in a tight loop.
+        if loaded and not failed and HOST_POOL is not None:
+            wake = HOST_POOL.schedule.wake
+            wake.clear()
+            due = HOST_POOL.schedule.next_due()
+            if due is not None:
+                deadline = min(deadline, due)
+        try:
+            await _wait_for_wake(stop_event, wake, max(0.0, deadline - time.monotonic()))
+        except Exception as exc:  # pragma: no cover - defensive
+            jlog(logger, level="WARN", event="bootstrap_loop_wait_failed", error=str(exc))
+    jlog(logger, event="bootstrap_loop_stopped")
 
-    # Use a short lived, bounded client for catalog aggregation so a misbehaving host
-    # cannot stall the bootstrap loop. Streaming continues to use APP_CLIENTS["lm"].
-    timeout = httpx.Timeout(connect=1.5, read=5.0, write=5.0, pool=None)
 
-    async def gather_from_host(host: str) -> Tuple[str, List[Dict[str, Any]]]:
-        async with httpx.AsyncClient(timeout=timeout, http2=False) as _catalog_client:
-            return await list_models_from_host(_catalog_client, host)
+# --- usage flush loop ---------------------------------------------------------
+async def _flush_usage() -> None:
+    rows = USAGE_LEDGER.drain()
+    if not rows:
+        return
+    try:
+        await sessions.add_usage(rows)
+    except Exception as exc:
+        USAGE_LEDGER.restore(rows)
+        USAGE_LEDGER.flush_errors += 1
+        jlog(logger, level="WARN", event="usage_flush_failed", rows=len(rows), error=str(exc))
+        return
+    USAGE_LEDGER.flushes += 1
 
-    tasks = [gather_from_host(host) for host in hosts]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
 
-    new_catalog: Dict[str, List[str]] = {}
-    merged_objects: Dict[str, Dict[str, Any]] = {}
-    health: Dict[str, str] = {}
-    responded = False
+async def _usage_flush_loop(stop_event: asyncio.Event, interval_seconds: int) -> None:
+    """Write accumulated usage deltas to the sessions store until stopped."""
 
-    for host, result in zip(hosts, results):
-        if isinstance(result, BaseException):
-            health[host] = "down"
-            message = str(result).strip()
-            if not message:
-                message = repr(result)
-            jlog(
-                logger,
-                level="WARN",
-                event="model_catalog_gather_failed",
-                host=host,
-                error=message,
-                error_class=type(result).__name__ if isinstance(result, BaseException) else type(result).__name__,
-            )
-            continue
-        responded = True
-        base, payload = cast(Tuple[str, List[Dict[str, Any]]], result)
-        clean = base.rstrip("/")
-        obj_list: List[Dict[str, Any]] = [obj for obj in payload if isinstance(obj, dict)]
-        ids: List[str] = []
-        for obj in obj_list:
-            mid = obj.get("id") or obj.get("name")
-            if not mid:
-                continue
-            mid_str = str(mid)
-            ids.append(mid_str)
-            merged = merged_objects.setdefault(mid_str, {})
-            merged.update(obj)
-        new_catalog[clean] = ids
-        health[clean] = "ok" if ids else "down"
-        jlog(
-            logger,
-            event="model_catalog_host",
-            host=clean,
-            models=len(ids),
-            status=health[clean],
+    while not stop_event.is_set():
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=interval_seconds)
+        except asyncio.TimeoutError:
+            pass
+        await _flush_usage()
+
+
+# --- model warm-up ------------------------------------------------------------
+# A JIT load can take minutes for large models on slow disks.
+WARMUP_TIMEOUT = httpx.Timeout(connect=5.0, read=300.0, write=10.0, pool=5.0)
+
+
+async def _describe_model(host: str, model: str) -> Optional[Dict[str, Any]]:
+    """Return ``host``'s ``/api/v0/models`` entry for ``model``, if it has one."""
+
+    try:
+        resp = await UPSTREAM_POOL.client_for(host).get(
+            host.rstrip("/") + "/api/v0/models",
+            timeout=httpx.Timeout(connect=2.0, read=5.0, write=5.0, pool=2.0),
         )
+        resp.raise_for_status()
+        items = (resp.json() or {}).get("data") or []
+    except Exception as exc:
+        jlog(logger, level="DEBUG", event="warmup_state_unavailable", host=host, model=model, error=str(exc))
+        return None
+    for item in items:
+        if isinstance(item, dict) and model in (item.get("id"), item.get("name")):
+            return item
+    return None
 
-    # Commit only when we actually have models. This preserves cached metadata during outages.
-    if merged_objects:
-        MODEL_CATALOG = new_catalog
-        HOST_HEALTH = health
-        MODEL_OBJECTS.clear()
-        MODEL_OBJECTS.update(merged_objects)
-        _normalize_model_token_limits(MODEL_OBJECTS)
-        jlog(logger, event="model_catalog_refreshed", hosts=len(MODEL_CATALOG), models=len(MODEL_OBJECTS))
-        return True
-
-    HOST_HEALTH = health or HOST_HEALTH
-    jlog(
-        logger,
-        level="WARN",
-        event="model_catalog_refresh_no_response",
-        hosts=len(hosts),
-        responded=responded,
-    )
-    return False
 
+async def _prime_model(host: str, model: str, model_type: Optional[str]) -> bool:
+    """Send a one-token request for ``model`` on a free bulk slot of ``host``."""
 
-# --- bootstrap loop -----------------------------------------------------------
-async def _bootstrap_loop(stop_event: asyncio.Event, interval_seconds: int = 30) -> None:
-    """Persistent background loop for host probing and catalog refresh."""
+    lease = ADMISSION.try_admit(host, model, BULK)
+    if lease is None:
+        return False
+    if model_type == "embeddings":
+        url = host.rstrip("/") + "/v1/embeddings"
+        payload: Dict[str, Any] = {"model": model, "input": "warm-up"}
+    else:
+        url = host.rstrip("/") + "/v1/chat/completions"
+        payload = {
+            "model": model,
+            "messages": [{"role": "user", "content": "ping"}],
+            "max_tokens": 1,
+            "stream": False,
+        }
+    HOST_STATS.begin(host)
+    try:
+        resp = await UPSTREAM_POOL.client_for(host).post(url, json=payload, timeout=WARMUP_TIMEOUT)
+        resp.raise_for_status()
+    finally:
+        lease.release()
+        HOST_STATS.end(host)
+    return True
+
+
+WARMUP = WarmupScheduler(_describe_model, _prime_model)
+
+
+def _warm_session_model(host: str, model: str) -> None:
+    """MPC session hook: prime the model a new session was assigned, off the handshake."""
+
+    if WARMUP_ON_SESSION:
+        WARMUP.request(host, model, reason="session")
+
+
+def _keep_warm_due() -> int:
+    scheduled = 0
+    for model in KEEP_WARM_MODELS:
+        for host, models in MODEL_CATALOG.items():
+            if model not in models or HOST_HEALTH.get(host, "ok") != "ok":
+                continue
+            if WARMUP.request(host, model, reason="keep_warm", force=True):
+                scheduled += 1
+    return scheduled
+
+
+async def _keep_warm_loop(stop_event: asyncio.Event) -> None:
+    """Re-prime ``keep_warm_models`` on every host serving them until stopped."""
 
-    jlog(logger, event="bootstrap_loop_started", interval=interval_seconds)
     while not stop_event.is_set():
         try:
-            await reload_clients_from_options(dict(CURRENT_OPTIONS))
-            await update_bootstrap_state(force_refresh=True)
-        except Exception as exc:
-            jlog(logger, level="WARN", event="bootstrap_loop_error", error=str(exc))
-        try:
-            await asyncio.wait_for(stop_event.wait(), timeout=interval_seconds)
+            await asyncio.wait_for(stop_event.wait(), timeout=KEEP_WARM_INTERVAL_SECONDS)
         except asyncio.TimeoutError:
-            continue
-        except Exception as exc:  # pragma: no cover - defensive
-            jlog(logger, level="WARN", event="bootstrap_loop_wait_failed", error=str(exc))
-    jlog(logger, event="bootstrap_loop_stopped")
+            if KEEP_WARM_MODELS:
+                scheduled = _keep_warm_due()
+                jlog(logger, level="DEBUG", event="keep_warm_tick", scheduled=scheduled)
+    await WARMUP.aclose()
 
 
 def is_bootstrap_ready() -> bool:
@@ -740,7 +1247,7 @@ async def update_bootstrap_state(
     catalog_override: Optional[Dict[str, List[str]]] = None,
     chroma_ready_override: Optional[bool] = None,
 ) -> None:
-    global AUTO_CONFIG_ACTIVE, UPSERTS_ACTIVE, CURRENT_OPTIONS
+    global AUTO_CONFIG_ACTIVE, UPSERTS_ACTIVE, CURRENT_OPTIONS, HEALTH
 
     catalog: Dict[str, List[str]] = {}
     if catalog_override is not None:
@@ -799,6 +1306,13 @@ async def update_bootstrap_state(
     UPSERTS_ACTIVE = ready and UPSERTS_REQUESTED
     CURRENT_OPTIONS["auto_config_active"] = AUTO_CONFIG_ACTIVE
     CURRENT_OPTIONS["upserts_active"] = UPSERTS_ACTIVE
+    HEALTH = stamp_health(
+        ready=ready,
+        lm_ready=lm_ready,
+        chroma_ready=chroma_ready,
+        sessions_active=HEALTH.sessions_active,
+        lm_hosts=dict(HOST_POOL.snapshot.counts) if HOST_POOL else {},
+    )
     jlog(
         logger,
         event="bootstrap_state",
@@ -812,40 +1326,20 @@ async def update_bootstrap_state(
     )
 
 
-async def get_readiness() -> Tuple[bool, bool, bool]:
-    catalog_snapshot = dict(MODEL_CATALOG)
-    catalog_ready = any(models for models in catalog_snapshot.values())
-    cache_ready = bool(MODEL_OBJECTS)
-    hostpool_ready = HOST_POOL.is_ready() if HOST_POOL else False
-    lm_ready = catalog_ready or cache_ready or hostpool_ready
-    if CHROMA_URL and CHROMA_CLIENT is not None:
-        chroma_ready = await CHROMA_CLIENT.health()
-    elif CHROMA_URL:
-        chroma_ready = False
-    else:
-        chroma_ready = True
-    ready = lm_ready and chroma_ready
-    await update_bootstrap_state(
-        force_refresh=False,
-        catalog_override=catalog_snapshot if catalog_snapshot else None,
-        chroma_ready_override=chroma_ready,
-    )
-    jlog(
-        logger,
-        event="readiness_snapshot",
-        ready=ready,
-        lm_ready=lm_ready,
-        chroma_ready=chroma_ready,
-    )
-    return ready, lm_ready, chroma_ready
+async def _refresh_sessions_active() -> None:
+    """Fold the active session count into the published health snapshot."""
+
+    global HEALTH
+    try:
+        count = await SESSION_MANAGER.list_active()
+    except Exception as exc:
+        jlog(logger, level="WARN", event="sessions_active_count_failed", error=str(exc))
+        return
+    HEALTH = replace(HEALTH, sessions_active=count)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    APP_CLIENTS["lm"] = httpx.AsyncClient(
-        timeout=httpx.Timeout(None),
-        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
-    )
     APP_CLIENTS["chroma"] = httpx.AsyncClient(
         timeout=30,
         limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
@@ -860,6 +1354,7 @@ async def lifespan(app: FastAPI):
         collection_name_provider=get_collection_name,
         upsert_allowed=upserts_enabled,
         auto_config_allowed=auto_config_enabled,
+        session_warmup=_warm_session_model,
     )
     set_server(server)
     start_pruner()
@@ -867,6 +1362,10 @@ async def lifespan(app: FastAPI):
     bootstrap_task = asyncio.create_task(
         _bootstrap_loop(bootstrap_stop, interval_seconds=30)
     )
+    usage_task = asyncio.create_task(
+        _usage_flush_loop(bootstrap_stop, interval_seconds=USAGE_FLUSH_INTERVAL_SECONDS)
+    )
+    keep_warm_task = asyncio.create_task(_keep_warm_loop(bootstrap_stop))
     try:
         yield
     finally:
@@ -877,77 +1376,76 @@ async def lifespan(app: FastAPI):
             bootstrap_task.cancel()
         except Exception as exc:  # pragma: no cover - defensive
             jlog(logger, level="WARN", event="bootstrap_loop_join_failed", error=str(exc))
+        try:
+            # The loop performs a final flush once it sees the stop event.
+            await asyncio.wait_for(usage_task, timeout=5)
+        except asyncio.TimeoutError:
+            usage_task.cancel()
+        try:
+            await asyncio.wait_for(keep_warm_task, timeout=5)
+        except asyncio.TimeoutError:
+            keep_warm_task.cancel()
         stop_pruner()
+        await UPSTREAM_POOL.aclose()
+        await RESPONSE_CACHE.aclose()
         await asyncio.gather(*(client.aclose() for client in APP_CLIENTS.values()))
         APP_CLIENTS.clear()
 
 
 app = FastAPI(title="Cathedral Orchestrator", lifespan=lifespan)
 app.include_router(mpc_router, prefix="/mcp")
+@app.get("/health/live")
+async def health_live() -> JSONResponse:
+    """Liveness only: answers while the event loop runs, without touching upstreams."""
+
+    return JSONResponse({"ok": True, "uptime_s": round(time.monotonic() - STARTED_AT, 1)})
+
+
 @app.get("/health")
 async def health():
-    if HOST_POOL is None or not HOST_POOL.has_hosts():
-        raise HTTPException(status_code=503, detail="no lm hosts configured")
+    """Readiness from the last bootstrap pass; never probes hosts or Chroma."""
 
-    hosts = HOST_POOL.list_hosts()
-    if not hosts:
+    if HOST_POOL is None or not HOST_POOL.has_hosts():
         raise HTTPException(status_code=503, detail="no lm hosts configured")
 
-    catalog = await HOST_POOL.get_catalog()
-    if not catalog:
-        await HOST_POOL.refresh()
-        catalog = await HOST_POOL.get_catalog()
-
-    lm_counts = {base: len(models) for base, models in catalog.items()}
-    lm_ready = (
-        any(count > 0 for count in lm_counts.values())
-        or bool(MODEL_OBJECTS)
-        or HOST_POOL.is_ready()
-    )
-    chroma_ok = True
-    if CHROMA_URL:
-        chroma_ok = bool(CHROMA_CLIENT) and await CHROMA_CLIENT.health()
-
-    await update_bootstrap_state(
-        force_refresh=False,
-        catalog_override=catalog,
-        chroma_ready_override=chroma_ok,
-    )
-    ready = lm_ready and chroma_ok
-    status = 200 if ready else 503
-
-    payload = {
+    snapshot = HEALTH
+    ready = snapshot.ready
+    admission = ADMISSION.snapshot()
+    payload: Dict[str, Any] = {
         "ok": ready,
-        "lm_hosts": lm_counts,
-        "chroma": {"ok": chroma_ok},
+        "lm_hosts": snapshot.lm_hosts,
+        "chroma": {"ok": snapshot.chroma_ready},
+        "admission": {
+            "queued": admission["queued"],
+            "hosts": {
+                base: {
+                    "in_use": stats["in_use"],
+                    "queued": stats["queued"],
+                    "wait_ms_avg": stats["wait_ms_avg"],
+                }
+                for base, stats in admission["hosts"].items()
+            },
+        },
+        **snapshot.freshness(),
     }
     if not ready:
         payload["detail"] = "bootstrap_pending"
-    jlog(
-        logger,
-        event="health_status",
-        host_count=len(lm_counts),
-        chroma_ok=chroma_ok,
-        ready=ready,
-    )
-    return JSONResponse(payload, status_code=status)
+    return JSONResponse(payload, status_code=200 if ready else 503)
 
 
 @app.get("/api/status")
 async def api_status() -> JSONResponse:
-    await _refresh_model_catalog()
-    ready, lm_ready, chroma_ready = await get_readiness()
-    sessions_active = await SESSION_MANAGER.list_active()
+    health_snapshot = HEALTH
+    freshness = health_snapshot.freshness()
     options_snapshot = dict(CURRENT_OPTIONS)
-    catalog_snapshot = dict(MODEL_CATALOG)
-    host_health_snapshot = dict(HOST_HEALTH)
     response = {
-        "ok": ready,
-        "lm_ready": lm_ready,
-        "chroma_ready": chroma_ready,
-        "sessions_active": sessions_active,
-        "catalog": catalog_snapshot,
-        "host_health": host_health_snapshot,
+        "ok": health_snapshot.ready,
+        "lm_ready": health_snapshot.lm_ready,
+        "chroma_ready": health_snapshot.chroma_ready,
+        "sessions_active": health_snapshot.sessions_active,
+        "health": freshness,
+        "catalog": MODEL_CATALOG,
+        "host_health": HOST_HEALTH,
         "auto_config_requested": bool(
             options_snapshot.get("auto_config", AUTO_CONFIG_REQUESTED)
         ),
@@ -956,20 +1454,83 @@ async def api_status() -> JSONResponse:
         "upserts_active": UPSERTS_ACTIVE,
         "auto_discovery": bool(options_snapshot.get("auto_discovery", False)),
         "lock_hosts": bool(options_snapshot.get("lock_hosts", False)),
+        "upstream_pool": UPSTREAM_POOL.snapshot(),
+        "routing_index": HOST_POOL.index_snapshot() if HOST_POOL else {},
+        "probe_schedule": HOST_POOL.schedule.snapshot() if HOST_POOL else {},
+        "circuits": BREAKERS.snapshot(),
+        "models_metadata": MODELS_METADATA.snapshot(),
+        "models_responses": {"v1": MODELS_V1_BODY.snapshot(), "v0": MODELS_V0_BODY.snapshot()},
+        "resource_feed": RESOURCE_FEED.snapshot(),
+        "routing_policy": ROUTING_POLICY.name,
+        "host_stats": HOST_STATS.snapshot(),
+        "relay": RELAY_STATS.snapshot(),
+        "prefix_affinity": {"enabled": PREFIX_AFFINITY_ENABLED, **PREFIX_AFFINITY.snapshot()},
+        "preflight": {"enabled": CONTEXT_PREFLIGHT, **PREFLIGHT_STATS.snapshot()},
+        "hedging": {"percentile": HEDGE_PERCENTILE, **HEDGE_STATS.snapshot()},
+        "response_cache": RESPONSE_CACHE.snapshot(),
+        "singleflight": {"enabled": COALESCE_IDENTICAL, **SINGLE_FLIGHT.snapshot()},
+        "usage": USAGE_LEDGER.snapshot(),
+        "warmup": {
+            "on_session": WARMUP_ON_SESSION,
+            "keep_warm_models": KEEP_WARM_MODELS,
+            "keep_warm_interval_s": KEEP_WARM_INTERVAL_SECONDS,
+            **WARMUP.snapshot(),
+        },
+        "admission": ADMISSION.snapshot(),
         "updated_at": datetime.utcnow().isoformat() + "Z",
     }
     jlog(
         logger,
+        level="DEBUG",
         event="api_status",
-        sessions=response["sessions_active"],
-        host_count=len(catalog_snapshot),
-        ready=ready,
-        lm_ready=lm_ready,
-        chroma_ready=chroma_ready,
+        sessions=health_snapshot.sessions_active,
+        host_count=len(MODEL_CATALOG),
+        ready=health_snapshot.ready,
+        health_age_s=freshness["age_s"],
     )
     return JSONResponse(response)
 
 
+@app.get("/api/usage")
+async def api_usage(scope: Optional[str] = None) -> JSONResponse:
+    """Persisted token usage plus deltas not yet flushed."""
+
+    if scope is not None and scope not in USAGE_SCOPES:
+        raise HTTPException(status_code=400, detail=f"scope must be one of {', '.join(USAGE_SCOPES)}")
+    merged: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for row in await sessions.list_usage(scope):
+        merged[(row["scope"], row["key"])] = row
+    for (entry_scope, key), counter in USAGE_LEDGER.pending(scope).items():
+        row = merged.setdefault(
+            (entry_scope, key),
+            {
+                "scope": entry_scope,
+                "key": key,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "requests": 0,
+                "estimated_requests": 0,
+                "updated_ts": None,
+            },
+        )
+        for field, value in counter.as_dict().items():
+            if field in row:
+                row[field] += value
+    usage = []
+    for entry in sorted(merged):
+        row = merged[entry]
+        row["total_tokens"] = row["prompt_tokens"] + row["completion_tokens"]
+        usage.append(row)
+    return JSONResponse({"scope": scope, "usage": usage})
+
+
+@app.get("/metrics")
+async def metrics() -> PlainTextResponse:
+    """Relay latency histograms in the Prometheus text format."""
+
+    return PlainTextResponse(RELAY_METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/debug/probe")
 async def debug_probe() -> JSONResponse:
     if HOST_POOL is None or not HOST_POOL.has_hosts():
@@ -977,6 +1538,8 @@ async def debug_probe() -> JSONResponse:
 
     counts = await HOST_POOL.refresh()
     last_counts, last_errors = await HOST_POOL.get_last_probe()
+    schedule = HOST_POOL.schedule.snapshot()
+    circuits = BREAKERS.snapshot()
 
     hosts: List[Dict[str, Any]] = []
     for base in HOST_POOL.list_hosts():
@@ -995,6 +1558,9 @@ async def debug_probe() -> JSONResponse:
             "host": base.rstrip("/"),
             "model_count": count,
             "status": status,
+            # Next scheduled background probe (rescheduled by this one).
+            "schedule": schedule.get(base.rstrip("/"), {}),
+            "circuit": circuits.get(base.rstrip("/"), {"state": CIRCUIT_CLOSED}),
         }
         if detail:
             entry["detail"] = detail
@@ -1076,31 +1642,33 @@ async def api_set_options(request: Request) -> JSONResponse:
                 {"ok": False, "error": "persist_failed"}, status_code=500
             )
     await reload_clients_from_options(dict(payload))
-    await update_bootstrap_state(force_refresh=True)
     jlog(logger, event="api_options_updated", keys=list(payload.keys()))
     return JSONResponse({"ok": True, "options": dict(CURRENT_OPTIONS)})
 
 
+# Encoded once per catalog snapshot; polls with a matching ETag get 304.
+MODELS_V1_BODY = EncodedCache()
+MODELS_V0_BODY = EncodedCache()
+
+
 @app.get("/v1/models")
-async def models_v1(_request: Request) -> JSONResponse:
+async def models_v1(request: Request) -> Response:
     """
     Union of upstream model OBJECTS, not just ids.
     Preserve all fields so clients (AnythingLLM) can auto-detect context window.
     """
-    snapshot = {mid: dict(meta) for mid, meta in MODEL_OBJECTS.items()}
-    union = [meta for meta in snapshot.values()]
-    return JSONResponse({"object": "list", "data": union})
+    objects = MODEL_OBJECTS
+    return MODELS_V1_BODY.respond(
+        request, (objects,), lambda: {"object": "list", "data": list(objects.values())}
+    )
 
 
 @app.get("/api/v0/models")
-async def models_v0_aggregate(_request: Request):
+async def models_v0_aggregate(request: Request):
     """
     Provide a REST-style model inventory compatible with LM Studio's /api/v0/models,
     unioned across configured hosts. If exactly one host is configured, we pass through.
     """
-    client = APP_CLIENTS.get("lm")
-    if not client:
-        raise HTTPException(status_code=503, detail="client not ready")
     hosts = list(LM_HOSTS.values())
     if not hosts:
         return JSONResponse({"loaded": [], "downloaded": []})
@@ -1108,7 +1676,7 @@ async def models_v0_aggregate(_request: Request):
     if len(hosts) == 1:
         url = hosts[0].rstrip("/") + "/api/v0/models"
         try:
-            resp = await client.get(
+            resp = await UPSTREAM_POOL.client_for(hosts[0]).get(
                 url,
                 follow_redirects=True,
                 timeout=httpx.Timeout(connect=5.0, read=20.0, write=5.0, pool=5.0),
@@ -1130,9 +1698,19 @@ async def models_v0_aggregate(_request: Request):
                 error=str(exc),
             )
 
+    catalog = HOST_POOL.snapshot.catalog if HOST_POOL is not None else {}
+    objects = MODEL_OBJECTS
+    return MODELS_V0_BODY.respond(
+        request, (catalog, objects), functools.partial(_v0_union_payload, catalog, objects)
+    )
+
+
+def _v0_union_payload(
+    catalog: Dict[str, List[str]], objects: Dict[str, Dict[str, Any]]
+) -> Dict[str, Any]:
+    """LM Studio-style ``loaded`` list for every model in ``catalog``."""
+
     loaded: List[Dict[str, Any]] = []
-    catalog = await _catalog_provider()
-    metadata_snapshot = {mid: dict(meta) for mid, meta in MODEL_OBJECTS.items()}
     for _host, models in catalog.items():
         for mid in models:
             item: Dict[str, Any] = {
@@ -1140,7 +1718,7 @@ async def models_v0_aggregate(_request: Request):
                 "state": "loaded",
                 "provider": "upstream",
             }
-            obj_data = metadata_snapshot.get(mid)
+            obj_data = objects.get(mid)
             if isinstance(obj_data, dict):
                 ctx = obj_data.get("context_window") or obj_data.get("context_length")
                 if isinstance(ctx, int):
@@ -1167,63 +1745,69 @@ async def models_v0_aggregate(_request: Request):
         hosts=len(catalog),
         loaded=len(loaded),
     )
-    return JSONResponse({"loaded": loaded, "downloaded": []})
+    return {"loaded": loaded, "downloaded": []}
 
 
-@app.get("/api/models/metadata")
-async def models_metadata() -> JSONResponse:
-    """
-    Returns model metadata merged from /v1/models and LM Studio /api/v0/models.
-    Never alters /v1/models. Values are best-effort and optional.
+async def _fetch_v0_metadata(base: str) -> Dict[str, Dict[str, Any]]:
+    """LM Studio ``/api/v0/models`` fields for every model ``base`` lists."""
+
+    resp = await UPSTREAM_POOL.client_for(base).get(
+        base.rstrip("/") + "/api/v0/models",
+        follow_redirects=True,
+        timeout=httpx.Timeout(connect=5.0, read=10.0, write=5.0, pool=5.0),
+    )
+    resp.raise_for_status()
+    payload = resp.json() or {}
+    v0: Dict[str, Dict[str, Any]] = {}
+    for item in payload.get("data", []):
+        mid = item.get("id") or item.get("name")
+        if not mid:
+            continue
+        # prefer explicit LM Studio v0 fields
+        v0[mid] = {
+            "id": mid,
+            "type": item.get("type"),
+            "max_context_length": item.get("max_context_length"),
+            "state": item.get("state"),
+            "publisher": item.get("publisher"),
+            "arch": item.get("arch"),
+            "quantization": item.get("quantization"),
+        }
+    return v0
+
+
+async def _collect_models_metadata() -> List[Dict[str, Any]]:
+    """Merge every host's ``/v1/models`` objects with its ``/api/v0/models`` metadata.
+
+    Both endpoints are fetched from all hosts at once, so the slowest host
+    bounds the refresh instead of the sum of them.
     """
-    client = APP_CLIENTS.get("lm")
-    if client is None:
-        raise HTTPException(status_code=503, detail="client not ready")
-    hosts = list(LM_HOSTS.values())
-    # 1) Pull native metadata with max_context_length
+
+    bases = list(LM_HOSTS.values())
+    results = await asyncio.gather(
+        *[_fetch_v0_metadata(b) for b in bases],
+        *[list_models_from_host(UPSTREAM_POOL.client_for(b), b) for b in bases],
+        return_exceptions=True,
+    )
+    v0_results, v1_results = results[: len(bases)], results[len(bases) :]
+
+    # 1) Native metadata with max_context_length
     v0: Dict[str, Dict[str, Any]] = {}
-    for base in hosts:
-        url = base.rstrip("/") + "/api/v0/models"
-        try:
-            resp = await client.get(
-                url,
-                follow_redirects=True,
-                timeout=httpx.Timeout(connect=5.0, read=10.0, write=5.0, pool=5.0),
-            )
-            resp.raise_for_status()
-            payload = resp.json() or {}
-            for item in payload.get("data", []):
-                mid = item.get("id") or item.get("name")
-                if not mid:
-                    continue
-                # prefer explicit LM Studio v0 fields
-                meta = {
-                    "id": mid,
-                    "type": item.get("type"),
-                    "max_context_length": item.get("max_context_length"),
-                    "state": item.get("state"),
-                    "publisher": item.get("publisher"),
-                    "arch": item.get("arch"),
-                    "quantization": item.get("quantization"),
-                }
-                v0[mid] = meta
-        except Exception as exc:
+    for base, v0_res in zip(bases, v0_results):
+        if isinstance(v0_res, BaseException):
             jlog(
                 logger,
                 level="WARN",
                 event="models_v0_fetch_failed",
                 host=base.rstrip("/"),
-                error=str(exc),
+                error=str(v0_res),
             )
+            continue
+        v0.update(v0_res)
 
-    # 2) Pull /v1/models for currently loaded models and preserve shape
+    # 2) /v1/models for currently loaded models, preserving their shape
     union: Dict[str, Dict[str, Any]] = {}
-    bases = list(LM_HOSTS.values())
-    results = await asyncio.gather(
-        *[list_models_from_host(client, b) for b in bases],
-        return_exceptions=True,
-    )
-    for base, res in zip(bases, results):
+    for base, res in zip(bases, v1_results):
         if isinstance(res, BaseException):
             jlog(
                 logger,
@@ -1256,7 +1840,25 @@ async def models_metadata() -> JSONResponse:
     # 3) Emit a compact list
     data = list(union.values())
     jlog(logger, event="models_metadata_union", hosts=len(bases), models=len(data))
-    return JSONResponse({"object": "list", "data": data})
+    return data
+
+
+# Merged metadata is served from cache for ``ttl`` seconds, then served stale for
+# up to ``max_stale`` seconds while one background refresh runs.
+MODELS_METADATA: StaleWhileRevalidate[List[Dict[str, Any]]] = StaleWhileRevalidate(
+    _collect_models_metadata, ttl=30.0, max_stale=600.0, name="models_metadata"
+)
+
+
+@app.get("/api/models/metadata")
+async def models_metadata() -> JSONResponse:
+    """
+    Returns model metadata merged from /v1/models and LM Studio /api/v0/models.
+    Never alters /v1/models. Values are best-effort and optional.
+    """
+    hosts = tuple(base.rstrip("/") for base in LM_HOSTS.values())
+    data, status = await MODELS_METADATA.get(hosts)
+    return JSONResponse({"object": "list", "data": data}, headers={CACHE_HEADER: status})
 
 
 @app.head("/v1/models")
@@ -1266,13 +1868,10 @@ async def models_v1_head() -> Response:
     """
     if not LM_HOSTS:
         raise HTTPException(status_code=503, detail="no lm hosts configured")
-    client = APP_CLIENTS.get("lm")
-    if client is None:
-        raise HTTPException(status_code=503, detail="client not ready")
     for base in LM_HOSTS.values():
         try:
             host = base.rstrip("/")
-            resp = await client.get(
+            resp = await UPSTREAM_POOL.client_for(host).get(
                 f"{host}/v1/models",
                 timeout=httpx.Timeout(connect=2.0, read=2.0, write=2.0, pool=2.0),
             )
@@ -1299,89 +1898,302 @@ async def models_v1_head() -> Response:
     raise HTTPException(status_code=503, detail="no upstream models endpoint")
 
 
-async def _route_for_model(model: str) -> str:
-    client = APP_CLIENTS.get("lm")
-    if not client:
-        raise HTTPException(status_code=503, detail="client not ready")
+_BACKGROUND_TASKS: "set[asyncio.Task[Any]]" = set()
+
+
+def _spawn_background(coro: Any) -> None:
+    """Run bookkeeping off the request path while keeping a strong task reference."""
+
+    task = asyncio.get_running_loop().create_task(coro)
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_BACKGROUND_TASKS.discard)
+
+
+# Unknown models trigger at most one on-demand catalog refresh per interval.
+ROUTE_REFRESH_MIN_INTERVAL_SECONDS = 5.0
+
+
+def _sticky_host(
+    model: Optional[str], preferred: Optional[str], trials: Optional[TrialClaims] = None
+) -> Optional[str]:
+    """Return the session's stored host when it is healthy and serves ``model``.
+
+    With ``trials``, a half-open host is only returned when its trial could be
+    claimed for this request.
+    """
+
+    if not preferred or HOST_POOL is None:
+        return None
+    base = preferred.rstrip("/")
+    if base not in HOST_POOL.list_hosts() or not HOST_POOL.is_alive(base):
+        return None
+    if model and base not in HOST_POOL.hosts_for_model(model):
+        return None
+    if not (trials.take(base) if trials is not None else BREAKERS.available(base)):
+        return None
+    return base
+
+
+def _claim_route(base: str, trials: Optional[TrialClaims]) -> str:
+    if trials is not None:
+        trials.take(base)
+    return base
+
+
+async def _route_for_model(
+    model: str,
+    preferred: Optional[str] = None,
+    prefix: Optional[bytes] = None,
+    trials: Optional[TrialClaims] = None,
+) -> str:
+    """Resolve the host for ``model`` from the cached routing index.
+
+    A healthy ``preferred`` host (session affinity) that serves the model wins.
+    Known models are an O(1) lookup. Unknown models share a single coalesced
+    HostPool refresh before falling back to the first configured host. A
+    prompt ``prefix`` picks its consistent-hash host unless that host is
+    saturated, in which case the routing policy decides. The chosen host's
+    half-open trial is claimed in ``trials``, so concurrent requests route
+    elsewhere until this one reports back or releases it.
+    """
+
     if not LM_HOSTS:
         raise HTTPException(status_code=503, detail="no lm hosts configured")
-    bases = list(LM_HOSTS.values())
-    tasks = [list_models_from_host(client, base) for base in bases]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
-    filtered: List[Tuple[str, List[Dict[str, Any]]]] = []
-    for base, result in zip(bases, results):
-        if isinstance(result, BaseException):
+    fallback = list(LM_HOSTS.values())[0].rstrip("/")
+    if HOST_POOL is None:
+        return _claim_route(fallback, trials)
+    sticky = _sticky_host(model, preferred, trials)
+    if sticky:
+        return sticky
+    candidates = HOST_POOL.hosts_for_model(model)
+    if not candidates:
+        try:
+            await HOST_POOL.refresh_if_stale(ROUTE_REFRESH_MIN_INTERVAL_SECONDS)
+        except Exception as exc:  # pragma: no cover - defensive guard
             jlog(
                 logger,
                 level="WARN",
                 event="route_for_model_failed",
-                host=base.rstrip("/"),
-                error=str(result),
+                model=model,
+                error=str(exc),
             )
-            continue
-        filtered.append(cast(Tuple[str, List[Dict[str, Any]]], result))
-    index = build_model_index(filtered)
-    try:
-        return index[model]
-    except KeyError:
-        return list(LM_HOSTS.values())[0]
+        candidates = HOST_POOL.hosts_for_model(model)
+    if not candidates:
+        jlog(logger, level="DEBUG", event="route_for_model_unknown", model=model, host=fallback)
+        return _claim_route(fallback, trials)
+    # ``available`` drops open circuits and half-open hosts whose trial is
+    # taken. Nothing below awaits, so the chosen host's claim cannot be lost
+    # to a concurrent request.
+    closed = [base for base in candidates if BREAKERS.available(base)]
+    ready = [base for base in closed if HOST_POOL.is_alive(base)]
+    # Only when every candidate is unavailable is one tried anyway.
+    eligible = ready or closed or list(candidates)
+    if len(eligible) == 1:
+        return _claim_route(eligible[0], trials)
+    if prefix:
+        chosen = PREFIX_AFFINITY.choose(prefix, eligible, HOST_STATS, ADMISSION.saturated)
+        if chosen is not None:
+            return _claim_route(chosen, trials)
+        jlog(logger, level="DEBUG", event="route_prefix_affinity_fallback", model=model)
+    return _claim_route(ROUTING_POLICY.choose(eligible, HOST_STATS), trials)
 
 
 @app.post("/v1/chat/completions")
 async def relay_chat_completions(request: Request):
     if not LM_HOSTS:
         raise HTTPException(status_code=503, detail="no lm hosts configured")
+    received_at = time.monotonic()
 
-    body_bytes = await request.body()
-    model: Optional[str] = None
-    if body_bytes:
-        try:
-            payload = json.loads(body_bytes)
-            if isinstance(payload, dict):
-                model = payload.get("model")
-        except Exception:
-            model = None
+    # Peek at the top-level keys while the upload streams in; the original
+    # bytes are forwarded upstream untouched.
+    try:
+        body = StreamedBody(
+            request,
+            keys=("model", "stream", "temperature", "messages"),
+            limit=MAX_REQUEST_BODY_BYTES,
+        )
+        peeked = await body.peek()
+    except RequestBodyTooLarge as exc:
+        raise HTTPException(status_code=413, detail="request_body_too_large") from exc
+    raw_model = peeked.get("model")
+    model: Optional[str] = raw_model if isinstance(raw_model, str) and raw_model else None
 
-    target_base = await _route_for_model(model) if model else list(LM_HOSTS.values())[0]
-    url = f"{target_base.rstrip('/')}/v1/chat/completions"
+    if model and CONTEXT_PREFLIGHT:
+        rejection = await _preflight_chat(body, model)
+        if rejection is not None:
+            return rejection
 
-    fwd_headers = {"Content-Type": "application/json", "Accept": "text/event-stream"}
+    # Bind or resume Cathedral session if bridge is enabled
+    ws_id, thr_id, sess_token, created = await _bind_http_session(request)
+
+    # Follow-up turns stay on the session's host so LM Studio can reuse its prompt cache.
+    session_host: Optional[str] = None
+    if ws_id and thr_id and not created:
+        session_host, _session_model = await sessions.get_session_host(ws_id, thr_id)
+
+    # Deterministic requests get a canonical key: it drives the response
+    # cache and lets identical requests in flight share one upstream stream.
+    request_key: Optional[str] = None
+    cache_enabled = RESPONSE_CACHE.enabled_for(model)
     auth = request.headers.get("authorization")
+    auth_scope = credential_scope(auth)
+    if _is_zero(peeked.get("temperature")) and (cache_enabled or COALESCE_IDENTICAL):
+        request_key = await _chat_request_key(body, auth_scope)
+    if request_key is not None and cache_enabled:
+        cached = await RESPONSE_CACHE.get(request_key)
+        if cached is not None:
+            hit = Response(
+                content=cached.body,
+                status_code=cached.status_code,
+                media_type=cached.media_type,
+                headers={CACHE_HEADER: "hit"},
+            )
+            return _with_session_headers(hit, sess_token, created)
+    elif cache_enabled:
+        RESPONSE_CACHE.uncacheable += 1
+
+    trials = TrialClaims(BREAKERS)
+    if model:
+        prefix: Optional[bytes] = None
+        if PREFIX_AFFINITY_ENABLED:
+            try:
+                raw_messages = await body.slice_from("messages", PREFIX_AFFINITY_CHARS)
+            except RequestBodyTooLarge as exc:
+                raise HTTPException(status_code=413, detail="request_body_too_large") from exc
+            prefix = _affinity_prefix(raw_messages)
+        target_base = await _route_for_model(
+            model, preferred=session_host, prefix=prefix, trials=trials
+        )
+    else:
+        target_base = _sticky_host(None, session_host, trials) or list(LM_HOSTS.values())[0]
+
+    fwd_headers = {"Content-Type": "application/json", "Accept": "text/event-stream"}
     if auth:
         fwd_headers["Authorization"] = auth
 
-    # Bind or resume Cathedral session if bridge is enabled
-    _ws_id, _thr_id, sess_token, created = await _bind_http_session(request)
+    hedged = _hedge_requested(request, model)
+    priority = _request_priority(request, ws_id, "chat")
 
-    async def stream_sse():
-        saw_done = False
-        started = False
+    async def open_upstream(receive: Receive) -> UpstreamStream:
+        if hedged:
+            opened = await _open_hedged_chat_upstream(
+                target_base, model, body, fwd_headers, receive, priority=priority, trials=trials
+            )
+        else:
+            opened = await _open_chat_upstream(
+                target_base, model, body, fwd_headers, receive, priority=priority, trials=trials
+            )
+        # Counted once per upstream generation: coalesced followers and cache
+        # hits never open one.
+        if opened.status_code == 200:
+            tap = UsageTap(
+                USAGE_LEDGER,
+                event_stream=opened.is_event_stream,
+                request_bytes=body.size,
+                host=opened.base,
+                model=model,
+                workspace=ws_id,
+                session=sess_token,
+            )
+            opened.observe(tap.feed)
+            opened.on_close(tap.close)
+        return opened
+
+    framer = SSEFramer()
+    try:
+        if request_key is not None:
+            # The flight reads upstream on its own task; this request only follows it.
+            subscription = SINGLE_FLIGHT.join(
+                request_key,
+                open_upstream,
+                share=COALESCE_IDENTICAL,
+                scope=auth_scope,
+                on_complete=functools.partial(_store_flight, model) if cache_enabled else None,
+            )
+            flight: Optional[Flight] = subscription.flight
+            upstream = await _await_flight(subscription, body.guard_receive(request.receive))
+            if subscription.flight.joined > 1:
+                jlog(
+                    logger,
+                    level="DEBUG",
+                    event="chat_request_coalesced",
+                    model=model,
+                    host=upstream.base,
+                    subscribers=subscription.flight.subscribers,
+                )
+            source = subscription.chunks()
+            framer = subscription.flight.framer
+        else:
+            flight = None
+            upstream = await open_upstream(body.guard_receive(request.receive))
+            source = upstream.events(framer)
+    finally:
+        # Trials claimed while routing that no attempt used: the request was
+        # coalesced, refused admission, or the client left first.
+        trials.release()
+    target_base = upstream.base
+    url = f"{target_base}/v1/chat/completions"
+
+    if ws_id and thr_id and target_base != (session_host or "").rstrip("/"):
+        if session_host:
+            jlog(
+                logger,
+                level="WARN",
+                event="chat_relay_session_failover",
+                session_id=sess_token,
+                previous=session_host,
+                host=target_base,
+            )
+        _spawn_background(sessions.set_host(ws_id, thr_id, target_base, model))
+
+    async def stream_sse() -> AsyncIterator[bytes]:
+        relay = RelayStream(
+            source,
+            body.guard_receive(request.receive),
+            label=url,
+            flush_interval=SSE_FLUSH_INTERVAL_SECONDS,
+        )
+        failed = False
         try:
-            async with httpx.AsyncClient(timeout=None) as client:
-                async with client.stream("POST", url, headers=fwd_headers, content=body_bytes) as upstream:
-                    async for chunk in upstream.aiter_raw():
-                        if await request.is_disconnected():
-                            jlog(logger, event="chat_relay_client_disconnected", url=url)
-                            break
-                        if chunk:
-                            if b"[DONE]" in chunk:
-                                saw_done = True
-                            started = True
-                            yield chunk
-        except httpx.StreamClosed:
-            # Clean EOF from upstream
-            pass
+            async for chunk in relay:
+                yield chunk
         except httpx.HTTPError as exc:
-            jlog(logger, level="ERROR", event="chat_relay_upstream_error", url=url, error=str(exc))
-            if not started:
-                # Only error before any bytes were streamed
-                raise HTTPException(status_code=502, detail="upstream_http_error") from exc
+            # Bytes were already sent, so the stream can only be cut short.
+            failed = True
+            if flight is None:
+                jlog(logger, level="ERROR", event="chat_relay_upstream_error", url=url, error=str(exc))
         finally:
-            if not saw_done and not await request.is_disconnected():
-                # OpenAI-style terminator
-                yield b"data: [DONE]\n\n"
+            # Releases the admission slot and in-flight count (or this request's
+            # place in a shared flight) even if the relay never started reading.
+            if flight is None:
+                await upstream.aclose()
+            else:
+                subscription.close()
+        if upstream.is_event_stream and not framer.done and not relay.disconnected and not failed:
+            # OpenAI-style terminator
+            yield SSE_DONE
+
+    response = StreamingResponse(
+        stream_sse(),
+        status_code=upstream.status_code,
+        media_type=upstream.media_type,
+    )
+    if cache_enabled and request_key is not None:
+        response.headers[CACHE_HEADER] = "miss"
+    response.headers["Server-Timing"] = _server_timing(upstream.timing, received_at)
+    return _with_session_headers(response, sess_token, created)
+
+
+def _server_timing(timing: Optional[RelayTiming], received_at: float) -> str:
+    """``Server-Timing`` for a relayed response: upstream phases plus the
+    time this request spent in the orchestrator before its headers went out."""
+
+    parts = [timing.server_timing()] if timing is not None else []
+    parts.append(f"relay;dur={(time.monotonic() - received_at) * 1000:.1f}")
+    return ", ".join(part for part in parts if part)
+
 
-    response = StreamingResponse(stream_sse(), media_type="text/event-stream")
+def _with_session_headers(response: Response, sess_token: Optional[str], created: bool) -> Response:
     if sess_token:
         response.headers[SESSION_HEADER] = sess_token
         if created:
@@ -1389,18 +2201,617 @@ async def relay_chat_completions(request: Request):
     return response
 
 
+_JSON_DECODER = json.JSONDecoder()
+_PREFIX_ROLES = ("system", "developer")
+
+
+def _affinity_prefix(raw: Optional[bytes]) -> Optional[bytes]:
+    """Routing key for prefix affinity from the start of the raw ``messages``.
+
+    The leading system/developer messages (persona or RAG preamble) are the
+    key, capped at the slice length. Without one, the first characters of the
+    conversation are used so long shared preambles still line up.
+    """
+
+    if not raw:
+        return None
+    text = raw.decode("utf-8", errors="ignore")
+    position = len(text) - len(text.lstrip())
+    if not text.startswith("[", position):
+        return None
+    position += 1
+    end = None
+    while True:
+        while position < len(text) and text[position] in " \t\r\n,":
+            position += 1
+        try:
+            message, after = _JSON_DECODER.raw_decode(text, position)
+        except ValueError:
+            # Cut off inside the message; a truncated system prompt still keys.
+            break
+        if not isinstance(message, dict) or message.get("role") not in _PREFIX_ROLES:
+            if end is not None:
+                return raw[: len(text[:end].encode("utf-8"))]
+            break
+        position = end = after
+    return raw
+
+
+def _is_zero(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value == 0
+
+
+async def _preflight_chat(body: StreamedBody, model: str) -> Optional[JSONResponse]:
+    """Check the prompt estimate against the model's reported context window.
+
+    Returns a ``400 context_length_exceeded`` response only when the message
+    estimate is clearly over the window (see ``preflight.exceeds_window``),
+    and clamps ``max_tokens`` in place when it asks for more than remains.
+    Bodies whose size bounds the estimate well inside the window are passed
+    without parsing; the rest decode only their ``messages`` value. Windows
+    guessed from the model family are not trusted.
+    """
+
+    meta = MODEL_OBJECTS.get(model) or {}
+    window = meta.get("context_window")
+    if not isinstance(window, int) or window <= 0 or meta.get("context_window_source") != "reported":
+        PREFLIGHT_STATS.skipped_unknown_window += 1
+        return None
+    try:
+        chunks = await body.read_chunks()
+        limits = await body.scan(("max_tokens", "max_completion_tokens"))
+    except RequestBodyTooLarge as exc:
+        raise HTTPException(status_code=413, detail="request_body_too_large") from exc
+    PREFLIGHT_STATS.checked += 1
+    requested: Optional[int] = None
+    for key in ("max_completion_tokens", "max_tokens"):
+        value = limits.values.get(key)
+        if isinstance(value, int) and not isinstance(value, bool) and value > 0:
+            requested = value
+            break
+    ceiling = token_ceiling(body.size, count_image_parts(chunks))
+    if ceiling + max(requested or 0, MIN_COMPLETION_TOKENS) <= window:
+        # Neither a rejection nor a clamp is possible; skip the parse.
+        PREFLIGHT_STATS.passed_by_size += 1
+        return None
+    messages = await _preflight_messages(body)
+    if messages is None:
+        # Malformed JSON is left for the upstream to report.
+        return None
+    estimate = estimate_tokens(messages)
+    remaining = window - estimate
+    if exceeds_window(estimate, window):
+        PREFLIGHT_STATS.rejected += 1
+        jlog(
+            logger,
+            level="WARN",
+            event="chat_preflight_rejected",
+            model=model,
+            window=window,
+            estimate=estimate,
+        )
+        return JSONResponse(context_length_error(model, window, estimate, requested), status_code=400)
+    if requested is not None and requested > remaining >= MIN_COMPLETION_TOKENS:
+        # Both fields may be present. Rewrite from the back so the earlier
+        # offset stays valid after the later literal changes length.
+        for key, start in sorted(limits.offsets.items(), key=lambda item: -item[1]):
+            value = limits.values.get(key)
+            if isinstance(value, int) and not isinstance(value, bool) and value > remaining:
+                body.replace_literal(start, str(remaining).encode("ascii"))
+        PREFLIGHT_STATS.clamped += 1
+        jlog(
+            logger,
+            level="DEBUG",
+            event="chat_preflight_clamped",
+            model=model,
+            window=window,
+            estimate=estimate,
+            requested=requested,
+            max_tokens=remaining,
+        )
+    return None
+
+
+async def _preflight_messages(body: StreamedBody) -> Optional[List[Any]]:
+    """Decode only the top-level ``messages`` array of a fully read body."""
+
+    raw = await body.slice_from("messages", body.size)
+    if not raw:
+        return None
+    text = raw.decode("utf-8", errors="replace")
+    try:
+        messages, _end = _JSON_DECODER.raw_decode(text, len(text) - len(text.lstrip()))
+    except ValueError:
+        return None
+    return messages if isinstance(messages, list) else None
+
+
+async def _chat_request_key(body: StreamedBody, credential: Optional[str]) -> Optional[str]:
+    """Read and hash the whole body of a deterministic chat request.
+
+    ``credential`` is the caller's ``credential_scope``. Returns ``None`` when
+    the body is not valid JSON or not deterministic.
+    """
+
+    try:
+        raw = await body.read()
+    except RequestBodyTooLarge as exc:
+        raise HTTPException(status_code=413, detail="request_body_too_large") from exc
+    try:
+        payload = json.loads(raw)
+    except ValueError:
+        return None
+    return cache_key(payload, credential)
+
+
+async def _await_flight(subscription: Subscription, receive: Receive) -> UpstreamStream:
+    """Wait for a flight's upstream while watching this client.
+
+    A client that leaves first drops its subscription; the flight is cancelled
+    (and any admission wait abandoned) once no subscriber remains.
+    """
+
+    opened = asyncio.ensure_future(subscription.opened())
+    watcher = asyncio.ensure_future(receive())
+    try:
+        await asyncio.wait({opened, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except BaseException:
+        opened.cancel()
+        subscription.close()
+        raise
+    finally:
+        watcher.cancel()
+    if not opened.done():
+        opened.cancel()
+        subscription.close()
+        raise HTTPException(status_code=499, detail="client_closed_request")
+    try:
+        return opened.result()
+    except BaseException:
+        subscription.close()
+        raise
+
+
+def _store_flight(model: Optional[str], flight: Flight) -> None:
+    upstream = flight.upstream
+    if upstream is None or upstream.status_code != 200:
+        return
+    entry = CachedResponse(200, upstream.media_type, b"".join(flight.chunks), model)
+    if RESPONSE_CACHE.put(flight.key, entry):
+        jlog(logger, level="DEBUG", event="response_cache_stored", model=model, bytes=entry.size)
+        _spawn_background(RESPONSE_CACHE.persist(flight.key, entry))
+
+
+def _failover_host(
+    model: Optional[str], tried: List[str], trials: Optional[TrialClaims] = None
+) -> Optional[str]:
+    """Next healthy host serving ``model`` that this request has not tried yet.
+
+    The pick is claimed in ``trials`` like a routing decision.
+    """
+
+    if not model or HOST_POOL is None:
+        return None
+    remaining = [
+        base
+        for base in HOST_POOL.hosts_for_model(model)
+        if base not in tried and HOST_POOL.is_alive(base) and BREAKERS.available(base)
+    ]
+    if not remaining:
+        return None
+    if len(remaining) == 1:
+        return _claim_route(remaining[0], trials)
+    return _claim_route(ROUTING_POLICY.choose(remaining, HOST_STATS), trials)
+
+
+async def _open_chat_upstream(
+    base: str,
+    model: Optional[str],
+    body: StreamedBody,
+    headers: Dict[str, str],
+    receive: Receive,
+    tried: Optional[List[str]] = None,
+    *,
+    priority: int = STANDARD,
+    trials: Optional[TrialClaims] = None,
+) -> UpstreamStream:
+    """Open the chat stream, failing over before the first byte.
+
+    Each attempt first takes an admission slot on its host, then replays the
+    original body. A host that refuses the connection, answers 5xx, or closes
+    without a byte is marked down in ``HOST_POOL`` and the next healthy host
+    serving the model is tried, up to ``FAILOVER_MAX_ATTEMPTS``. The returned
+    stream holds the admission lease and one ``HOST_STATS`` in-flight count,
+    both released when it closes. ``tried`` is shared with a concurrent hedge
+    so failover never lands on the host the hedge is already using.
+    """
+
+    tried = tried if tried is not None else []
+    attempts = 0
+    current: Optional[str] = base.rstrip("/")
+    while current is not None:
+        if current not in tried:
+            tried.append(current)
+        attempts += 1
+        # Count the relay as in flight from the routing decision (queued included)
+        # so concurrent requests see each other's load before their streams start.
+        HOST_STATS.begin(current)
+        try:
+            lease = await _admit(current, model, receive, priority, route="chat")
+        except BaseException:
+            HOST_STATS.end(current)
+            if trials is not None:
+                trials.release(current)
+            raise
+        try:
+            return await _send_chat_attempt(
+                current, model, body, headers, lease, attempt=attempts, trials=trials
+            )
+        except UpstreamUnavailable:
+            if attempts >= FAILOVER_MAX_ATTEMPTS:
+                break
+            previous, current = current, _failover_host(model, tried, trials)
+            if current is not None:
+                jlog(
+                    logger,
+                    level="WARN",
+                    event="chat_relay_failover",
+                    model=model,
+                    previous=previous,
+                    host=current,
+                    attempt=attempts + 1,
+                )
+    raise HTTPException(status_code=502, detail="upstream_unavailable")
+
+
+async def _send_chat_attempt(
+    base: str,
+    model: Optional[str],
+    body: StreamedBody,
+    headers: Dict[str, str],
+    lease: Lease,
+    *,
+    attempt: int,
+    trials: Optional[TrialClaims] = None,
+) -> UpstreamStream:
+    """Send one chat attempt on an admitted slot.
+
+    The caller has counted ``base`` in ``HOST_STATS``. That count and ``lease``
+    are released when the returned stream closes, or right away when the
+    attempt fails. ``UpstreamUnavailable`` is logged and marks the host down
+    before it propagates.
+    """
+
+    client = UPSTREAM_POOL.client_for(base)
+    if trials is not None:
+        trials.sent(base)
+    BREAKERS.attempt(base)
+    upstream_request = client.build_request(
+        "POST",
+        f"{base}/v1/chat/completions",
+        headers=body.headers(headers),
+        content=body.replay(),
+        timeout=CHAT_UPSTREAM_TIMEOUT,
+    )
+    try:
+        upstream = await open_upstream_stream(
+            client,
+            upstream_request,
+            base=base,
+            timing=RELAY_METRICS.timing("chat", base, model),
+        )
+    except BaseException as exc:
+        lease.release()
+        HOST_STATS.end(base)
+        if isinstance(exc, RequestBodyTooLarge):
+            raise HTTPException(status_code=413, detail="request_body_too_large") from exc
+        if isinstance(exc, UpstreamUnavailable):
+            jlog(
+                logger,
+                level="ERROR",
+                event="chat_relay_upstream_error",
+                host=base,
+                model=model,
+                attempt=attempt,
+                status=exc.status,
+                error=exc.reason,
+            )
+            BREAKERS.record(base, _failure_kind(exc))
+            if HOST_POOL is not None:
+                HOST_POOL.mark_failed(base, exc.reason)
+        raise
+    HOST_STATS.record_ttft(base, upstream.ttft)
+    upstream.on_close(lease.release)
+    upstream.on_close(functools.partial(HOST_STATS.end, base))
+    upstream.on_close(functools.partial(_record_stream_outcome, upstream))
+    return upstream
+
+
+def _hedge_requested(request: Request, model: Optional[str]) -> bool:
+    """Hedging is opt-in per request (``X-Cathedral-Hedge``) or per model."""
+
+    header = request.headers.get(HEDGE_HEADER)
+    if header is not None:
+        return header.strip().lower() in ("1", "true", "yes", "on")
+    return model is not None and model in HEDGE_MODELS
+
+
+def _hedge_delay(base: str) -> float:
+    ttft = HOST_STATS.ttft_percentile(base, HEDGE_PERCENTILE)
+    if ttft is None:
+        return HEDGE_DEFAULT_DELAY_SECONDS
+    return max(HEDGE_MIN_DELAY_SECONDS, ttft)
+
+
+async def _open_hedged_chat_upstream(
+    base: str,
+    model: Optional[str],
+    body: StreamedBody,
+    headers: Dict[str, str],
+    receive: Receive,
+    *,
+    priority: int = STANDARD,
+    trials: Optional[TrialClaims] = None,
+) -> UpstreamStream:
+    """Race a delayed second host against the primary attempt.
+
+    The primary runs the usual admission and failover path. If it has no first
+    byte after ``HEDGE_PERCENTILE`` of the host's recent TTFT, the same body is
+    sent to another healthy host serving the model, provided that host has a
+    free admission slot right now (hedges never queue). The first stream to
+    answer wins; the other attempt is cancelled or closed so its host stops
+    generating.
+    """
+
+    primary_base = base.rstrip("/")
+    tried: List[str] = [primary_base]
+    HEDGE_STATS.requests += 1
+    primary = asyncio.ensure_future(
+        _open_chat_upstream(
+            primary_base, model, body, headers, receive, tried, priority=priority, trials=trials
+        )
+    )
+    attempts = [primary]
+    pending = {primary}
+    winner: Optional["asyncio.Future[UpstreamStream]"] = None
+    try:
+        done, pending = await asyncio.wait(pending, timeout=_hedge_delay(primary_base))
+        if done:
+            winner = primary
+            return primary.result()
+        hedge_base = _failover_host(model, tried, trials)
+        if hedge_base is None:
+            HEDGE_STATS.skipped_no_host += 1
+            winner = primary
+            return await primary
+        lease = ADMISSION.try_admit(hedge_base, model, priority)
+        if lease is None:
+            if trials is not None:
+                trials.release(hedge_base)
+            HEDGE_STATS.skipped_busy += 1
+            jlog(logger, level="DEBUG", event="chat_hedge_skipped_busy", model=model, host=hedge_base)
+            winner = primary
+            return await primary
+        tried.append(hedge_base)
+        HEDGE_STATS.hedged += 1
+        jlog(logger, event="chat_hedge_started", model=model, primary=primary_base, host=hedge_base)
+        HOST_STATS.begin(hedge_base)
+        hedge = asyncio.ensure_future(
+            _send_chat_attempt(
+                hedge_base, model, body, headers, lease, attempt=len(tried), trials=trials
+            )
+        )
+        attempts.append(hedge)
+        pending = {primary, hedge}
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in attempts:
+                if task in done and task.exception() is None and winner is None:
+                    winner = task
+        if winner is None:
+            # Both failed; the primary's error already covers its failover.
+            return primary.result()
+        upstream = winner.result()
+        if winner is hedge:
+            HEDGE_STATS.hedge_wins += 1
+        jlog(
+            logger,
+            event="chat_hedge_won",
+            model=model,
+            host=upstream.base,
+            hedge=winner is hedge,
+            ttft_ms=round(upstream.ttft * 1000, 1),
+        )
+        return upstream
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+        for task in attempts:
+            # A loser that answered while being cancelled still holds a stream.
+            if task is not winner and not task.cancelled() and task.exception() is None:
+                await task.result().aclose()
+
+
+def _request_priority(request: Request, workspace: Optional[str], route: str) -> int:
+    """Priority class rank: ``X-Cathedral-Priority``, then the workspace map,
+    then the route default (embeddings are bulk, chat is standard)."""
+
+    rank = parse_priority(request.headers.get(PRIORITY_HEADER))
+    if rank is not None:
+        return rank
+    if workspace is None:
+        session = request.headers.get(SESSION_HEADER) or ""
+        workspace = session.split(":", 1)[0] if ":" in session else request.headers.get(WORKSPACE_HEADER)
+    if workspace and workspace in PRIORITY_WORKSPACES:
+        return PRIORITY_WORKSPACES[workspace]
+    return BULK if route == "embeddings" else STANDARD
+
+
+async def _admit(
+    host: str,
+    model: Optional[str],
+    receive: Receive,
+    priority: int = STANDARD,
+    *,
+    route: str,
+) -> Lease:
+    """Take a generation slot on ``host``, queueing behind other requests.
+
+    Full queues and expired waits become 429/503 with ``Retry-After``. A client
+    that disconnects while queued gives its place up instead of holding it.
+    """
+
+    lease = ADMISSION.try_admit(host, model, priority)
+    if lease is not None:
+        return lease
+    jlog(
+        logger,
+        level="DEBUG",
+        event=f"{route}_admission_queued",
+        host=host,
+        model=model,
+        priority=PRIORITIES[priority],
+        queued=ADMISSION.queued(host),
+    )
+    admit = asyncio.ensure_future(ADMISSION.admit(host, model, priority))
+    watcher = asyncio.ensure_future(receive())
+    try:
+        await asyncio.wait({admit, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except BaseException:
+        admit.cancel()
+        if admit.done() and not admit.cancelled() and admit.exception() is None:
+            admit.result().release()
+        raise
+    finally:
+        watcher.cancel()
+    if not admit.done():
+        admit.cancel()
+        await asyncio.wait({admit})
+        if not admit.cancelled() and admit.exception() is None:
+            admit.result().release()
+        jlog(logger, event=f"{route}_admission_abandoned", host=host, model=model)
+        raise HTTPException(status_code=499, detail="client_closed_request")
+    try:
+        lease = admit.result()
+    except AdmissionRejected as exc:
+        jlog(
+            logger,
+            level="WARN",
+            event=f"{route}_admission_rejected",
+            host=host,
+            model=model,
+            priority=PRIORITIES[priority],
+            reason=exc.reason,
+            retry_after=exc.retry_after,
+        )
+        raise HTTPException(
+            status_code=exc.status_code,
+            detail=exc.reason,
+            headers={"Retry-After": str(exc.retry_after)},
+        ) from exc
+    return lease
+
+
+async def _passthrough_embeddings(request: Request, streamed: StreamedBody, model: Any) -> Response:
+    trials = TrialClaims(BREAKERS)
+    if isinstance(model, str) and model:
+        target = await _route_for_model(model, trials=trials)
+    else:
+        target = list(LM_HOSTS.values())[0]
+    received_at = time.monotonic()
+    headers = streamed.headers({"Content-Type": "application/json"})
+    response, timing = await _post_embeddings(
+        target,
+        model,
+        streamed.guard_receive(request.receive),
+        _request_priority(request, None, "embeddings"),
+        trials=trials,
+        headers=headers,
+        content=streamed.replay(),
+    )
+    response.raise_for_status()
+    return Response(
+        content=response.content,
+        status_code=response.status_code,
+        media_type=response.headers.get("content-type", "application/json"),
+        headers={"Server-Timing": _server_timing(timing, received_at)},
+    )
+
+
+async def _post_embeddings(
+    target: str,
+    model: Any,
+    receive: Receive,
+    priority: int,
+    *,
+    trials: Optional[TrialClaims] = None,
+    **kwargs: Any,
+) -> Tuple[httpx.Response, RelayTiming]:
+    """POST to ``target``'s embeddings endpoint on an admitted slot and record its timing.
+
+    A half-open trial claimed in ``trials`` is released if admission fails.
+    """
+
+    url = target.rstrip("/") + "/v1/embeddings"
+    model_id = model if isinstance(model, str) else None
+    HOST_STATS.begin(target)
+    try:
+        lease = await _admit(target, model_id, receive, priority, route="embeddings")
+    except BaseException:
+        HOST_STATS.end(target)
+        if trials is not None:
+            trials.release(target)
+        raise
+    timing = RELAY_METRICS.timing("embeddings", target, model_id)
+    if trials is not None:
+        trials.sent(target)
+    BREAKERS.attempt(target)
+    try:
+        response = await UPSTREAM_POOL.client_for(target).post(
+            url, extensions={"trace": timing.trace}, **kwargs
+        )
+    except BaseException as exc:
+        timing.error()
+        if isinstance(exc, httpx.TransportError):
+            BREAKERS.record(target, _failure_kind(exc))
+        raise
+    finally:
+        lease.release()
+        HOST_STATS.end(target)
+    BREAKERS.record(target, CIRCUIT_ERROR if response.status_code >= 500 else CIRCUIT_OK)
+    elapsed = time.monotonic() - timing.started
+    timing.first_byte(timing.headers if timing.headers is not None else elapsed)
+    timing.streamed = True
+    timing.count(len(response.content), 1)
+    timing.finish()
+    return response, timing
+
+
 @app.post("/v1/embeddings")
 async def embeddings(request: Request):
-    body = await request.json()
+    received_at = time.monotonic()
+    try:
+        streamed = StreamedBody(request, keys=("model",), limit=MAX_REQUEST_BODY_BYTES)
+        sess_header = request.headers.get(SESSION_HEADER)
+        if not sess_header and not (UPSERTS_ACTIVE and CHROMA_CLIENT is not None):
+            # Nothing to inject or upsert: route on the peeked model and pass bytes through.
+            peeked = await streamed.peek()
+            return await _passthrough_embeddings(request, streamed, peeked.get("model"))
+        body = json.loads(await streamed.read())
+    except RequestBodyTooLarge as exc:
+        raise HTTPException(status_code=413, detail="request_body_too_large") from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="invalid_json") from exc
     # If a Cathedral session header is present, bind it into embeddings metadata
-    sess_header = request.headers.get(SESSION_HEADER)
     if sess_header:
         meta = body.get("metadata") or {}
         meta.setdefault("_session", sess_header)
         body["metadata"] = meta
     model = body.get("model")
-    target = await _route_for_model(model) if model else list(LM_HOSTS.values())[0]
-    url = target.rstrip("/") + "/v1/embeddings"
+    trials = TrialClaims(BREAKERS)
+    target = await _route_for_model(model, trials=trials) if model else list(LM_HOSTS.values())[0]
     headers = {"Content-Type": "application/json"}
 
     raw_input = body.get("input")
@@ -1414,10 +2825,15 @@ async def embeddings(request: Request):
     else:
         inputs_list = []
 
-    client = APP_CLIENTS.get("lm")
-    if not client:
-        raise HTTPException(status_code=503, detail="client not ready")
-    response = await client.post(url, headers=headers, json=body)
+    response, timing = await _post_embeddings(
+        target,
+        model,
+        request.receive,
+        _request_priority(request, None, "embeddings"),
+        trials=trials,
+        headers=headers,
+        json=body,
+    )
     response.raise_for_status()
     data = response.json()
     try:
@@ -1468,4 +2884,8 @@ async def embeddings(request: Request):
                     )
     except Exception as exc:  # pragma: no cover - chroma guard
         jlog(logger, level="ERROR", event="chroma_upsert_fail", error=str(exc))
-    return JSONResponse(data, status_code=response.status_code)
+    return JSONResponse(
+        data,
+        status_code=response.status_code,
+        headers={"Server-Timing": _server_timing(timing, received_at)},
+    )
@@ -0,0 +1,212 @@
+"""Fixed-bucket latency histograms for the chat and embeddings relays.
+
+Each ``(route, host, model)`` series keeps histograms for upstream connect
+time, time to first byte, the gap between upstream chunks, and total stream
+duration, plus byte/event/request counters. Observing a value is one
+``bisect`` and two additions, so it runs inline on the relay path.
+
+``RelayTiming`` follows one upstream exchange. It hooks the httpcore
+``trace`` extension to time new TCP/TLS connections (pooled keep-alive
+connections report none) and the arrival of response headers, and renders the
+``Server-Timing`` header. ``RelayMetrics.render`` emits the Prometheus text
+exposition served at ``/metrics``.
+"""
+
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+)
+GAP_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+# Series beyond this many are folded into ``model="_other"`` per route/host.
+MAX_SERIES = 256
+OTHER_MODEL = "_other"
+
+_CONNECT_STARTED = "connection.connect_tcp.started"
+_CONNECT_DONE = ("connection.connect_tcp.complete", "connection.start_tls.complete")
+_HEADERS_DONE = ("http11.receive_response_headers.complete", "http2.receive_response_headers.complete")
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total = 0
+        rows: List[Tuple[str, int]] = []
+        for bound, count in zip(self.bounds, self.counts):
+            total += count
+            rows.append((_format_float(bound), total))
+        rows.append(("+Inf", total + self.counts[-1]))
+        return rows
+
+
+class RelaySeries:
+    __slots__ = ("connect", "ttfb", "gap", "duration", "requests", "errors", "bytes", "events")
+
+    def __init__(self) -> None:
+        self.connect = Histogram(LATENCY_BUCKETS)
+        self.ttfb = Histogram(LATENCY_BUCKETS)
+        self.gap = Histogram(GAP_BUCKETS)
+        self.duration = Histogram(LATENCY_BUCKETS)
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self.events = 0
+
+
+class RelayTiming:
+    """Timing of one upstream exchange; ``finish`` is idempotent."""
+
+    __slots__ = (
+        "series", "started", "connect", "headers", "ttfb", "streamed",
+        "_connect_started", "_last_chunk", "_finished",
+    )
+
+    def __init__(self, series: RelaySeries) -> None:
+        self.series = series
+        self.started = time.monotonic()
+        self.connect: Optional[float] = None
+        self.headers: Optional[float] = None
+        self.ttfb: Optional[float] = None
+        self.streamed = False
+        self._connect_started: Optional[float] = None
+        self._last_chunk: Optional[float] = None
+        self._finished = False
+        series.requests += 1
+
+    async def trace(self, name: str, info: Dict[str, Any]) -> None:
+        """httpcore ``trace`` extension callback."""
+
+        if name == _CONNECT_STARTED:
+            self._connect_started = time.monotonic()
+        elif name in _CONNECT_DONE and self._connect_started is not None:
+            self.connect = time.monotonic() - self._connect_started
+        elif name in _HEADERS_DONE and self.headers is None:
+            self.headers = time.monotonic() - self.started
+
+    def first_byte(self, seconds: float) -> None:
+        self.ttfb = seconds
+        self.series.ttfb.observe(seconds)
+        self._last_chunk = time.monotonic()
+
+    def chunk(self, size: int, events: int) -> None:
+        """Count an upstream chunk and observe the gap since the previous one."""
+
+        now = time.monotonic()
+        last = self._last_chunk
+        if last is not None:
+            self.series.gap.observe(now - last)
+        self._last_chunk = now
+        self.count(size, events)
+
+    def count(self, size: int, events: int) -> None:
+        self.series.bytes += size
+        self.series.events += events
+
+    def error(self) -> None:
+        self.series.errors += 1
+        self._finished = True
+
+    def finish(self) -> None:
+        if self._finished:
+            return
+        self._finished = True
+        if self.connect is not None:
+            self.series.connect.observe(self.connect)
+        if self.streamed:
+            self.series.duration.observe(time.monotonic() - self.started)
+
+    def server_timing(self) -> str:
+        parts = []
+        if self.connect is not None:
+            parts.append(f"connect;dur={self.connect * 1000:.1f}")
+        if self.headers is not None:
+            parts.append(f"headers;dur={self.headers * 1000:.1f}")
+        if self.ttfb is not None:
+            parts.append(f"ttfb;dur={self.ttfb * 1000:.1f}")
+        return ", ".join(parts)
+
+
+class RelayMetrics:
+    def __init__(self) -> None:
+        self._series: Dict[Tuple[str, str, str], RelaySeries] = {}
+
+    def series(self, route: str, host: str, model: Optional[str]) -> RelaySeries:
+        key = (route, host.rstrip("/"), model or "")
+        series = self._series.get(key)
+        if series is None:
+            if len(self._series) >= MAX_SERIES:
+                key = (route, key[1], OTHER_MODEL)
+                series = self._series.get(key)
+            if series is None:
+                series = RelaySeries()
+                self._series[key] = series
+        return series
+
+    def timing(self, route: str, host: str, model: Optional[str]) -> RelayTiming:
+        return RelayTiming(self.series(route, host, model))
+
+    def render(self) -> str:
+        """Prometheus text exposition (format 0.0.4)."""
+
+        lines: List[str] = []
+        counters = (
+            ("requests", "Upstream exchanges started."),
+            ("errors", "Upstream exchanges that failed before the first byte."),
+            ("bytes", "Response bytes relayed from upstream."),
+            ("events", "Response events (SSE events or JSON bodies) relayed."),
+        )
+        for field, help_text in counters:
+            name = f"cathedral_relay_{field}_total"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for key, series in sorted(self._series.items()):
+                lines.append(f"{name}{{{_labels(key)}}} {getattr(series, field)}")
+        histograms = (
+            ("connect", "New upstream TCP/TLS connection setup time."),
+            ("ttfb", "Time from sending the request to the first response body byte."),
+            ("gap", "Time between consecutive upstream response chunks."),
+            ("duration", "Time from sending the request to the end of the relayed stream."),
+        )
+        for field, help_text in histograms:
+            name = f"cathedral_relay_{field}_seconds"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, series in sorted(self._series.items()):
+                histogram: Histogram = getattr(series, field)
+                labels = _labels(key)
+                for bound, count in histogram.cumulative():
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f"{name}_sum{{{labels}}} {_format_float(histogram.sum)}")
+                lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(key: Tuple[str, str, str]) -> str:
+    route, host, model = key
+    return f'route="{_escape(route)}",host="{_escape(host)}",model="{_escape(model)}"'
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_float(value: float) -> str:
+    return repr(float(value))
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import os
 import time
@@ -12,6 +13,7 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
 from . import persona_manager, sessions, voice_proxy
 from .logging_config import jlog, setup_logging
+from .resource_feed import ResourceFeed, Subscription
 from .toolbridge import ToolBridge
 from .vector.chroma_client import ChromaClient
 
@@ -33,6 +35,61 @@ HANDLED_SCOPES = (
 
 DELEGATED_SCOPES = ("tools.*",)
 
+# Catalog/host-health changes pushed to ``resources.subscribe`` connections.
+RESOURCE_FEED = ResourceFeed()
+
+
+class _ResourceStream:
+    """One connection's ``resources.subscribe`` state and push task.
+
+    Pushed frames and request replies share ``lock`` so frames never interleave.
+    """
+
+    def __init__(
+        self,
+        ws: WebSocket,
+        lock: asyncio.Lock,
+        frame_for: Callable[[str, Dict[str, Any]], Dict[str, Any]],
+    ) -> None:
+        self._ws = ws
+        self._lock = lock
+        self._frame_for = frame_for
+        self._subscription: Optional[Subscription] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def start(self, rid: str) -> Dict[str, Any]:
+        """Subscribe (once per connection) and return the full current state."""
+
+        if self._subscription is None:
+            self._subscription = RESOURCE_FEED.subscribe()
+            self._task = asyncio.get_running_loop().create_task(
+                self._pump(rid, self._subscription)
+            )
+            jlog(logger, event="mpc_resources_subscribed", version=RESOURCE_FEED.version)
+        return RESOURCE_FEED.state()
+
+    async def _pump(self, rid: str, subscription: Subscription) -> None:
+        try:
+            while True:
+                event = await subscription.get()
+                frame = self._frame_for(rid, event)
+                async with self._lock:
+                    await self._ws.send_text(json.dumps(frame))
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:  # closed socket
+            jlog(logger, level="DEBUG", event="mpc_resources_push_stopped", error=str(exc))
+
+    def stop(self) -> bool:
+        subscription, task = self._subscription, self._task
+        self._subscription = self._task = None
+        if subscription is None:
+            return False
+        subscription.close()
+        if task is not None:
+            task.cancel()
+        return True
+
 
 class MPCServer:
     def __init__(
@@ -45,6 +102,7 @@ class MPCServer:
         collection_name_provider: Callable[[], str],
         upsert_allowed: Callable[[], bool],
         auto_config_allowed: Callable[[], bool],
+        session_warmup: Optional[Callable[[str, str], None]] = None,
     ):
         self.tb = toolbridge
         self.chroma = chroma
@@ -53,6 +111,8 @@ class MPCServer:
         self._collection_name_provider = collection_name_provider
         self._upsert_allowed = upsert_allowed
         self._auto_config_allowed = auto_config_allowed
+        # Fire-and-forget priming of a newly assigned session model.
+        self._session_warmup = session_warmup
         # Small TTL cache for tools list to avoid hammering HA
         self._tools_cache: Optional[List[Dict[str, Any]]] = None
         self._tools_cache_ts: float = 0.0
@@ -182,6 +242,8 @@ class MPCServer:
             host=host_choice,
             model=model_id,
         )
+        if self._session_warmup is not None and model_id:
+            self._session_warmup(host_choice, model_id)
         return host_choice, model_id
 
     async def _ensure_session_collection(
@@ -286,6 +348,17 @@ class MPCServer:
 
     async def handle(self, ws: WebSocket):
         await ws.accept()
+        send_lock = asyncio.Lock()
+        resources = _ResourceStream(
+            ws,
+            send_lock,
+            lambda rid, event: {
+                "id": rid,
+                "scope": "resources.changed",
+                "response": {"ok": True, "body": event},
+                "ts": time.time(),
+            },
+        )
         try:
             while True:
                 raw = await ws.receive_text()
@@ -308,6 +381,10 @@ class MPCServer:
                         res = await self._handle_memory(msg)
                     elif scope == "resources.list":
                         res = {"ok": True, "body": await self._handle_resources()}
+                    elif scope == "resources.subscribe":
+                        res = {"ok": True, "body": resources.start(rid)}
+                    elif scope == "resources.unsubscribe":
+                        res = {"ok": True, "body": {"unsubscribed": resources.stop()}}
                     elif scope == "resources.health":
                         from . import main as orchestrator_main
 
@@ -370,9 +447,12 @@ class MPCServer:
                     )
                     res = {"ok": False, "error": str(exc)}
                 frame = {"id": rid, "scope": scope, "response": res, "ts": time.time()}
-                await ws.send_text(json.dumps(frame))
+                async with send_lock:
+                    await ws.send_text(json.dumps(frame))
         except WebSocketDisconnect:
             return
+        finally:
+            resources.stop()
 
     async def _handle_tools(self, msg: Dict[str, Any]) -> Dict[str, Any]:
         tool = msg.get("tool")
@@ -558,6 +638,18 @@ def set_server(server: MPCServer) -> None:
 async def mcp_socket(ws: WebSocket):
     await ws.accept()
     server = get_server()
+    send_lock = asyncio.Lock()
+    resources = _ResourceStream(
+        ws,
+        send_lock,
+        lambda rid, event: {
+            "id": rid,
+            "type": "mcp.event",
+            "scope": "resources.changed",
+            "ok": True,
+            "body": event,
+        },
+    )
     try:
         while True:
             raw = await ws.receive_text()
@@ -704,6 +796,20 @@ async def mcp_socket(ws: WebSocket):
                     "ok": True,
                     "body": await server._handle_resources(),
                 }
+            elif scope == "resources.subscribe":
+                frame = {
+                    "id": rid,
+                    "type": "mcp.response",
+                    "ok": True,
+                    "body": resources.start(rid),
+                }
+            elif scope == "resources.unsubscribe":
+                frame = {
+                    "id": rid,
+                    "type": "mcp.response",
+                    "ok": True,
+                    "body": {"unsubscribed": resources.stop()},
+                }
             elif scope == "resources.health":
                 from . import main as orchestrator_main
 
@@ -782,6 +888,9 @@ async def mcp_socket(ws: WebSocket):
                     "error": {"code": "UNKNOWN_SCOPE"},
                 }
 
-            await ws.send_text(json.dumps(frame))
+            async with send_lock:
+                await ws.send_text(json.dumps(frame))
     except WebSocketDisconnect:
         return
+    finally:
+        resources.stop()
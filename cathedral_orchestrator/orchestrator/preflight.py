@@ -0,0 +1,137 @@
+"""Context-window preflight for chat completions.
+
+``token_ceiling`` bounds the estimate from the body size alone (one
+``bytes.count`` per chunk for image parts), so bodies that cannot come near
+the window are passed without parsing. Only the others have their
+``messages`` value decoded. ``estimate_tokens`` then approximates the prompt size from the parsed ``messages``
+only: the text of each message (and of its tool calls) plus a fixed
+per-message overhead for the chat template. Inline images count a flat
+``IMAGE_TOKENS`` each instead of their base64 bytes, and ``tools`` schemas and
+JSON escaping are not counted at all. ASCII text averages about four bytes per
+BPE token and UTF-8 multi-byte text about three; dense code and numbers make
+the estimate err low and prose makes it err high, so a request is only
+rejected when the estimate exceeds the window by ``REJECT_MARGIN``. Below
+that, the request is forwarded and at most has ``max_tokens`` clamped.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Optional
+
+ASCII_BYTES_PER_TOKEN = 4
+NON_ASCII_BYTES_PER_TOKEN = 3
+# Role markers and separators the chat template adds around each message.
+MESSAGE_OVERHEAD_TOKENS = 4
+# Flat cost of one image part; vision encoders emit a few hundred tokens.
+IMAGE_TOKENS = 768
+IMAGE_PART_TYPES = frozenset({"image_url", "input_image", "image"})
+# Reject only when the estimate exceeds the window by this factor.
+REJECT_MARGIN = 1.2
+# Completion budget a request must have left after its prompt.
+MIN_COMPLETION_TOKENS = 1
+
+_ASCII = bytes(range(128))
+
+
+def estimate_text_tokens(text: str) -> int:
+    """Approximate token count of one string."""
+
+    raw = text.encode("utf-8", errors="ignore")
+    other = len(raw.translate(None, _ASCII))
+    return -(-(len(raw) - other) // ASCII_BYTES_PER_TOKEN) - (-other // NON_ASCII_BYTES_PER_TOKEN)
+
+
+def token_ceiling(size: int, images: int) -> int:
+    """Upper bound of ``estimate_tokens`` for a body of ``size`` bytes.
+
+    JSON escapes never decode to more bytes than they take, and every message
+    and content part spends more bytes on keys than its overhead, so the
+    densest text ratio over the whole body plus ``images`` flat image costs
+    cannot be exceeded. ``images`` may overcount.
+    """
+
+    return -(-size // NON_ASCII_BYTES_PER_TOKEN) + images * IMAGE_TOKENS
+
+
+def count_image_parts(chunks: Iterable[bytes]) -> int:
+    """Occurrences of ``image`` in the body: at least the number of image parts."""
+
+    return sum(chunk.count(b"image") for chunk in chunks)
+
+
+def _content_tokens(content: Any) -> int:
+    if isinstance(content, str):
+        return estimate_text_tokens(content)
+    if not isinstance(content, list):
+        return 0
+    total = 0
+    for part in content:
+        if isinstance(part, str):
+            total += estimate_text_tokens(part)
+        elif isinstance(part, dict):
+            if part.get("type") in IMAGE_PART_TYPES:
+                total += IMAGE_TOKENS
+            elif isinstance(part.get("text"), str):
+                total += estimate_text_tokens(part["text"])
+    return total
+
+
+def estimate_tokens(messages: Iterable[Any]) -> int:
+    """Approximate prompt tokens of a chat ``messages`` list."""
+
+    total = 0
+    for message in messages:
+        if not isinstance(message, dict):
+            continue
+        total += MESSAGE_OVERHEAD_TOKENS + _content_tokens(message.get("content"))
+        tool_calls = message.get("tool_calls")
+        if not isinstance(tool_calls, list):
+            continue
+        for call in tool_calls:
+            function = call.get("function") if isinstance(call, dict) else None
+            if isinstance(function, dict):
+                for field in ("name", "arguments"):
+                    if isinstance(function.get(field), str):
+                        total += estimate_text_tokens(function[field])
+    return total
+
+
+def exceeds_window(estimate: int, window: int) -> bool:
+    """Whether ``estimate`` is clearly, not just possibly, over ``window``."""
+
+    return estimate > window * REJECT_MARGIN
+
+
+def context_length_error(model: str, window: int, estimate: int, requested: Optional[int]) -> Dict[str, Any]:
+    """OpenAI-style error body for a request that cannot fit ``window``."""
+
+    message = (
+        f"This model's maximum context length is {window} tokens. However, your "
+        f"messages resulted in about {estimate} tokens"
+    )
+    if requested:
+        message += f" (plus {requested} requested for the completion)"
+    message += ". Please reduce the length of the messages."
+    return {
+        "error": {
+            "message": message,
+            "type": "invalid_request_error",
+            "param": "messages",
+            "code": "context_length_exceeded",
+            "model": model,
+        }
+    }
+
+
+class PreflightStats:
+    __slots__ = ("checked", "passed_by_size", "rejected", "clamped", "skipped_unknown_window")
+
+    def __init__(self) -> None:
+        self.checked = 0
+        self.passed_by_size = 0
+        self.rejected = 0
+        self.clamped = 0
+        self.skipped_unknown_window = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in self.__slots__}
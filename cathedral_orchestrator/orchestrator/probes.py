@@ -0,0 +1,131 @@
+"""Per-host probe scheduling for ``HostPool``.
+
+Every host carries its own next-probe time instead of sharing one fixed cycle:
+
+- a host that answers with an unchanged model list is probed less often, up
+  to ``STABLE_MAX_INTERVAL`` (each stable probe stretches the interval by
+  ``STABLE_GROWTH``); any change snaps it back to the base interval;
+- a host that fails is retried after ``BACKOFF_MIN`` seconds, doubling per
+  consecutive failure up to ``BACKOFF_MAX``, so a box that is off for the
+  night costs one connect timeout every few minutes instead of every cycle;
+- ``expedite`` re-probes a host right away (no sooner than ``MIN_GAP`` after
+  its last probe) when the relay sees it fail;
+- every interval gets +/-``JITTER`` so hosts drift apart instead of being
+  probed in lockstep.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+DEFAULT_BASE_INTERVAL = 30.0
+STABLE_MAX_INTERVAL = 120.0
+STABLE_GROWTH = 1.5
+BACKOFF_MIN = 5.0
+BACKOFF_MAX = 300.0
+JITTER = 0.1
+MIN_GAP = 2.0
+
+
+class HostSchedule:
+    __slots__ = ("next_due", "interval", "failures", "stable", "last_probe", "expedited")
+
+    def __init__(self, now: float) -> None:
+        self.next_due = now
+        self.interval = 0.0
+        self.failures = 0
+        self.stable = 0
+        self.last_probe: Optional[float] = None
+        self.expedited = 0
+
+
+class ProbeScheduler:
+    def __init__(
+        self,
+        base_interval: float = DEFAULT_BASE_INTERVAL,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        self.base_interval = base_interval
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._hosts: Dict[str, HostSchedule] = {}
+        # Set whenever a host becomes due earlier than planned, to wake the probe loop.
+        self.wake = asyncio.Event()
+
+    def sync(self, hosts: Sequence[str]) -> None:
+        """Track exactly ``hosts``; new hosts are due immediately."""
+
+        now = self._clock()
+        current = set(hosts)
+        for host in [host for host in self._hosts if host not in current]:
+            del self._hosts[host]
+        added = False
+        for host in hosts:
+            if host not in self._hosts:
+                self._hosts[host] = HostSchedule(now)
+                added = True
+        if added:
+            self.wake.set()
+
+    def due(self) -> List[str]:
+        now = self._clock()
+        return [host for host, entry in self._hosts.items() if entry.next_due <= now]
+
+    def next_due(self) -> Optional[float]:
+        return min((entry.next_due for entry in self._hosts.values()), default=None)
+
+    def record(self, host: str, ok: bool, changed: bool) -> None:
+        """Schedule ``host``'s next probe from the outcome of the one that just finished."""
+
+        entry = self._hosts.get(host)
+        if entry is None:
+            return
+        now = self._clock()
+        first = entry.last_probe is None
+        entry.last_probe = now
+        if not ok:
+            entry.failures += 1
+            entry.stable = 0
+            entry.interval = min(BACKOFF_MAX, BACKOFF_MIN * 2 ** (entry.failures - 1))
+        elif changed or entry.failures or first:
+            entry.failures = 0
+            entry.stable = 0
+            entry.interval = self.base_interval
+        else:
+            entry.stable += 1
+            entry.interval = min(
+                STABLE_MAX_INTERVAL,
+                max(self.base_interval, entry.interval) * STABLE_GROWTH,
+            )
+        entry.next_due = now + entry.interval * self._rng.uniform(1 - JITTER, 1 + JITTER)
+
+    def expedite(self, host: str) -> None:
+        """Probe ``host`` as soon as ``MIN_GAP`` allows (e.g. after a relay failure)."""
+
+        entry = self._hosts.get(host)
+        if entry is None:
+            return
+        now = self._clock()
+        earliest = now if entry.last_probe is None else max(now, entry.last_probe + MIN_GAP)
+        if earliest < entry.next_due:
+            entry.next_due = earliest
+            entry.expedited += 1
+            self.wake.set()
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        now = self._clock()
+        return {
+            host: {
+                "next_probe_in_s": round(max(0.0, entry.next_due - now), 1),
+                "interval_s": round(entry.interval, 1),
+                "failures": entry.failures,
+                "stable_probes": entry.stable,
+                "expedited": entry.expedited,
+            }
+            for host, entry in self._hosts.items()
+        }
@@ -0,0 +1,446 @@
+"""Decoupled upstream -> client streaming for the chat relay.
+
+An upstream reader task fills a bounded buffer while the response generator
+drains it, so a slow client never stalls the upstream read loop and the
+per-token path does not poll the ASGI receive channel. A separate watcher
+waits for ``http.disconnect`` and cancels the upstream read immediately so the
+LM host stops generating for abandoned requests.
+
+The generator coalesces buffered items into one write, waiting at most
+``flush_interval`` seconds after the first item of a batch, so high token
+rates cost a handful of ASGI sends instead of one per token.
+
+``open_upstream_stream`` sends a request and waits for its first body bytes,
+so callers can still fail over to another host before committing a response.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Mapping, Optional, Protocol
+
+import httpx
+
+from .logging_config import jlog
+from .metrics import RelayTiming
+
+logger = logging.getLogger("cathedral")
+
+DEFAULT_BUFFER_CHUNKS = 64
+DEFAULT_FLUSH_INTERVAL_SECONDS = 0.01
+DEFAULT_FLUSH_BYTES = 16384
+
+Receive = Callable[[], Awaitable[Mapping[str, Any]]]
+
+_EOF = object()
+
+
+class EventFramer(Protocol):
+    def feed(self, chunk: bytes) -> List[bytes]: ...
+
+    def flush(self) -> bytes: ...
+
+
+class UpstreamUnavailable(Exception):
+    """The upstream failed before sending any body bytes; safe to retry elsewhere."""
+
+    def __init__(self, base: str, reason: str, status: Optional[int] = None) -> None:
+        super().__init__(reason)
+        self.base = base
+        self.reason = reason
+        self.status = status
+
+
+class UpstreamStream:
+    """An upstream response whose first body bytes have already arrived."""
+
+    def __init__(
+        self,
+        base: str,
+        response: httpx.Response,
+        chunks: AsyncIterator[bytes],
+        first: bytes,
+        ttft: float,
+        timing: Optional[RelayTiming] = None,
+    ) -> None:
+        self.base = base
+        self.response = response
+        self.first = first
+        self.ttft = ttft
+        self.timing = timing
+        self._chunks = chunks
+        self._on_close: List[Callable[[], None]] = []
+        self._observers: List[Callable[[bytes], None]] = []
+        self._closed = False
+        # Health signals for the host's circuit breaker, read once the stream closes.
+        self.last_chunk_at = time.monotonic()
+        self.max_gap = 0.0
+        self.completed = False
+        self.error: Optional[BaseException] = None
+
+    @property
+    def status_code(self) -> int:
+        return self.response.status_code
+
+    @property
+    def media_type(self) -> str:
+        return self.response.headers.get("content-type", "text/event-stream")
+
+    @property
+    def is_event_stream(self) -> bool:
+        return self.media_type.split(";", 1)[0].strip().lower() == "text/event-stream"
+
+    async def events(self, framer: EventFramer) -> AsyncIterator[bytes]:
+        """Yield framed events, starting with the bytes read while opening."""
+
+        tail = b""
+        timing = self.timing
+        if timing is not None:
+            timing.streamed = True
+        try:
+            try:
+                events = framer.feed(self.first)
+                if timing is not None:
+                    timing.count(len(self.first), len(events))
+                for event in events:
+                    self._observe(event)
+                    yield event
+                async for chunk in self._chunks:
+                    if chunk:
+                        self._mark_chunk()
+                        events = framer.feed(chunk)
+                        if timing is not None:
+                            timing.chunk(len(chunk), len(events))
+                        for event in events:
+                            self._observe(event)
+                            yield event
+            except httpx.StreamClosed:
+                # Clean EOF from upstream
+                pass
+            except Exception as exc:
+                self.error = exc
+                raise
+            self.completed = True
+            tail = framer.flush()
+            if tail:
+                if timing is not None:
+                    timing.count(0, 1)
+                self._observe(tail)
+        finally:
+            await self.aclose()
+        if tail:
+            yield tail
+
+    def _mark_chunk(self) -> None:
+        now = time.monotonic()
+        self.max_gap = max(self.max_gap, now - self.last_chunk_at)
+        self.last_chunk_at = now
+
+    def stalled(self, threshold: float) -> bool:
+        """Whether upstream went ``threshold`` seconds without a chunk after the first byte,
+        including a stream cut off (e.g. by the client) while waiting."""
+
+        if self.max_gap >= threshold:
+            return True
+        return not self.completed and time.monotonic() - self.last_chunk_at >= threshold
+
+    def observe(self, callback: Callable[[bytes], None]) -> None:
+        """Pass every framed event to ``callback``; it must not block."""
+
+        self._observers.append(callback)
+
+    def _observe(self, event: bytes) -> None:
+        for callback in self._observers:
+            callback(event)
+
+    def on_close(self, callback: Callable[[], None]) -> None:
+        """Run ``callback`` once when the upstream response is closed."""
+
+        self._on_close.append(callback)
+
+    async def aclose(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self.timing is not None:
+            self.timing.finish()
+        try:
+            await self.response.aclose()
+        finally:
+            for callback in self._on_close:
+                callback()
+
+
+async def open_upstream_stream(
+    client: httpx.AsyncClient,
+    request: httpx.Request,
+    *,
+    base: str,
+    timing: Optional[RelayTiming] = None,
+) -> UpstreamStream:
+    """Send ``request`` and wait for the first non-empty body chunk.
+
+    Transport errors, 5xx statuses, and bodies that end before any byte raise
+    ``UpstreamUnavailable``. Other statuses (including 4xx) are returned so the
+    caller can pass them through. ``timing`` records the exchange.
+    """
+
+    if timing is not None:
+        request.extensions["trace"] = timing.trace
+    try:
+        upstream = await _open_upstream_stream(client, request, base=base)
+    except BaseException:
+        if timing is not None:
+            timing.error()
+        raise
+    if timing is not None:
+        timing.first_byte(upstream.ttft)
+        upstream.timing = timing
+    return upstream
+
+
+async def _open_upstream_stream(
+    client: httpx.AsyncClient, request: httpx.Request, *, base: str
+) -> UpstreamStream:
+    sent_at = time.monotonic()
+    try:
+        response = await client.send(request, stream=True)
+    except httpx.TransportError as exc:
+        raise UpstreamUnavailable(base, f"{type(exc).__name__}: {exc}".rstrip(": ")) from exc
+    if response.status_code >= 500:
+        await response.aclose()
+        raise UpstreamUnavailable(base, f"status {response.status_code}", response.status_code)
+    chunks = response.aiter_raw()
+    try:
+        while True:
+            first = await chunks.__anext__()
+            if first:
+                break
+    except StopAsyncIteration:
+        await response.aclose()
+        raise UpstreamUnavailable(base, "empty response", response.status_code) from None
+    except (httpx.TransportError, httpx.StreamClosed) as exc:
+        await response.aclose()
+        raise UpstreamUnavailable(base, f"{type(exc).__name__}: {exc}".rstrip(": ")) from exc
+    except BaseException:
+        await response.aclose()
+        raise
+    return UpstreamStream(base, response, chunks, first, time.monotonic() - sent_at)
+
+
+class RelayStats:
+    """Process-wide counters for streamed relays."""
+
+    def __init__(self) -> None:
+        self.streams_total = 0
+        self.streams_active = 0
+        self.client_disconnects = 0
+        self.upstream_errors = 0
+        self.chunks_relayed = 0
+        self.bytes_relayed = 0
+        self.writes = 0
+        self.buffer_full_waits = 0
+        self.slow_consumer_streams = 0
+        self.buffer_high_water = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "streams_total": self.streams_total,
+            "streams_active": self.streams_active,
+            "client_disconnects": self.client_disconnects,
+            "upstream_errors": self.upstream_errors,
+            "chunks_relayed": self.chunks_relayed,
+            "bytes_relayed": self.bytes_relayed,
+            "writes": self.writes,
+            "buffer_full_waits": self.buffer_full_waits,
+            "slow_consumer_streams": self.slow_consumer_streams,
+            "buffer_high_water": self.buffer_high_water,
+        }
+
+
+RELAY_STATS = RelayStats()
+
+
+class HedgeStats:
+    """Process-wide counters for hedged chat requests."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.skipped_no_host = 0
+        self.skipped_busy = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "skipped_no_host": self.skipped_no_host,
+            "skipped_busy": self.skipped_busy,
+        }
+
+
+HEDGE_STATS = HedgeStats()
+
+
+class RelayStream:
+    """Pump ``source`` through a bounded buffer and yield it to the client.
+
+    ``disconnected`` is set once the watcher sees the client go away; callers
+    check it before emitting trailing frames. Without ``receive`` no watcher
+    runs and the caller's framework handles disconnects. Items are yielded
+    whole, so a source of complete SSE events is never split mid-event.
+    """
+
+    def __init__(
+        self,
+        source: AsyncIterator[bytes],
+        receive: Optional[Receive],
+        *,
+        label: str,
+        max_buffered: int = DEFAULT_BUFFER_CHUNKS,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+        flush_bytes: int = DEFAULT_FLUSH_BYTES,
+        stats: RelayStats = RELAY_STATS,
+    ) -> None:
+        self._source = source
+        self._receive = receive
+        self._label = label
+        self._flush_interval = max(0.0, flush_interval)
+        self._flush_bytes = max(1, flush_bytes)
+        self._stats = stats
+        self._queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=max(1, max_buffered))
+        self.disconnected = False
+        self._reader_stopped = False
+        self.high_water = 0
+        self.full_waits = 0
+        self.chunks = 0
+        self.bytes = 0
+        self.writes = 0
+
+    async def _read_upstream(self) -> None:
+        queue = self._queue
+        try:
+            async for chunk in self._source:
+                if not chunk:
+                    continue
+                if queue.full():
+                    self.full_waits += 1
+                    self._stats.buffer_full_waits += 1
+                    if self.full_waits == 1:
+                        self._stats.slow_consumer_streams += 1
+                await queue.put(chunk)
+                depth = queue.qsize()
+                if depth > self.high_water:
+                    self.high_water = depth
+                    if depth > self._stats.buffer_high_water:
+                        self._stats.buffer_high_water = depth
+            await queue.put(_EOF)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            self._stats.upstream_errors += 1
+            await queue.put(exc)
+        finally:
+            aclose = getattr(self._source, "aclose", None)
+            if aclose is not None:
+                try:
+                    await aclose()
+                except Exception:  # pragma: no cover - cleanup guard
+                    pass
+
+    async def _watch_disconnect(self, receive: Receive, reader: "asyncio.Task[None]") -> None:
+        while True:
+            message = await receive()
+            if message.get("type") == "http.disconnect":
+                break
+        self.disconnected = True
+        self._stats.client_disconnects += 1
+        jlog(logger, event="chat_relay_client_disconnected", url=self._label)
+        self._stop_reader(reader)
+        await asyncio.wait({reader})
+        # Unblock the writer: the reader is gone, so replace any backlog with EOF.
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(_EOF)
+
+    def _stop_reader(self, reader: "asyncio.Task[None]") -> None:
+        # Cancel at most once: a second cancel would interrupt httpx while it
+        # closes the upstream connection, leaving the LM host generating.
+        if not reader.done() and not self._reader_stopped:
+            self._reader_stopped = True
+            reader.cancel()
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        stats = self._stats
+        stats.streams_total += 1
+        stats.streams_active += 1
+        loop = asyncio.get_running_loop()
+        reader = loop.create_task(self._read_upstream())
+        tasks = {reader}
+        watcher: Optional["asyncio.Task[None]"] = None
+        if self._receive is not None:
+            watcher = loop.create_task(self._watch_disconnect(self._receive, reader))
+            tasks.add(watcher)
+        queue = self._queue
+        try:
+            held: Any = None
+            while held is None:
+                item = await queue.get()
+                if item is _EOF:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                batch: List[bytes] = [item]
+                size = len(item)
+                deadline: Optional[float] = None
+                while size < self._flush_bytes:
+                    try:
+                        item = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        if self._flush_interval <= 0:
+                            break
+                        if deadline is None:
+                            deadline = loop.time() + self._flush_interval
+                        remaining = deadline - loop.time()
+                        if remaining <= 0:
+                            break
+                        try:
+                            item = await asyncio.wait_for(queue.get(), remaining)
+                        except asyncio.TimeoutError:
+                            break
+                    if item is _EOF or isinstance(item, BaseException):
+                        held = item
+                        break
+                    batch.append(item)
+                    size += len(item)
+                self.chunks += len(batch)
+                self.bytes += size
+                self.writes += 1
+                yield batch[0] if len(batch) == 1 else b"".join(batch)
+            if isinstance(held, BaseException):
+                raise held
+        finally:
+            stats.streams_active -= 1
+            stats.chunks_relayed += self.chunks
+            stats.bytes_relayed += self.bytes
+            stats.writes += self.writes
+            if watcher is not None:
+                watcher.cancel()
+            self._stop_reader(reader)
+            await asyncio.wait(tasks)
+            jlog(
+                logger,
+                level="DEBUG",
+                event="chat_relay_stream_closed",
+                url=self._label,
+                chunks=self.chunks,
+                bytes=self.bytes,
+                writes=self.writes,
+                buffer_high_water=self.high_water,
+                buffer_full_waits=self.full_waits,
+                disconnected=self.disconnected,
+            )
@@ -0,0 +1,144 @@
+"""Change feed for the model catalog and host health.
+
+``ResourceFeed.publish`` receives every catalog snapshot ``HostPool``
+publishes, but only emits a ``resources.changed`` event when the host ->
+models catalog or ``HOST_HEALTH`` actually differ from the last published
+state. Each event carries a monotonically increasing ``version``, an ``etag``
+(a digest of the full state), the previous etag, and a diff, so a subscriber
+holding ``previous_etag`` can apply it and one that is not can resubscribe.
+
+Subscribers get a bounded queue each. A subscriber that falls
+``SUBSCRIBER_QUEUE_SIZE`` events behind has its backlog replaced by one
+``resync`` event carrying the full state, so a stuck client never holds
+memory or slows ``publish``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Set
+
+SUBSCRIBER_QUEUE_SIZE = 64
+
+
+def _etag(catalog: Mapping[str, Sequence[str]], health: Mapping[str, str]) -> str:
+    canonical = json.dumps(
+        {"catalog": catalog, "health": health}, sort_keys=True, separators=(",", ":")
+    )
+    return '"' + hashlib.blake2b(canonical.encode("utf-8"), digest_size=8).hexdigest() + '"'
+
+
+def diff_state(
+    old_catalog: Mapping[str, Sequence[str]],
+    old_health: Mapping[str, str],
+    catalog: Mapping[str, Sequence[str]],
+    health: Mapping[str, str],
+) -> Dict[str, Any]:
+    old_hosts = set(old_catalog) | set(old_health)
+    hosts = set(catalog) | set(health)
+    models_added: Dict[str, List[str]] = {}
+    models_removed: Dict[str, List[str]] = {}
+    for host in sorted(hosts | old_hosts):
+        before = list(old_catalog.get(host, ()))
+        after = list(catalog.get(host, ()))
+        added = [mid for mid in after if mid not in before]
+        removed = [mid for mid in before if mid not in after]
+        if added:
+            models_added[host] = added
+        if removed:
+            models_removed[host] = removed
+    return {
+        "hosts_added": sorted(hosts - old_hosts),
+        "hosts_removed": sorted(old_hosts - hosts),
+        "models_added": models_added,
+        "models_removed": models_removed,
+        "health": {
+            host: state for host, state in sorted(health.items()) if old_health.get(host) != state
+        },
+    }
+
+
+class Subscription:
+    def __init__(self, feed: "ResourceFeed") -> None:
+        self._feed = feed
+        self._queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        self.delivered = 0
+        self.resyncs = 0
+
+    def offer(self, event: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self.resyncs += 1
+            self._queue.put_nowait({**self._feed.state(), "resync": True})
+
+    async def get(self) -> Dict[str, Any]:
+        event = await self._queue.get()
+        self.delivered += 1
+        return event
+
+    def close(self) -> None:
+        self._feed.unsubscribe(self)
+
+
+class ResourceFeed:
+    def __init__(self) -> None:
+        self.version = 0
+        self._catalog: Dict[str, List[str]] = {}
+        self._health: Dict[str, str] = {}
+        self.etag = _etag(self._catalog, self._health)
+        self._subscribers: Set[Subscription] = set()
+        self.events = 0
+
+    def state(self) -> Dict[str, Any]:
+        """Full current state, as returned to a new subscriber."""
+
+        return {
+            "version": self.version,
+            "etag": self.etag,
+            "catalog": {host: list(models) for host, models in self._catalog.items()},
+            "host_health": dict(self._health),
+        }
+
+    def publish(self, catalog: Mapping[str, Sequence[str]], health: Mapping[str, str]) -> Optional[Dict[str, Any]]:
+        """Record a new state; returns the emitted event, or ``None`` when nothing changed."""
+
+        etag = _etag(catalog, health)
+        if etag == self.etag:
+            return None
+        diff = diff_state(self._catalog, self._health, catalog, health)
+        previous = self.etag
+        self.version += 1
+        self.etag = etag
+        self._catalog = {host: list(models) for host, models in catalog.items()}
+        self._health = dict(health)
+        event = {
+            "version": self.version,
+            "etag": etag,
+            "previous_etag": previous,
+            "diff": diff,
+        }
+        self.events += 1
+        for subscriber in list(self._subscribers):
+            subscriber.offer(event)
+        return event
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "etag": self.etag,
+            "subscribers": len(self._subscribers),
+            "events": self.events,
+        }
@@ -0,0 +1,335 @@
+"""Exact-match response cache for deterministic chat completions.
+
+Only requests that pin ``temperature`` to ``0`` for an opted-in model are
+cached. The key is a SHA-256 over the canonical JSON of the request (model,
+messages, sampling parameters, and the ``stream`` mode), so a hit replays the
+exact bytes upstream produced: a JSON document for ``stream: false`` and the
+recorded SSE events for streaming requests. A hash of the forwarded
+``Authorization`` header is part of the key, so an answer is only replayed to
+callers presenting the same credential; the header itself is never stored.
+
+Entries live in an in-memory LRU bounded by bytes and a TTL. An optional disk
+tier in ``/data/response_cache.db`` (SQLite, WAL) survives restarts; memory
+misses fall back to it and promote what they find.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+import aiosqlite
+
+from .logging_config import jlog
+
+logger = logging.getLogger("cathedral")
+
+DB_PATH = Path("/data/response_cache.db")
+DEFAULT_CACHE_MB = 64
+DEFAULT_TTL_SECONDS = 3600
+# A single response may use at most this share of the memory budget.
+MAX_ENTRY_FRACTION = 8
+WILDCARD_MODEL = "*"
+
+# Fields that never change the generated output.
+_IGNORED_FIELDS = frozenset({"user"})
+_FLOAT_FIELDS = ("temperature", "top_p", "frequency_penalty", "presence_penalty", "repeat_penalty")
+
+INIT_SQL = """
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous = NORMAL;
+CREATE TABLE IF NOT EXISTS responses(
+  key          TEXT PRIMARY KEY,
+  model        TEXT,
+  status_code  INTEGER NOT NULL,
+  media_type   TEXT NOT NULL,
+  body         BLOB NOT NULL,
+  size         INTEGER NOT NULL,
+  created_ts   REAL NOT NULL,
+  accessed_ts  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_ts);
+"""
+
+
+def credential_scope(authorization: Optional[str]) -> Optional[str]:
+    """Stable hash of an ``Authorization`` header, or ``None`` without one."""
+
+    if not authorization:
+        return None
+    return hashlib.sha256(authorization.encode("utf-8")).hexdigest()
+
+
+def cache_key(payload: Any, credential: Optional[str] = None) -> Optional[str]:
+    """Canonical request hash, or ``None`` when the request is not deterministic.
+
+    ``credential`` (see ``credential_scope``) separates callers that forward
+    different credentials.
+    """
+
+    if not isinstance(payload, dict):
+        return None
+    temperature = payload.get("temperature")
+    if isinstance(temperature, bool) or not isinstance(temperature, (int, float)) or temperature != 0:
+        return None
+    normalized: Dict[str, Any] = {
+        key: value for key, value in payload.items() if key not in _IGNORED_FIELDS
+    }
+    for field in _FLOAT_FIELDS:
+        value = normalized.get(field)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            normalized[field] = float(value)
+    normalized["stream"] = bool(normalized.get("stream", False))
+    # Always wrapped, so entries stored before keys were credential-scoped
+    # (still on disk) can no longer match any request.
+    scoped = {"payload": normalized, "credential": credential}
+    try:
+        canonical = json.dumps(
+            scoped, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+        )
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class CachedResponse:
+    __slots__ = ("status_code", "media_type", "body", "model", "created")
+
+    def __init__(
+        self,
+        status_code: int,
+        media_type: str,
+        body: bytes,
+        model: Optional[str],
+        created: Optional[float] = None,
+    ) -> None:
+        self.status_code = status_code
+        self.media_type = media_type
+        self.body = body
+        self.model = model
+        self.created = time.time() if created is None else created
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+
+class ResponseCache:
+    """Byte-bounded LRU with TTL and an optional SQLite tier.
+
+    ``max_bytes <= 0`` disables caching entirely; ``disk_max_bytes <= 0``
+    keeps it memory-only.
+    """
+
+    def __init__(self, db_path: Path = DB_PATH) -> None:
+        self._db_path = db_path
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._db: Optional[aiosqlite.Connection] = None
+        self._db_lock = asyncio.Lock()
+        self._disk_bytes: Optional[int] = None
+        self.max_bytes = DEFAULT_CACHE_MB * 1024 * 1024
+        self.ttl = float(DEFAULT_TTL_SECONDS)
+        self.disk_max_bytes = 0
+        self.models: frozenset = frozenset()
+        self.bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expired = 0
+        self.uncacheable = 0
+        self.oversize = 0
+        self.disk_errors = 0
+
+    def configure(
+        self,
+        max_bytes: int,
+        ttl_seconds: float,
+        models: Iterable[str],
+        disk_max_bytes: int,
+    ) -> None:
+        self.max_bytes = max(0, int(max_bytes))
+        self.ttl = max(1.0, float(ttl_seconds))
+        self.models = frozenset(str(model) for model in models)
+        self.disk_max_bytes = max(0, int(disk_max_bytes))
+        self._evict()
+
+    @property
+    def max_entry_bytes(self) -> int:
+        return self.max_bytes // MAX_ENTRY_FRACTION
+
+    def enabled_for(self, model: Optional[str]) -> bool:
+        if self.max_bytes <= 0 or not model:
+            return False
+        return model in self.models or WILDCARD_MODEL in self.models
+
+    def _evict(self) -> None:
+        while self._entries and self.bytes > self.max_bytes:
+            _key, entry = self._entries.popitem(last=False)
+            self.bytes -= entry.size
+            self.evictions += 1
+
+    def _remember(self, key: str, entry: CachedResponse) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.bytes -= previous.size
+        self._entries[key] = entry
+        self.bytes += entry.size
+        self._evict()
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if now - entry.created <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            del self._entries[key]
+            self.bytes -= entry.size
+            self.expired += 1
+        if self.disk_max_bytes > 0:
+            entry = await self._disk_get(key, now)
+            if entry is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                if entry.size <= self.max_entry_bytes:
+                    self._remember(key, entry)
+                return entry
+        self.misses += 1
+        return None
+
+    def put(self, key: str, entry: CachedResponse) -> bool:
+        """Store ``entry`` in memory; returns ``False`` when it is too large."""
+
+        if entry.size > self.max_entry_bytes:
+            self.oversize += 1
+            return False
+        self._remember(key, entry)
+        self.stores += 1
+        return True
+
+    async def persist(self, key: str, entry: CachedResponse) -> None:
+        """Write ``entry`` to the disk tier (no-op when it is disabled)."""
+
+        if self.disk_max_bytes <= 0 or entry.size > self.disk_max_bytes:
+            return
+        try:
+            db = await self._connect()
+            async with self._db_lock:
+                await db.execute(
+                    """
+                    INSERT OR REPLACE INTO responses
+                      (key, model, status_code, media_type, body, size, created_ts, accessed_ts)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        key,
+                        entry.model,
+                        entry.status_code,
+                        entry.media_type,
+                        entry.body,
+                        entry.size,
+                        entry.created,
+                        time.time(),
+                    ),
+                )
+                await self._prune_disk(db)
+                await db.commit()
+        except Exception as exc:  # pragma: no cover - sqlite guard
+            self.disk_errors += 1
+            jlog(logger, level="WARN", event="response_cache_disk_write_failed", error=str(exc))
+
+    async def _connect(self) -> aiosqlite.Connection:
+        async with self._db_lock:
+            if self._db is None:
+                self._db_path.parent.mkdir(parents=True, exist_ok=True)
+                db = await aiosqlite.connect(self._db_path)
+                for stmt in INIT_SQL.strip().split(";"):
+                    sql = stmt.strip()
+                    if sql:
+                        await db.execute(sql)
+                await db.commit()
+                self._db = db
+            return self._db
+
+    async def _disk_get(self, key: str, now: float) -> Optional[CachedResponse]:
+        try:
+            db = await self._connect()
+            async with self._db_lock:
+                cursor = await db.execute(
+                    "SELECT status_code, media_type, body, model, created_ts FROM responses WHERE key=?",
+                    (key,),
+                )
+                row = await cursor.fetchone()
+                if row is None:
+                    return None
+                if now - float(row[4]) > self.ttl:
+                    await db.execute("DELETE FROM responses WHERE key=?", (key,))
+                    await db.commit()
+                    self.expired += 1
+                    return None
+                await db.execute("UPDATE responses SET accessed_ts=? WHERE key=?", (now, key))
+                await db.commit()
+        except Exception as exc:  # pragma: no cover - sqlite guard
+            self.disk_errors += 1
+            jlog(logger, level="WARN", event="response_cache_disk_read_failed", error=str(exc))
+            return None
+        return CachedResponse(int(row[0]), str(row[1]), bytes(row[2]), row[3], float(row[4]))
+
+    async def _prune_disk(self, db: aiosqlite.Connection) -> None:
+        # Caller holds ``_db_lock``. Drop expired rows, then the least recently
+        # used ones until the tier fits its byte budget.
+        await db.execute("DELETE FROM responses WHERE created_ts < ?", (time.time() - self.ttl,))
+        cursor = await db.execute("SELECT COALESCE(SUM(size), 0) FROM responses")
+        row = await cursor.fetchone()
+        total = int(row[0]) if row else 0
+        while total > self.disk_max_bytes:
+            cursor = await db.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_ts LIMIT 64"
+            )
+            rows = list(await cursor.fetchall())
+            if not rows:
+                break
+            doomed = []
+            for key, size in rows:
+                doomed.append((key,))
+                total -= int(size)
+                if total <= self.disk_max_bytes:
+                    break
+            await db.executemany("DELETE FROM responses WHERE key=?", doomed)
+            self.evictions += len(doomed)
+        self._disk_bytes = total
+
+    async def aclose(self) -> None:
+        async with self._db_lock:
+            if self._db is not None:
+                db, self._db = self._db, None
+                await db.close()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "models": sorted(self.models),
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_s": self.ttl,
+            "disk_max_bytes": self.disk_max_bytes,
+            "disk_bytes": self._disk_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "uncacheable": self.uncacheable,
+            "oversize": self.oversize,
+            "disk_errors": self.disk_errors,
+        }
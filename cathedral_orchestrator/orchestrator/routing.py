@@ -0,0 +1,258 @@
+"""Host selection policies for models served by more than one LM host."""
+
+from __future__ import annotations
+
+import bisect
+import hashlib
+import logging
+import math
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Literal, Optional, Sequence, Tuple, get_args
+
+from .logging_config import jlog
+
+logger = logging.getLogger("cathedral")
+
+# Values accepted by the ``routing_policy`` option (matches the add-on schema).
+PolicyName = Literal["first", "least_in_flight", "ewma_ttft", "weighted_round_robin"]
+POLICY_NAMES: Tuple[str, ...] = get_args(PolicyName)
+DEFAULT_POLICY: PolicyName = "least_in_flight"
+EWMA_ALPHA = 0.3
+# Recent TTFT samples kept per host for percentile estimates.
+TTFT_WINDOW = 128
+TTFT_MIN_SAMPLES = 8
+# Consistent-hash ring for prompt-prefix affinity.
+AFFINITY_VNODES = 64
+AFFINITY_LOAD_FACTOR = 1.25
+AFFINITY_RING_CACHE = 64
+
+
+class HostStats:
+    """Live per-host counters maintained by the relay."""
+
+    __slots__ = ("in_flight", "ewma_ttft", "samples", "recent_ttft")
+
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.ewma_ttft: Optional[float] = None
+        self.samples = 0
+        self.recent_ttft: Deque[float] = deque(maxlen=TTFT_WINDOW)
+
+
+class HostStatsRegistry:
+    def __init__(self, alpha: float = EWMA_ALPHA) -> None:
+        self._alpha = alpha
+        self._stats: Dict[str, HostStats] = {}
+
+    def get(self, base: str) -> HostStats:
+        key = base.rstrip("/")
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = HostStats()
+            self._stats[key] = stats
+        return stats
+
+    def begin(self, base: str) -> None:
+        self.get(base).in_flight += 1
+
+    def end(self, base: str) -> None:
+        stats = self.get(base)
+        stats.in_flight = max(0, stats.in_flight - 1)
+
+    def record_ttft(self, base: str, seconds: float) -> None:
+        stats = self.get(base)
+        if stats.ewma_ttft is None:
+            stats.ewma_ttft = seconds
+        else:
+            stats.ewma_ttft = self._alpha * seconds + (1 - self._alpha) * stats.ewma_ttft
+        stats.samples += 1
+        stats.recent_ttft.append(seconds)
+
+    def ttft_percentile(self, base: str, percentile: float) -> Optional[float]:
+        """Nearest-rank TTFT percentile over the recent window, or ``None``
+        until ``TTFT_MIN_SAMPLES`` samples exist."""
+
+        recent = self.get(base).recent_ttft
+        if len(recent) < TTFT_MIN_SAMPLES:
+            return None
+        ordered = sorted(recent)
+        rank = math.ceil(percentile / 100.0 * len(ordered))
+        return ordered[min(len(ordered), max(1, rank)) - 1]
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        result: Dict[str, Dict[str, object]] = {}
+        for base, stats in self._stats.items():
+            p95 = self.ttft_percentile(base, 95)
+            result[base] = {
+                "in_flight": stats.in_flight,
+                "ewma_ttft_ms": round(stats.ewma_ttft * 1000, 1)
+                if stats.ewma_ttft is not None
+                else None,
+                "samples": stats.samples,
+                "p95_ttft_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            }
+        return result
+
+
+class RoutingPolicy:
+    """Choose one host from an ordered, non-empty candidate list."""
+
+    name = "first"
+
+    def choose(self, candidates: Sequence[str], stats: HostStatsRegistry) -> str:
+        return candidates[0]
+
+
+class LeastInFlightPolicy(RoutingPolicy):
+    """Pick the host with the fewest active relays; ties keep configured order."""
+
+    name = "least_in_flight"
+
+    def choose(self, candidates: Sequence[str], stats: HostStatsRegistry) -> str:
+        return min(candidates, key=lambda base: stats.get(base).in_flight)
+
+
+class EwmaTtftPolicy(RoutingPolicy):
+    """Pick the lowest EWMA time-to-first-token, scaled by current load.
+
+    Hosts without samples score zero so they are tried before the average settles.
+    """
+
+    name = "ewma_ttft"
+
+    def choose(self, candidates: Sequence[str], stats: HostStatsRegistry) -> str:
+        def cost(base: str) -> float:
+            host = stats.get(base)
+            if host.ewma_ttft is None:
+                return 0.0
+            return host.ewma_ttft * (host.in_flight + 1)
+
+        return min(candidates, key=cost)
+
+
+class WeightedRoundRobinPolicy(RoutingPolicy):
+    """Smooth weighted round-robin (nginx style) over the eligible hosts."""
+
+    name = "weighted_round_robin"
+
+    def __init__(self, weights: Optional[Dict[str, int]] = None) -> None:
+        self._weights = {
+            str(base).rstrip("/"): max(1, int(weight))
+            for base, weight in (weights or {}).items()
+        }
+        self._current: Dict[str, int] = {}
+
+    def choose(self, candidates: Sequence[str], stats: HostStatsRegistry) -> str:
+        total = 0
+        best = candidates[0]
+        for base in candidates:
+            weight = self._weights.get(base.rstrip("/"), 1)
+            self._current[base] = self._current.get(base, 0) + weight
+            total += weight
+            if self._current[base] > self._current[best]:
+                best = base
+        self._current[best] -= total
+        return best
+
+
+def _ring_hash(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+class PrefixAffinity:
+    """Consistent hashing with bounded loads over the hosts serving a model.
+
+    A prompt prefix hashes to a point on a ring of virtual nodes; the first
+    host clockwise whose in-flight count stays within ``load_factor`` times
+    the average (plus the new request) takes it, so a shared system prompt
+    keeps landing where its KV cache is warm without piling onto one box.
+    ``None`` (that host is saturated, or every host is over the bound) means
+    the caller's normal policy decides.
+    """
+
+    def __init__(
+        self,
+        load_factor: float = AFFINITY_LOAD_FACTOR,
+        vnodes: int = AFFINITY_VNODES,
+    ) -> None:
+        self.load_factor = max(1.0, load_factor)
+        self._vnodes = max(1, vnodes)
+        self._rings: "OrderedDict[Tuple[str, ...], Tuple[List[int], List[str]]]" = OrderedDict()
+        self.hits = 0
+        self.spills = 0
+        self.fallbacks = 0
+
+    def _ring(self, candidates: Sequence[str]) -> Tuple[List[int], List[str]]:
+        members = tuple(sorted(candidates))
+        ring = self._rings.get(members)
+        if ring is not None:
+            self._rings.move_to_end(members)
+            return ring
+        points = sorted(
+            (_ring_hash(f"{base}#{index}".encode("utf-8")), base)
+            for base in members
+            for index in range(self._vnodes)
+        )
+        ring = ([point for point, _base in points], [base for _point, base in points])
+        self._rings[members] = ring
+        while len(self._rings) > AFFINITY_RING_CACHE:
+            self._rings.popitem(last=False)
+        return ring
+
+    def choose(
+        self,
+        prefix: bytes,
+        candidates: Sequence[str],
+        stats: HostStatsRegistry,
+        saturated: Callable[[str], bool],
+    ) -> Optional[str]:
+        points, owners = self._ring(candidates)
+        total = sum(stats.get(base).in_flight for base in candidates)
+        bound = math.ceil(self.load_factor * (total + 1) / len(candidates))
+        start = bisect.bisect(points, _ring_hash(prefix))
+        seen: List[str] = []
+        for step in range(len(owners)):
+            base = owners[(start + step) % len(owners)]
+            if base in seen:
+                continue
+            seen.append(base)
+            if stats.get(base).in_flight < bound:
+                if saturated(base):
+                    break
+                if len(seen) == 1:
+                    self.hits += 1
+                else:
+                    self.spills += 1
+                return base
+            if len(seen) == len(candidates):
+                break
+        self.fallbacks += 1
+        return None
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "load_factor": self.load_factor,
+            "hits": self.hits,
+            "spills": self.spills,
+            "fallbacks": self.fallbacks,
+        }
+
+
+def build_policy(name: Optional[str], weights: Optional[Dict[str, int]] = None) -> RoutingPolicy:
+    requested = (name or DEFAULT_POLICY).strip().lower()
+    if requested == LeastInFlightPolicy.name:
+        return LeastInFlightPolicy()
+    if requested == EwmaTtftPolicy.name:
+        return EwmaTtftPolicy()
+    if requested == WeightedRoundRobinPolicy.name:
+        return WeightedRoundRobinPolicy(weights)
+    if requested == RoutingPolicy.name:
+        return RoutingPolicy()
+    jlog(
+        logger,
+        level="WARN",
+        event="routing_policy_unknown",
+        requested=requested,
+        fallback=DEFAULT_POLICY,
+    )
+    return LeastInFlightPolicy()
@@ -4,8 +4,10 @@ import asyncio
 import logging
 import sqlite3
 import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
 
 import aiosqlite
 
@@ -15,6 +17,12 @@ DB_PATH = Path("/data/sessions.db")
 DEFAULT_TTL_MINUTES = 120
 DEFAULT_PRUNE_INTERVAL_SECONDS = 15 * 60
 
+# In-memory (host_url, model_id) cache so the chat relay can honour session
+# affinity without a SQLite round trip on every turn.
+HOST_CACHE_MAX_ENTRIES = 4096
+HOST_CACHE_TTL_SECONDS = 300.0
+_host_cache: "OrderedDict[Tuple[str, str], Tuple[Optional[str], Optional[str], float]]" = OrderedDict()
+
 INIT_SQL = """
 PRAGMA journal_mode=WAL;
 PRAGMA synchronous = NORMAL;
@@ -35,6 +43,16 @@ CREATE TABLE IF NOT EXISTS sessions(
 );
 CREATE INDEX IF NOT EXISTS idx_sessions_conv ON sessions(conversation_id);
 CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_ts);
+CREATE TABLE IF NOT EXISTS usage(
+  scope               TEXT NOT NULL,
+  key                 TEXT NOT NULL,
+  prompt_tokens       INTEGER NOT NULL DEFAULT 0,
+  completion_tokens   INTEGER NOT NULL DEFAULT 0,
+  requests            INTEGER NOT NULL DEFAULT 0,
+  estimated_requests  INTEGER NOT NULL DEFAULT 0,
+  updated_ts          REAL NOT NULL,
+  PRIMARY KEY(scope, key)
+);
 """
 
 
@@ -107,9 +125,20 @@ async def _connect():
     return db
 
 
+@asynccontextmanager
+async def _session_db() -> AsyncIterator[aiosqlite.Connection]:
+    # ``await _connect()`` already started the aiosqlite worker thread; entering the
+    # connection's own context manager would start it a second time and fail.
+    db = await _connect()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
 async def upsert_session(workspace_id: str, thread_id: str, *, conversation_id=None, user_id=None, persona_id=None):
     now = time.time()
-    async with await _connect() as db:
+    async with _session_db() as db:
         await db.execute(
             """
             INSERT INTO sessions(workspace_id,thread_id,conversation_id,user_id,persona_id,created_ts,updated_ts)
@@ -126,7 +155,7 @@ async def upsert_session(workspace_id: str, thread_id: str, *, conversation_id=N
 
 
 async def touch_session(workspace_id: str, thread_id: str) -> None:
-    async with await _connect() as db:
+    async with _session_db() as db:
         await db.execute(
             "UPDATE sessions SET updated_ts=? WHERE workspace_id=? AND thread_id=?",
             (time.time(), workspace_id, thread_id),
@@ -135,7 +164,7 @@ async def touch_session(workspace_id: str, thread_id: str) -> None:
 
 
 async def get_session(workspace_id: str, thread_id: str) -> Optional[Dict[str, Any]]:
-    async with await _connect() as db:
+    async with _session_db() as db:
         row = await (
             await db.execute(
                 "SELECT * FROM sessions WHERE workspace_id=? AND thread_id=?",
@@ -146,7 +175,7 @@ async def get_session(workspace_id: str, thread_id: str) -> Optional[Dict[str, A
 
 
 async def find_by_conversation(conversation_id: str) -> Optional[Dict[str, Any]]:
-    async with await _connect() as db:
+    async with _session_db() as db:
         row = await (
             await db.execute(
                 "SELECT * FROM sessions WHERE conversation_id=? ORDER BY updated_ts DESC LIMIT 1",
@@ -156,6 +185,47 @@ async def find_by_conversation(conversation_id: str) -> Optional[Dict[str, Any]]
         return dict(row) if row else None
 
 
+def _cache_host(
+    workspace_id: str,
+    thread_id: str,
+    host_url: Optional[str],
+    model_id: Optional[str],
+) -> None:
+    key = (workspace_id, thread_id)
+    _host_cache[key] = (host_url, model_id, time.monotonic() + HOST_CACHE_TTL_SECONDS)
+    _host_cache.move_to_end(key)
+    while len(_host_cache) > HOST_CACHE_MAX_ENTRIES:
+        _host_cache.popitem(last=False)
+
+
+async def get_session_host(
+    workspace_id: str, thread_id: str
+) -> Tuple[Optional[str], Optional[str]]:
+    """Return the (host_url, model_id) bound to a session, served from cache when fresh."""
+
+    key = (workspace_id, thread_id)
+    cached = _host_cache.get(key)
+    if cached is not None and cached[2] > time.monotonic():
+        _host_cache.move_to_end(key)
+        return cached[0], cached[1]
+    try:
+        row = await get_session(workspace_id, thread_id)
+    except Exception as exc:  # pragma: no cover - sqlite guard
+        jlog(
+            logger,
+            level="WARN",
+            event="session_host_lookup_failed",
+            workspace_id=workspace_id,
+            thread_id=thread_id,
+            error=str(exc),
+        )
+        return None, None
+    host_url = row.get("host_url") if row else None
+    model_id = row.get("model_id") if row else None
+    _cache_host(workspace_id, thread_id, host_url, model_id)
+    return host_url, model_id
+
+
 async def set_host(
     workspace_id: str,
     thread_id: str,
@@ -164,7 +234,7 @@ async def set_host(
 ) -> None:
     now = time.time()
     try:
-        async with await _connect() as db:
+        async with _session_db() as db:
             cursor = await db.execute(
                 """
                 UPDATE sessions
@@ -174,6 +244,7 @@ async def set_host(
                 (host_url, model_id, now, workspace_id, thread_id),
             )
             await db.commit()
+            _cache_host(workspace_id, thread_id, host_url, model_id)
             jlog(
                 logger,
                 event="session_set_host",
@@ -199,7 +270,7 @@ async def set_health(
 ) -> None:
     now = time.time()
     try:
-        async with await _connect() as db:
+        async with _session_db() as db:
             cursor = await db.execute(
                 """
                 UPDATE sessions
@@ -233,7 +304,7 @@ async def set_collection(
 ) -> None:
     now = time.time()
     try:
-        async with await _connect() as db:
+        async with _session_db() as db:
             cursor = await db.execute(
                 """
                 UPDATE sessions
@@ -265,7 +336,7 @@ async def set_collection(
 
 async def list_active() -> int:
     try:
-        async with await _connect() as db:
+        async with _session_db() as db:
             row = await (await db.execute("SELECT COUNT(*) FROM sessions")).fetchone()
             count = int(row[0]) if row else 0
             jlog(logger, event="session_count", count=count)
@@ -275,14 +346,28 @@ async def list_active() -> int:
         return 0
 
 
+# Session usage rows go with their session (token ``workspace:thread``). The
+# second statement also drops rows left behind by sessions pruned earlier.
+_PRUNE_SESSION_USAGE_SQL = """
+DELETE FROM usage WHERE scope = 'session' AND key IN (
+  SELECT workspace_id || ':' || thread_id FROM sessions WHERE updated_ts < ?
+)
+"""
+_PRUNE_ORPHAN_USAGE_SQL = """
+DELETE FROM usage WHERE scope = 'session' AND updated_ts < ? AND key NOT IN (
+  SELECT workspace_id || ':' || thread_id FROM sessions
+)
+"""
+_PRUNE_SESSIONS_SQL = "DELETE FROM sessions WHERE updated_ts < ?"
+
+
 async def prune_idle(ttl_minutes: int = DEFAULT_TTL_MINUTES) -> int:
     cutoff = time.time() - (ttl_minutes * 60)
     try:
-        async with await _connect() as db:
-            cursor = await db.execute(
-                "DELETE FROM sessions WHERE updated_ts < ?",
-                (cutoff,),
-            )
+        async with _session_db() as db:
+            await db.execute(_PRUNE_SESSION_USAGE_SQL, (cutoff,))
+            cursor = await db.execute(_PRUNE_SESSIONS_SQL, (cutoff,))
+            await db.execute(_PRUNE_ORPHAN_USAGE_SQL, (cutoff,))
             await db.commit()
             count = cursor.rowcount if cursor.rowcount is not None else 0
             jlog(
@@ -316,10 +401,14 @@ def prune_expired_sync(ttl_minutes: int = DEFAULT_TTL_MINUTES) -> int:
             conn.execute("PRAGMA synchronous=NORMAL")
         except Exception:
             pass
+        # The prune thread may run before any async connection created the tables.
+        conn.executescript(INIT_SQL)
         cur = conn.cursor()
-        cur.execute("DELETE FROM sessions WHERE updated_ts < ?", (cutoff,))
-        conn.commit()
+        cur.execute(_PRUNE_SESSION_USAGE_SQL, (cutoff,))
+        cur.execute(_PRUNE_SESSIONS_SQL, (cutoff,))
         count = cur.rowcount or 0
+        cur.execute(_PRUNE_ORPHAN_USAGE_SQL, (cutoff,))
+        conn.commit()
         jlog(
             logger,
             event="session_pruned_idle_sync",
@@ -346,3 +435,48 @@ def prune_expired_sync(ttl_minutes: int = DEFAULT_TTL_MINUTES) -> int:
 
 def prune_expired(ttl_minutes: int = DEFAULT_TTL_MINUTES) -> int:
     return asyncio.run(prune_idle(ttl_minutes=ttl_minutes))
+
+
+# (scope, key, prompt_tokens, completion_tokens, requests, estimated_requests)
+UsageRow = Tuple[str, str, int, int, int, int]
+
+
+async def add_usage(rows: Iterable[UsageRow]) -> int:
+    """Add token-usage deltas to the persistent per-scope totals."""
+
+    now = time.time()
+    params = [(*row, now) for row in rows]
+    if not params:
+        return 0
+    async with _session_db() as db:
+        await db.executemany(
+            """
+            INSERT INTO usage(scope, key, prompt_tokens, completion_tokens, requests,
+                              estimated_requests, updated_ts)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(scope, key) DO UPDATE SET
+              prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+              completion_tokens = completion_tokens + excluded.completion_tokens,
+              requests = requests + excluded.requests,
+              estimated_requests = estimated_requests + excluded.estimated_requests,
+              updated_ts = excluded.updated_ts
+            """,
+            params,
+        )
+        await db.commit()
+    return len(params)
+
+
+async def list_usage(scope: Optional[str] = None) -> List[Dict[str, Any]]:
+    try:
+        async with _session_db() as db:
+            if scope:
+                cursor = await db.execute(
+                    "SELECT * FROM usage WHERE scope=? ORDER BY key", (scope,)
+                )
+            else:
+                cursor = await db.execute("SELECT * FROM usage ORDER BY scope, key")
+            return [dict(row) for row in await cursor.fetchall()]
+    except Exception as exc:  # pragma: no cover - sqlite guard
+        jlog(logger, level="ERROR", event="usage_list_failed", scope=scope, error=str(exc))
+        return []
@@ -0,0 +1,230 @@
+"""Coalesce identical deterministic chat requests onto one upstream stream.
+
+A ``Flight`` owns one upstream generation. Its pump task records every framed
+event, and each ``Subscription`` replays the recorded prefix before following
+the live tail, so a request that joins late still receives the whole answer.
+The pump is not tied to any one client: it keeps running while at least one
+subscriber remains and is cancelled (closing the upstream stream) once the
+last one leaves.
+
+The upstream request carries its starter's headers, including
+``Authorization``. Flights are therefore registered under ``(key, scope)``,
+where ``scope`` identifies the caller's credential, and only requests from the
+same scope join an existing flight.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+
+import httpx
+
+from .logging_config import jlog
+from .relay import Receive, UpstreamStream
+from .sse import SSEFramer
+
+logger = logging.getLogger("cathedral")
+
+Opener = Callable[[Receive], Awaitable[UpstreamStream]]
+
+
+class Flight:
+    """One shared upstream answer and the requests following it."""
+
+    def __init__(
+        self,
+        key: str,
+        on_finish: Callable[["Flight"], None],
+        on_complete: Optional[Callable[["Flight"], None]] = None,
+        scope: Optional[str] = None,
+    ) -> None:
+        self.key = key
+        self.scope = scope
+        self.framer = SSEFramer()
+        self.chunks: List[bytes] = []
+        self.size = 0
+        self.upstream: Optional[UpstreamStream] = None
+        self.done = False
+        self.error: Optional[Exception] = None
+        self.subscribers = 0
+        self.joined = 0
+        self._opened: "asyncio.Future[UpstreamStream]" = asyncio.get_running_loop().create_future()
+        # Nobody may await ``_opened``; mark its exception as retrieved.
+        self._opened.add_done_callback(lambda fut: fut.cancelled() or fut.exception())
+        self._progress = asyncio.Event()
+        self._abandoned = asyncio.Event()
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._on_finish = on_finish
+        self._on_complete = on_complete
+
+    @property
+    def completed(self) -> bool:
+        """Upstream finished cleanly with a full answer every subscriber saw."""
+
+        upstream = self.upstream
+        if not self.done or self.error is not None or upstream is None:
+            return False
+        if self._abandoned.is_set():
+            return False
+        return not upstream.is_event_stream or self.framer.done
+
+    def start(self, opener: Opener) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run(opener))
+
+    async def receive(self) -> Mapping[str, Any]:
+        """ASGI-style receive that reports a disconnect once every subscriber left."""
+
+        await self._abandoned.wait()
+        return {"type": "http.disconnect"}
+
+    async def _run(self, opener: Opener) -> None:
+        try:
+            upstream = await opener(self.receive)
+        except BaseException as exc:
+            if isinstance(exc, asyncio.CancelledError):
+                self._opened.cancel()
+            else:
+                self._opened.set_exception(exc)
+            self.done = True
+            self._finish()
+            if not isinstance(exc, Exception):
+                raise
+            return
+        self.upstream = upstream
+        self._opened.set_result(upstream)
+        try:
+            async for event in upstream.events(self.framer):
+                self.chunks.append(event)
+                self.size += len(event)
+                self._notify()
+        except Exception as exc:
+            self.error = exc
+            if isinstance(exc, httpx.HTTPError):
+                jlog(
+                    logger,
+                    level="ERROR",
+                    event="chat_flight_upstream_error",
+                    host=upstream.base,
+                    error=str(exc),
+                )
+        finally:
+            await upstream.aclose()
+            self.done = True
+            self._notify()
+            self._finish()
+        if self._on_complete is not None and self.completed:
+            self._on_complete(self)
+
+    def _notify(self) -> None:
+        event, self._progress = self._progress, asyncio.Event()
+        event.set()
+
+    def _finish(self) -> None:
+        self._on_finish(self)
+
+    def subscribe(self) -> "Subscription":
+        self.subscribers += 1
+        self.joined += 1
+        return Subscription(self)
+
+    def _leave(self) -> None:
+        self.subscribers -= 1
+        if self.subscribers > 0 or self.done:
+            return
+        self._abandoned.set()
+        self._finish()
+        task = self._task
+        if task is not None and not task.done():
+            # Cancel once so httpx can close the upstream connection cleanly.
+            task.cancel()
+
+
+class Subscription:
+    """One request's view of a ``Flight``; ``close()`` is idempotent."""
+
+    def __init__(self, flight: Flight) -> None:
+        self.flight = flight
+        self._closed = False
+
+    async def opened(self) -> UpstreamStream:
+        """Wait for the flight's upstream response (or its opening error)."""
+
+        return await asyncio.shield(self.flight._opened)
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        flight = self.flight
+        index = 0
+        try:
+            while True:
+                if index < len(flight.chunks):
+                    chunk = flight.chunks[index]
+                    index += 1
+                    yield chunk
+                    continue
+                if flight.done:
+                    break
+                await flight._progress.wait()
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self.flight._leave()
+
+
+class SingleFlight:
+    """Registry of shared flights keyed by canonical request hash and scope."""
+
+    def __init__(self) -> None:
+        self._flights: Dict[Tuple[str, Optional[str]], Flight] = {}
+        self.flights = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    def join(
+        self,
+        key: str,
+        opener: Opener,
+        *,
+        share: bool = True,
+        scope: Optional[str] = None,
+        on_complete: Optional[Callable[[Flight], None]] = None,
+    ) -> Subscription:
+        """Subscribe to the in-flight answer for ``key``, starting one if needed.
+
+        Only flights started with the same ``scope`` (the caller's credential
+        hash) are joined. With ``share=False`` the flight is private to this
+        request (it still runs ``on_complete``, e.g. to fill the response cache).
+        """
+
+        flight = self._flights.get((key, scope)) if share else None
+        if flight is not None:
+            self.coalesced += 1
+            return flight.subscribe()
+        flight = Flight(key, self._discard, on_complete, scope)
+        if share:
+            self._flights[(key, scope)] = flight
+        self.flights += 1
+        subscription = flight.subscribe()
+        flight.start(opener)
+        return subscription
+
+    def _discard(self, flight: Flight) -> None:
+        if self._flights.get((flight.key, flight.scope)) is flight:
+            del self._flights[(flight.key, flight.scope)]
+            if not flight.done:
+                self.abandoned += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._flights),
+            "flights": self.flights,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned,
+        }
@@ -1,27 +1,125 @@
-from typing import AsyncIterable, Union
+from typing import AsyncIterable, AsyncIterator, List, Optional, Union
 
 import httpx
 from starlette.responses import StreamingResponse
 
+from .relay import RelayStream
+
+SSE_DONE = b"data: [DONE]\n\n"
+
+# Events are separated by a blank line; the spec allows LF, CRLF, or CR endings.
+_BOUNDARIES = (b"\n\n", b"\r\n\r\n", b"\r\r")
+
+
+def _is_done_event(event: bytes) -> bool:
+    if b"[DONE]" not in event:
+        return False
+    for line in event.splitlines():
+        if line.startswith(b"data:") and line[5:].strip() == b"[DONE]":
+            return True
+    return False
+
+
+class SSEFramer:
+    """Incrementally split a raw byte stream into complete SSE events.
+
+    Each event is returned with its original bytes, including the trailing
+    blank line, so framing never rewrites what upstream sent. ``done`` flips
+    once a ``data: [DONE]`` event is seen, even when the marker was split
+    across network reads.
+    """
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+        self._scan_from = 0
+        self.done = False
+        self.events = 0
+
+    def _next_boundary(self, start: int) -> Optional[int]:
+        buf = self._buf
+        end = buf.find(b"\n\n", start)
+        if b"\r" not in buf:
+            return None if end < 0 else end + 2
+        best: Optional[int] = None
+        for sep in _BOUNDARIES:
+            idx = buf.find(sep, start)
+            if idx >= 0 and (best is None or idx + len(sep) < best):
+                best = idx + len(sep)
+        return best
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        if not chunk:
+            return []
+        buf = self._buf
+        buf += chunk
+        events: List[bytes] = []
+        start = 0
+        end = self._next_boundary(self._scan_from)
+        while end is not None:
+            event = bytes(buf[start:end])
+            if not self.done and _is_done_event(event):
+                self.done = True
+            events.append(event)
+            start = end
+            end = self._next_boundary(start)
+        if start:
+            del buf[:start]
+        # A separator can straddle two reads; rescan only the last few bytes.
+        self._scan_from = max(0, len(buf) - 3)
+        self.events += len(events)
+        return events
+
+    def flush(self) -> bytes:
+        """Return any trailing partial event left when upstream closed."""
+
+        tail = bytes(self._buf)
+        self._buf.clear()
+        self._scan_from = 0
+        if tail and not self.done and _is_done_event(tail):
+            self.done = True
+        return tail
+
+
+async def iter_sse_events(
+    chunks: AsyncIterable[Union[bytes, str]],
+    framer: Optional[SSEFramer] = None,
+) -> AsyncIterator[bytes]:
+    """Yield complete SSE events from arbitrarily split upstream chunks."""
+
+    framer = framer or SSEFramer()
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        if not isinstance(chunk, (bytes, bytearray)):
+            chunk = str(chunk).encode("utf-8")
+        for event in framer.feed(bytes(chunk)):
+            yield event
+    tail = framer.flush()
+    if tail:
+        yield tail
+
 
 async def sse_proxy(
     iter_bytes: AsyncIterable[Union[bytes, str]],
     content_type: str = "text/event-stream",
 ):
-    async def event_iter():
+    framer = SSEFramer()
+
+    async def upstream_events():
         try:
-            async for chunk in iter_bytes:
-                if not chunk:
-                    continue
-                if isinstance(chunk, (bytes, bytearray)):
-                    yield bytes(chunk)
-                else:
-                    yield str(chunk).encode("utf-8")
+            async for event in iter_sse_events(iter_bytes, framer):
+                yield event
         except httpx.StreamClosed:
             # Treat upstream EOF as a clean shutdown so clients do not see an error.
             pass
+
+    async def event_iter():
+        try:
+            async for batch in RelayStream(upstream_events(), None, label="sse_proxy"):
+                yield batch
         finally:
-            yield b"data: [DONE]\n\n"
+            if not framer.done:
+                yield SSE_DONE
 
     return StreamingResponse(
         event_iter(),
@@ -0,0 +1,125 @@
+"""Single-value cache with a TTL and stale-while-revalidate.
+
+``get`` returns the cached value while it is younger than ``ttl``. Between
+``ttl`` and ``max_stale`` it still returns the cached value at once and starts
+one background refresh. Older than that, or on a different ``key`` (for
+example after the LM host list changed), callers wait for the refresh. All
+concurrent callers share one in-flight load, and a failed load keeps serving
+the previous value when it has one for the same key.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar, cast
+
+from .logging_config import jlog
+
+logger = logging.getLogger("cathedral")
+
+T = TypeVar("T")
+
+# ``get`` status values, also sent as the ``X-Cathedral-Cache`` header.
+HIT, STALE, MISS = "hit", "stale", "miss"
+
+
+class StaleWhileRevalidate(Generic[T]):
+    def __init__(
+        self,
+        loader: Callable[[], Awaitable[T]],
+        *,
+        ttl: float,
+        max_stale: float,
+        name: str,
+    ) -> None:
+        self._loader = loader
+        self.ttl = ttl
+        self.max_stale = max(ttl, max_stale)
+        self.name = name
+        self._key: Optional[Hashable] = None
+        self._value: Optional[T] = None
+        self._loaded_at = 0.0
+        self._task: Optional["asyncio.Task[T]"] = None
+        self._task_key: Optional[Hashable] = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_failures = 0
+
+    def _age(self) -> Optional[float]:
+        return time.monotonic() - self._loaded_at if self._value is not None else None
+
+    async def get(self, key: Hashable = None) -> Tuple[T, str]:
+        """Return ``(value, status)`` with status ``hit``, ``stale`` or ``miss``."""
+
+        age = self._age()
+        if age is not None and key == self._key:
+            if age < self.ttl:
+                self.hits += 1
+                return cast(T, self._value), HIT
+            if age < self.max_stale:
+                self.stale_hits += 1
+                self._start(key)
+                return cast(T, self._value), STALE
+        self.misses += 1
+        task = self._start(key)
+        try:
+            return await asyncio.shield(task), MISS
+        except Exception:
+            if self._value is not None and key == self._key:
+                return cast(T, self._value), STALE
+            raise
+
+    def invalidate(self) -> None:
+        self._value = None
+        self._key = None
+
+    def _start(self, key: Hashable) -> "asyncio.Task[T]":
+        task = self._task
+        if task is None or task.done() or self._task_key != key:
+            task = asyncio.get_running_loop().create_task(self._load(key))
+            # Background refreshes may fail with nobody awaiting them; the failure is logged.
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._task = task
+            self._task_key = key
+        return task
+
+    async def _load(self, key: Hashable) -> T:
+        self.loads += 1
+        started = time.monotonic()
+        try:
+            value = await self._loader()
+        except Exception as exc:
+            self.load_failures += 1
+            jlog(logger, level="WARN", event=f"{self.name}_refresh_failed", error=str(exc))
+            raise
+        if key != self._task_key:
+            # The host list changed while this load ran; its result is obsolete.
+            return value
+        self._key = key
+        self._value = value
+        self._loaded_at = time.monotonic()
+        jlog(
+            logger,
+            level="DEBUG",
+            event=f"{self.name}_refreshed",
+            duration_ms=round((self._loaded_at - started) * 1000, 1),
+        )
+        return value
+
+    def snapshot(self) -> Dict[str, Any]:
+        age = self._age()
+        return {
+            "age_s": round(age, 1) if age is not None else None,
+            "ttl_s": self.ttl,
+            "max_stale_s": self.max_stale,
+            "refreshing": self._task is not None and not self._task.done(),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "load_failures": self.load_failures,
+        }
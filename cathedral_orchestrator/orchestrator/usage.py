@@ -0,0 +1,260 @@
+"""Token usage accounting for relayed chat completions.
+
+``UsageTap`` receives a copy of each relayed chunk with a non-blocking
+``put_nowait`` and parses it on its own task, so the byte-forwarding path never
+waits on JSON parsing. Upstream ``usage`` blocks are authoritative; streams
+without one are estimated from their content deltas (one token per delta) and
+the request size. ``UsageLedger`` accumulates totals per workspace, host, and
+model and hands out deltas (per session too) for periodic SQLite flushes.
+Session counters only live until their delta is flushed: a new session is
+minted for every chat request without a session header, so keeping them
+would grow without bound.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from .logging_config import jlog
+
+logger = logging.getLogger("cathedral")
+
+SCOPES = ("session", "workspace", "host", "model")
+# Scopes whose totals since start are kept in memory.
+TOTAL_SCOPES = ("workspace", "host", "model")
+# Non-streamed bodies larger than this are not parsed for usage.
+MAX_JSON_BYTES = 4 * 1024 * 1024
+# Rough bytes-per-token ratio for estimates when upstream reports no usage.
+ESTIMATE_BYTES_PER_TOKEN = 4
+
+_CONTENT_DELTA = re.compile(rb'"content"\s*:\s*"(?!")')
+
+_EOF = object()
+
+
+class UsageCounter:
+    __slots__ = ("prompt_tokens", "completion_tokens", "requests", "estimated_requests")
+
+    def __init__(self) -> None:
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.requests = 0
+        self.estimated_requests = 0
+
+    def add(self, prompt: int, completion: int, estimated: bool) -> None:
+        self.prompt_tokens += prompt
+        self.completion_tokens += completion
+        self.requests += 1
+        if estimated:
+            self.estimated_requests += 1
+
+    def merge(self, other: "UsageCounter") -> None:
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.requests += other.requests
+        self.estimated_requests += other.estimated_requests
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            "requests": self.requests,
+            "estimated_requests": self.estimated_requests,
+        }
+
+
+class UsageLedger:
+    """In-memory totals since start (``TOTAL_SCOPES``) plus deltas not yet written to SQLite."""
+
+    def __init__(self) -> None:
+        self._totals: Dict[Tuple[str, str], UsageCounter] = {}
+        self._pending: Dict[Tuple[str, str], UsageCounter] = {}
+        self.recorded = 0
+        self.flushes = 0
+        self.flush_errors = 0
+
+    def record(
+        self,
+        *,
+        prompt_tokens: int,
+        completion_tokens: int,
+        estimated: bool,
+        host: Optional[str],
+        model: Optional[str],
+        workspace: Optional[str],
+        session: Optional[str],
+    ) -> None:
+        self.recorded += 1
+        for scope, key in zip(SCOPES, (session, workspace, host, model)):
+            if not key:
+                continue
+            tables = (self._totals, self._pending) if scope in TOTAL_SCOPES else (self._pending,)
+            for table in tables:
+                counter = table.get((scope, key))
+                if counter is None:
+                    counter = UsageCounter()
+                    table[(scope, key)] = counter
+                counter.add(prompt_tokens, completion_tokens, estimated)
+
+    def drain(self) -> List[Tuple[str, str, int, int, int, int]]:
+        pending, self._pending = self._pending, {}
+        return [
+            (
+                scope,
+                key,
+                counter.prompt_tokens,
+                counter.completion_tokens,
+                counter.requests,
+                counter.estimated_requests,
+            )
+            for (scope, key), counter in pending.items()
+        ]
+
+    def restore(self, rows: List[Tuple[str, str, int, int, int, int]]) -> None:
+        """Put drained deltas back after a failed flush."""
+
+        for scope, key, prompt, completion, requests, estimated in rows:
+            counter = UsageCounter()
+            counter.prompt_tokens = prompt
+            counter.completion_tokens = completion
+            counter.requests = requests
+            counter.estimated_requests = estimated
+            existing = self._pending.get((scope, key))
+            if existing is None:
+                self._pending[(scope, key)] = counter
+            else:
+                existing.merge(counter)
+
+    def pending(self, scope: Optional[str] = None) -> Dict[Tuple[str, str], UsageCounter]:
+        return {
+            entry: counter
+            for entry, counter in self._pending.items()
+            if scope is None or entry[0] == scope
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Totals since start for the low-cardinality scopes."""
+
+        result: Dict[str, Any] = {
+            "recorded": self.recorded,
+            "pending": len(self._pending),
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+        }
+        for scope in TOTAL_SCOPES:
+            result[scope] = {
+                key: counter.as_dict()
+                for (entry_scope, key), counter in self._totals.items()
+                if entry_scope == scope
+            }
+        # Pending deltas are drained every flush, so this stays small.
+        result["pending_sessions"] = sum(1 for scope, _key in self._pending if scope == "session")
+        return result
+
+
+class UsageTap:
+    """Background parser for one relayed response; ``feed`` never blocks."""
+
+    def __init__(
+        self,
+        ledger: UsageLedger,
+        *,
+        event_stream: bool,
+        request_bytes: int,
+        host: Optional[str],
+        model: Optional[str],
+        workspace: Optional[str],
+        session: Optional[str],
+    ) -> None:
+        self._ledger = ledger
+        self._event_stream = event_stream
+        self._request_bytes = request_bytes
+        self._labels = {"host": host, "model": model, "workspace": workspace, "session": session}
+        self._queue: "asyncio.Queue[Any]" = asyncio.Queue()
+        self._closed = False
+        self._usage: Optional[Dict[str, Any]] = None
+        self._deltas = 0
+        self._body: List[bytes] = []
+        self._body_size = 0
+        self._task = asyncio.get_running_loop().create_task(self._consume())
+
+    def feed(self, chunk: bytes) -> None:
+        if not self._closed:
+            self._queue.put_nowait(chunk)
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._queue.put_nowait(_EOF)
+
+    async def _consume(self) -> None:
+        try:
+            while True:
+                chunk = await self._queue.get()
+                if chunk is _EOF:
+                    break
+                if self._event_stream:
+                    self._scan_events(chunk)
+                elif self._body_size <= MAX_JSON_BYTES:
+                    self._body.append(chunk)
+                    self._body_size += len(chunk)
+            self._finish()
+        except Exception as exc:  # pragma: no cover - accounting must never break relays
+            jlog(logger, level="WARN", event="usage_tap_failed", error=str(exc))
+
+    def _scan_events(self, chunk: bytes) -> None:
+        for line in chunk.splitlines():
+            if not line.startswith(b"data:"):
+                continue
+            if b'"usage"' in line:
+                try:
+                    payload = json.loads(line[5:])
+                except ValueError:
+                    payload = None
+                if isinstance(payload, dict) and isinstance(payload.get("usage"), dict):
+                    self._usage = payload["usage"]
+            if _CONTENT_DELTA.search(line):
+                self._deltas += 1
+
+    def _finish(self) -> None:
+        if not self._event_stream and self._body and self._body_size <= MAX_JSON_BYTES:
+            try:
+                payload = json.loads(b"".join(self._body))
+            except ValueError:
+                payload = None
+            if isinstance(payload, dict):
+                if isinstance(payload.get("usage"), dict):
+                    self._usage = payload["usage"]
+                else:
+                    content = json.dumps(payload.get("choices") or [])
+                    self._deltas = len(content) // ESTIMATE_BYTES_PER_TOKEN
+        usage = self._usage
+        if usage is not None:
+            prompt = _as_int(usage.get("prompt_tokens"))
+            completion = _as_int(usage.get("completion_tokens"))
+            estimated = False
+        else:
+            prompt = self._request_bytes // ESTIMATE_BYTES_PER_TOKEN
+            completion = self._deltas
+            estimated = True
+        if not prompt and not completion:
+            return
+        self._ledger.record(
+            prompt_tokens=prompt,
+            completion_tokens=completion,
+            estimated=estimated,
+            **self._labels,
+        )
+
+
+def _as_int(value: Any) -> int:
+    if isinstance(value, bool):
+        return 0
+    if isinstance(value, (int, float)):
+        return max(0, int(value))
+    return 0
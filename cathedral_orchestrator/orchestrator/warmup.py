@@ -0,0 +1,140 @@
+"""Warm-up and keep-warm priming for just-in-time loaded models.
+
+LM Studio loads a JIT model on its first request and unloads it after an idle
+TTL, so the first turn of a new conversation can pay a multi-second model load.
+``WarmupScheduler.request`` primes a ``(host, model)`` pair in the background
+with a one-token completion: it never blocks the caller, coalesces duplicate
+requests while one is in flight, and skips pairs primed within the cooldown.
+Each warm-up first reads the host's ``/api/v0/models`` entry for the model:
+session warm-ups skip models whose ``state`` is already ``loaded``, while
+keep-warm primes always send the request, because only real traffic resets
+the host's idle TTL. The entry's ``type`` picks a chat or embeddings prime.
+
+The lookup and the priming call are injected, so admission, routing and
+upstream clients stay in ``main``; ``prime`` returns ``False`` when the host
+has no free slot and the warm-up is dropped rather than queued.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from .logging_config import jlog
+
+logger = logging.getLogger("cathedral")
+
+DEFAULT_KEEP_WARM_INTERVAL_SECONDS = 300
+# ``keep_warm_interval_s`` range from the add-on schema.
+MIN_KEEP_WARM_INTERVAL_SECONDS = 60
+MAX_KEEP_WARM_INTERVAL_SECONDS = 86400
+# Pairs primed (or found loaded) this recently are not primed again.
+DEFAULT_COOLDOWN_SECONDS = 60.0
+LOADED_STATE = "loaded"
+
+# ``(host, model) -> /api/v0/models entry`` (``None`` when the host has no native API).
+Describer = Callable[[str, str], Awaitable[Optional[Dict[str, Any]]]]
+# ``(host, model, type) -> False`` when no admission slot was free.
+Primer = Callable[[str, str, Optional[str]], Awaitable[bool]]
+
+
+class WarmupScheduler:
+    def __init__(
+        self,
+        describe: Describer,
+        prime: Primer,
+        *,
+        cooldown: float = DEFAULT_COOLDOWN_SECONDS,
+    ) -> None:
+        self._describe = describe
+        self._prime = prime
+        self.cooldown = cooldown
+        self._in_flight: Set[Tuple[str, str]] = set()
+        self._last: Dict[Tuple[str, str], float] = {}
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self.requested = 0
+        self.primed = 0
+        self.skipped_loaded = 0
+        self.skipped_busy = 0
+        self.skipped_recent = 0
+        self.failed = 0
+        self.last_seconds: Optional[float] = None
+
+    def request(self, host: str, model: str, *, reason: str, force: bool = False) -> bool:
+        """Schedule a background warm-up; returns ``False`` when coalesced or cooling down.
+
+        ``force`` primes even when the host reports the model as loaded.
+        """
+
+        key = (host.rstrip("/"), model)
+        self.requested += 1
+        if key in self._in_flight:
+            self.skipped_recent += 1
+            return False
+        last = self._last.get(key)
+        if last is not None and time.monotonic() - last < self.cooldown:
+            self.skipped_recent += 1
+            return False
+        self._in_flight.add(key)
+        task = asyncio.get_running_loop().create_task(self._warm(key, reason, force))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _warm(self, key: Tuple[str, str], reason: str, force: bool) -> None:
+        host, model = key
+        try:
+            entry = await self._describe(host, model) or {}
+            if not force and entry.get("state") == LOADED_STATE:
+                self.skipped_loaded += 1
+                self._last[key] = time.monotonic()
+                return
+            started = time.monotonic()
+            if not await self._prime(host, model, entry.get("type")):
+                self.skipped_busy += 1
+                jlog(logger, level="DEBUG", event="warmup_skipped_busy", host=host, model=model, reason=reason)
+                return
+            self.last_seconds = time.monotonic() - started
+            self.primed += 1
+            self._last[key] = time.monotonic()
+            jlog(
+                logger,
+                event="warmup_primed",
+                host=host,
+                model=model,
+                reason=reason,
+                seconds=round(self.last_seconds, 3),
+            )
+        except Exception as exc:
+            self.failed += 1
+            jlog(logger, level="WARN", event="warmup_failed", host=host, model=model, reason=reason, error=str(exc))
+        finally:
+            self._in_flight.discard(key)
+
+    def forget(self, hosts: List[str]) -> None:
+        """Drop cooldown entries for hosts that are no longer configured."""
+
+        keep = {host.rstrip("/") for host in hosts}
+        for key in [key for key in self._last if key[0] not in keep]:
+            del self._last[key]
+
+    async def aclose(self) -> None:
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "requested": self.requested,
+            "primed": self.primed,
+            "skipped_loaded": self.skipped_loaded,
+            "skipped_busy": self.skipped_busy,
+            "skipped_recent": self.skipped_recent,
+            "failed": self.failed,
+            "in_flight": len(self._in_flight),
+            "last_prime_s": round(self.last_seconds, 3) if self.last_seconds is not None else None,
+        }
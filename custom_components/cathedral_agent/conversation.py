@@ -12,6 +12,8 @@ from homeassistant.components.conversation import (
 )
 
 ORCH_URL_DEFAULT = "http://homeassistant.local:8001"
+# Voice turns are dispatched ahead of bulk work on contended LM hosts.
+PRIORITY_HEADERS = {"X-Cathedral-Priority": "interactive"}
 
 
 class CathedralConversationAgent(AbstractConversationAgent):
@@ -36,7 +38,10 @@ class CathedralConversationAgent(AbstractConversationAgent):
         }
         async with aiohttp.ClientSession() as s:
             async with s.post(
-                f"{self.base_url}/v1/chat/completions", json=payload, timeout=60
+                f"{self.base_url}/v1/chat/completions",
+                json=payload,
+                headers=PRIORITY_HEADERS,
+                timeout=60,
             ) as r:
                 data = await r.json()
         # OpenAI shape: choices[0].message.content
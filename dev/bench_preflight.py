@@ -0,0 +1,80 @@
+"""Benchmark the context preflight token estimator.
+
+Usage: python dev/bench_preflight.py [--mb 8] [--repeat 5]
+
+Prints the preflight's cost per MB of chat body for English prose, source
+code, and CJK text: the size ceiling that passes most bodies without parsing,
+the ``messages``-only decode plus estimate for bodies near the window, and a
+full ``json.loads`` of the same body for scale.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "cathedral_orchestrator"))
+
+from orchestrator.preflight import count_image_parts, estimate_tokens, token_ceiling  # noqa: E402
+
+CHUNK_BYTES = 64 * 1024
+_DECODER = json.JSONDecoder()
+
+SAMPLES = {
+    "prose": "The orchestrator relays chat completions to the least busy host. ",
+    "code": "def relay(body: bytes) -> int:\n    return len(body) // 4  # estimate\n",
+    "cjk": "编排器将聊天请求转发到负载最低的主机。",
+}
+
+
+def _body(text: str, size: int) -> bytes:
+    content = text * (size // len(text.encode("utf-8")) + 1)
+    payload = {"model": "bench", "messages": [{"role": "user", "content": content}]}
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def _estimate(body: bytes) -> int:
+    start = body.index(b"[", body.index(b'"messages"'))
+    messages, _end = _DECODER.raw_decode(body[start:].decode("utf-8"))
+    return estimate_tokens(messages)
+
+
+def _best(fn: Callable[[], object], repeat: int) -> float:
+    timings: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=int, default=8, help="body size per sample in MB")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (best is kept)")
+    args = parser.parse_args()
+
+    print(
+        f"{'sample':<8}{'bytes':>12}{'tokens':>12}{'ceiling':>12}"
+        f"{'ceiling ms/MB':>15}{'estimate ms/MB':>16}{'json.loads ms/MB':>18}"
+    )
+    for name, text in SAMPLES.items():
+        body = _body(text, args.mb * 1024 * 1024)
+        chunks = [body[i : i + CHUNK_BYTES] for i in range(0, len(body), CHUNK_BYTES)]
+        mb = len(body) / (1024 * 1024)
+        ceiling = _best(lambda: token_ceiling(len(body), count_image_parts(chunks)), args.repeat)
+        estimate = _best(lambda: _estimate(body), args.repeat)
+        parse = _best(lambda: json.loads(body), args.repeat)
+        print(
+            f"{name:<8}{len(body):>12}{_estimate(body):>12}"
+            f"{token_ceiling(len(body), count_image_parts(chunks)):>12}"
+            f"{ceiling * 1000 / mb:>15.3f}{estimate * 1000 / mb:>16.3f}{parse * 1000 / mb:>18.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()